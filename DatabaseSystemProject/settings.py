@@ -87,6 +87,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers
+            # such as enrollments queue up instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than shared memory, so tests running requests in
+        # parallel threads see real database locking
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -137,6 +148,38 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
+CACHES = {
+    'default': {
+        # Use a shared backend (Redis/Memcached) when running several processes
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'database-system',
+    }
+}
+
+# Dashboard panels are re-rendered when their data changes; this bounds how long
+# time-relative text such as due dates and "5 minutes ago" can go stale
+DASHBOARD_PANEL_TIMEOUT = 300
+
+# Announcement lists are invalidated by version on every change and expiry, so
+# this only bounds how long an unused audience entry stays in the cache
+ANNOUNCEMENT_CACHE_TIMEOUT = 3600
+
+# Weight schemes are invalidated by version, but with a per-process cache only in
+# the process that saved them; this bounds how long other workers use old weights
+WEIGHT_SCHEME_CACHE_TIMEOUT = 300
+
+# Inactive announcements unchanged for this many days are moved to the archive
+# by the archive_announcements command
+ANNOUNCEMENT_RETENTION_DAYS = 180
+
+# How waitlisted students are moved into freed seats: 'immediate' promotes as soon
+# as a seat frees up, 'batched' leaves it to the promote_waitlists command
+WAITLIST_PROMOTION = 'immediate'
+
+# Registration rush mode: enroll requests are queued and acknowledged at once, and
+# the process_enrollment_queue worker applies them. Must run with the worker.
+ENROLLMENT_RUSH_MODE = False
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Login/Logout URLs
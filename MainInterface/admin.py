@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from django.utils import timezone
-from .models import UserProfile, Course, Enrollment, Grade, AcademicCalendar, Announcement, StudyMaterial, Assignment, AssignmentSubmission
+from .models import UserProfile, Course, Enrollment, Grade, AssessmentWeightScheme, StudentCourseResult, StudentTermResult, LecturerDashboardCounters, AcademicCalendar, Announcement, AnnouncementDelivery, AnnouncementArchive, WaitlistPromotion, EnrollmentRequest, StudyMaterial, Assignment, AssignmentSubmission
 
 # Register your models here.
 
@@ -48,6 +48,22 @@ class EnrollmentAdmin(admin.ModelAdmin):
     search_fields = ('student__username', 'course__course_code', 'course__course_name')
     date_hierarchy = 'enrollment_date'
 
+@admin.register(WaitlistPromotion)
+class WaitlistPromotionAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'reason', 'waitlisted_at', 'promoted_at')
+    list_filter = ('reason', 'course__semester')
+    search_fields = ('student__username', 'course__course_code')
+    date_hierarchy = 'promoted_at'
+    readonly_fields = ('enrollment', 'course', 'student', 'reason', 'waitlisted_at', 'promoted_at')
+
+@admin.register(EnrollmentRequest)
+class EnrollmentRequestAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'status', 'requested_at', 'processed_at')
+    list_filter = ('status',)
+    search_fields = ('student__username', 'course__course_code')
+    date_hierarchy = 'requested_at'
+    readonly_fields = ('enrollment', 'requested_at', 'processed_at')
+
 @admin.register(Grade)
 class GradeAdmin(admin.ModelAdmin):
     list_display = ('student', 'course', 'grade_type', 'grade_value', 'numeric_score', 'date_graded')
@@ -55,6 +71,33 @@ class GradeAdmin(admin.ModelAdmin):
     search_fields = ('student__username', 'course__course_code')
     date_hierarchy = 'date_graded'
 
+@admin.register(AssessmentWeightScheme)
+class AssessmentWeightSchemeAdmin(admin.ModelAdmin):
+    list_display = ('course', 'grade_type', 'weight', 'updated_at')
+    list_filter = ('grade_type',)
+    search_fields = ('course__course_code',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(StudentCourseResult)
+class StudentCourseResultAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'course_gpa', 'credits', 'final_mark', 'letter_grade', 'updated_at')
+    list_filter = ('letter_grade', 'course__semester')
+    search_fields = ('student__username', 'course__course_code')
+    readonly_fields = ('updated_at',)
+
+@admin.register(StudentTermResult)
+class StudentTermResultAdmin(admin.ModelAdmin):
+    list_display = ('student', 'semester', 'year', 'term_gpa', 'cumulative_gpa', 'credits_attempted', 'credits_earned', 'updated_at')
+    list_filter = ('semester', 'year')
+    search_fields = ('student__username',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(LecturerDashboardCounters)
+class LecturerDashboardCountersAdmin(admin.ModelAdmin):
+    list_display = ('lecturer', 'total_courses', 'total_students', 'pending_submissions', 'upcoming_classes', 'reconciled_at')
+    search_fields = ('lecturer__user__username',)
+    readonly_fields = ('updated_at',)
+
 @admin.register(Announcement)
 class AnnouncementAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'priority', 'audience', 'course', 'is_pinned', 'is_active', 'created_at')
@@ -81,6 +124,22 @@ class AnnouncementAdmin(admin.ModelAdmin):
         if not change:  # If creating a new announcement
             obj.author = request.user
         super().save_model(request, obj, form, change)
+        AnnouncementDelivery.schedule(obj)
+
+@admin.register(AnnouncementDelivery)
+class AnnouncementDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('announcement', 'user', 'is_read', 'created_at', 'read_at')
+    list_filter = ('is_read',)
+    search_fields = ('announcement__title', 'user__username')
+    readonly_fields = ('created_at', 'read_at')
+
+@admin.register(AnnouncementArchive)
+class AnnouncementArchiveAdmin(admin.ModelAdmin):
+    list_display = ('title', 'author', 'priority', 'audience', 'course', 'created_at', 'archived_at')
+    list_filter = ('priority', 'audience')
+    search_fields = ('title', 'content', 'author__username')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('announcement_id', 'created_at', 'updated_at', 'archived_at')
 
 @admin.register(StudyMaterial)
 class StudyMaterialAdmin(admin.ModelAdmin):
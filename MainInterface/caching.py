@@ -0,0 +1,40 @@
+from django.core.cache import cache
+
+# Version namespaces
+COURSE_PERFORMANCE = 'course_performance'
+WEIGHT_SCHEME = 'weight_scheme'
+STUDENT_RESULTS = 'student_results'
+STUDENT_ASSIGNMENTS = 'student_assignments'
+STUDENT_COURSES = 'student_courses'
+LECTURER_COURSES = 'lecturer_courses'
+ANNOUNCEMENTS = 'announcements'
+
+
+def _version_key(namespace, key):
+    return f'{namespace}:version:{key}'
+
+
+def get_version(namespace, key):
+    """Get the current data version for a cache namespace and key"""
+    version_key = _version_key(namespace, key)
+    cache.add(version_key, 1, None)
+    return cache.get(version_key, 1)
+
+
+def bump_version(namespace, key):
+    """Move a namespace key to a new version so entries built on the old one are ignored"""
+    version_key = _version_key(namespace, key)
+    cache.add(version_key, 1, None)
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(version_key, 2, None)
+        return 2
+
+
+def versioned_key(namespace, key, *parts):
+    """Build a cache key that changes whenever the namespace key is bumped"""
+    suffix = ':'.join(str(part) for part in parts)
+    versioned = f'{namespace}:{key}:v{get_version(namespace, key)}'
+    return f'{versioned}:{suffix}' if suffix else versioned
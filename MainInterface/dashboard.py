@@ -0,0 +1,311 @@
+from collections import defaultdict
+from functools import cached_property
+
+from django.urls import reverse
+
+from .caching import ANNOUNCEMENTS, STUDENT_ASSIGNMENTS, STUDENT_COURSES, STUDENT_RESULTS
+from .models import Announcement, Assignment, AssignmentSubmission, Course, Grade, UserProfile
+from .panels import get_cached_panel, get_panel, panel_placeholder
+
+# Announcements shown on the dashboard, most urgent first
+ANNOUNCEMENT_LIMIT = 3
+
+RECENT_GRADES_LIMIT = 5
+PENDING_ASSIGNMENTS_LIMIT = 5
+
+# Panel -> data version namespaces it is rendered from
+STUDENT_PANELS = {
+    'stats': [STUDENT_RESULTS, STUDENT_ASSIGNMENTS, STUDENT_COURSES],
+    'performance': [STUDENT_RESULTS, STUDENT_COURSES],
+    'assignments': [STUDENT_ASSIGNMENTS, STUDENT_COURSES],
+    'assignment_summary': [STUDENT_ASSIGNMENTS, STUDENT_COURSES],
+    'grades': [STUDENT_RESULTS],
+    'announcements': [ANNOUNCEMENTS, STUDENT_COURSES],
+}
+
+# Namespaces versioned for everyone rather than per student
+GLOBAL_NAMESPACES = [ANNOUNCEMENTS]
+
+
+class StudentDashboardData:
+    """Everything the student dashboard shows, loaded with a fixed number of queries
+
+    Each kind of data is read once for all enrolled courses and split per course
+    in Python, so the query count does not grow with the number of courses.
+    Data is loaded on first use, so panels served from cache cost nothing.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.profile = user.userprofile
+
+    @classmethod
+    def load(cls, user):
+        """Load the data of every panel"""
+        data = cls(user)
+        for name in STUDENT_PANELS:
+            data.panel_context(name)
+        return data
+
+    @cached_property
+    def enrolled_courses(self):
+        return list(Course.objects.filter(
+            enrollments__student=self.user,
+            enrollments__status='enrolled'
+        ))
+
+    @cached_property
+    def course_ids(self):
+        return [course.id for course in self.enrolled_courses]
+
+    @cached_property
+    def weights(self):
+        return Course.get_assessment_weights_for(self.enrolled_courses)
+
+    @cached_property
+    def grades(self):
+        return list(Grade.objects.filter(student=self.user).select_related('course').order_by('-date_graded'))
+
+    @cached_property
+    def current_gpa(self):
+        return self.profile.calculate_overall_gpa()
+
+    @cached_property
+    def final_marks(self):
+        """Attach final marks to each enrolled course from the same rows Course.compute_final_marks reads"""
+        rows_by_course = defaultdict(list)
+        for grade in self.grades:
+            rows_by_course[grade.course_id].append(
+                tuple(getattr(grade, field) for field in Course.FINAL_MARK_FIELDS)
+            )
+        for course in self.enrolled_courses:
+            roster = course.build_final_marks(rows_by_course[course.id], weights=self.weights[course.id])
+            marks = roster.get(self.user.id, Course.EMPTY_FINAL_MARK)
+            course.student_exam_mark = marks['exam_score']
+            course.student_cass_mark = marks['calculated_cass_mark']
+            course.student_final_mark = marks['final_mark'], marks['cass_mark'], marks['exam_mark']
+            course.student_letter_grade = marks['letter_grade']
+            course.student_is_passing = marks['is_passing']
+            course.student_gpa_points = marks['gpa_points']
+        return self.enrolled_courses
+
+    @cached_property
+    def grade_stats(self):
+        graded_count = sum(1 for grade in self.grades if grade.grade_value != 'I')
+        passing_grades = sum(1 for grade in self.grades if grade.grade_value in Grade.PASSING_GRADES)
+        return {
+            'total_grades': len(self.grades),
+            'graded_count': graded_count,
+            'ungraded_count': len(self.grades) - graded_count,
+            'passing_grades': passing_grades,
+            'pass_rate': round((passing_grades / graded_count) * 100, 1) if graded_count > 0 else 0,
+        }
+
+    @cached_property
+    def scored_grades(self):
+        return [grade for grade in self.grades if grade.numeric_score is not None]
+
+    @cached_property
+    def course_gpas(self):
+        gpa_by_course = Grade.objects.filter(course__in=self.course_ids).gpa_by_course(self.user)
+        return {
+            course.id: {
+                'gpa': gpa_by_course[course.id],
+                'course': course,
+                'weights': self.weights[course.id],
+                'exam_mark': course.student_exam_mark,
+            }
+            for course in self.final_marks if course.id in gpa_by_course
+        }
+
+    @cached_property
+    def assignments(self):
+        """Split published assignments of enrolled courses into pending, submitted and overdue"""
+        assignments = Assignment.objects.filter(
+            course__in=self.course_ids,
+            status='published'
+        ).select_related('course').order_by('due_date')
+        submission_map = {
+            submission.assignment_id: submission
+            for submission in AssignmentSubmission.objects.filter(student=self.user)
+        }
+
+        categories = {'pending': [], 'submitted': [], 'overdue': []}
+        for assignment in assignments:
+            submission = submission_map.get(assignment.id)
+            assignment.user_submission = submission
+
+            if submission and submission.status == 'submitted':
+                categories['submitted'].append(assignment)
+            elif assignment.is_overdue() and (not submission or submission.status == 'draft'):
+                categories['overdue'].append(assignment)
+            else:
+                categories['pending'].append(assignment)
+        return categories
+
+    @cached_property
+    def recent_announcements(self):
+        return Announcement.get_visible_for(self.user, ANNOUNCEMENT_LIMIT, course_ids=self.course_ids)
+
+    @property
+    def pending_assignments(self):
+        return self.assignments['pending']
+
+    def stats_context(self):
+        return {
+            'enrolled_courses_count': len(self.enrolled_courses),
+            'current_gpa': self.current_gpa or 'N/A',
+            'gpa_status': UserProfile.classify_gpa(self.current_gpa),
+            'pending_assignments_count': len(self.assignments['pending']),
+            'attendance_percentage': 85,  # Placeholder for attendance
+        }
+
+    def performance_context(self):
+        return {
+            'current_gpa': self.current_gpa or 'N/A',
+            'gpa_status': UserProfile.classify_gpa(self.current_gpa),
+            'semester_gpa': self.profile.get_semester_gpa('fall'),
+            'grade_stats': self.grade_stats,
+            'enrolled_courses': self.final_marks,
+            'course_gpas': self.course_gpas,
+        }
+
+    def assignments_context(self):
+        return {
+            'pending_assignments': self.assignments['pending'][:PENDING_ASSIGNMENTS_LIMIT],
+            'pending_assignments_count': len(self.assignments['pending']),
+        }
+
+    def assignment_summary_context(self):
+        return {
+            'pending_assignments_count': len(self.assignments['pending']),
+            'submitted_assignments_count': len(self.assignments['submitted']),
+            'overdue_assignments_count': len(self.assignments['overdue']),
+        }
+
+    def grades_context(self):
+        return {
+            'recent_grades': self.scored_grades[:RECENT_GRADES_LIMIT],
+            'total_grades_count': len(self.scored_grades),
+            'ungraded_count': len(self.grades) - len(self.scored_grades),
+            'current_gpa': self.current_gpa or 'N/A',
+        }
+
+    def announcements_context(self):
+        return {'recent_announcements': self.recent_announcements}
+
+    def panel_context(self, name):
+        return getattr(self, f'{name}_context')()
+
+    def panel_versions(self, name):
+        """Get the (namespace, key) data versions a panel is rendered from"""
+        if ANNOUNCEMENTS in STUDENT_PANELS[name]:
+            Announcement.invalidate_expired()
+        return [
+            (namespace, 'all' if namespace in GLOBAL_NAMESPACES else self.user.id)
+            for namespace in STUDENT_PANELS[name]
+        ]
+
+    def stats_data(self):
+        context = self.stats_context()
+        context['current_gpa'] = self.current_gpa
+        return context
+
+    def performance_data(self):
+        context = self.performance_context()
+        return {
+            'current_gpa': self.current_gpa,
+            'gpa_status': context['gpa_status'],
+            'semester_gpa': context['semester_gpa'],
+            'grade_stats': context['grade_stats'],
+            'courses': [
+                {
+                    'id': course.id,
+                    'course_code': course.course_code,
+                    'course_name': course.course_name,
+                    'exam_mark': course.student_exam_mark,
+                    'cass_mark': course.student_cass_mark,
+                    'final_mark': course.student_final_mark[0],
+                    'letter_grade': course.student_letter_grade,
+                    'is_passing': course.student_is_passing,
+                    'gpa_points': course.student_gpa_points,
+                    'gpa': self.course_gpas.get(course.id, {}).get('gpa'),
+                    'weights': self.weights[course.id],
+                }
+                for course in context['enrolled_courses']
+            ],
+        }
+
+    def assignments_data(self):
+        context = self.assignments_context()
+        return {
+            'pending_assignments': [
+                {
+                    'id': assignment.id,
+                    'title': assignment.title,
+                    'course_code': assignment.course.course_code,
+                    'course_name': assignment.course.course_name,
+                    'due_date': assignment.due_date,
+                    'days_until_due': assignment.days_until_due(),
+                    'is_overdue': assignment.is_overdue(),
+                    'has_draft': assignment.user_submission is not None,
+                    'url': reverse('submit_assignment', args=[assignment.id]),
+                }
+                for assignment in context['pending_assignments']
+            ],
+            'pending_assignments_count': context['pending_assignments_count'],
+        }
+
+    def assignment_summary_data(self):
+        return self.assignment_summary_context()
+
+    def grades_data(self):
+        context = self.grades_context()
+        return {
+            'recent_grades': [
+                {
+                    'id': grade.id,
+                    'course_code': grade.course.course_code,
+                    'grade_type': grade.grade_type,
+                    'description': grade.description or grade.get_grade_type_display(),
+                    'numeric_score': grade.numeric_score,
+                    'max_points': grade.max_points,
+                    'grade_value': grade.grade_value,
+                    'date_graded': grade.date_graded,
+                }
+                for grade in context['recent_grades']
+            ],
+            'total_grades_count': context['total_grades_count'],
+            'ungraded_count': context['ungraded_count'],
+            'current_gpa': self.current_gpa,
+        }
+
+    def announcements_data(self):
+        return {
+            'recent_announcements': [
+                {
+                    'id': announcement.id,
+                    'title': announcement.title,
+                    'content': announcement.content,
+                    'priority': announcement.priority,
+                    'course_code': announcement.course.course_code if announcement.course else None,
+                    'created_at': announcement.created_at,
+                }
+                for announcement in self.recent_announcements
+            ],
+        }
+
+    def get_panel(self, request, name, panel_format='html'):
+        """Get a panel as an HTML fragment or JSON payload, and whether it came from cache"""
+        build = getattr(self, f'{name}_context' if panel_format == 'html' else f'{name}_data')
+        return get_panel(request, f'student_{name}', self.panel_versions(name), build, panel_format)
+
+    def shell_panels(self, request):
+        """Inline the panels already cached; the rest load from their own endpoints"""
+        panels = {}
+        for name in STUDENT_PANELS:
+            html = get_cached_panel(request, f'student_{name}', self.panel_versions(name))
+            panels[name] = html if html is not None else panel_placeholder(
+                reverse('student_dashboard_panel', args=[name])
+            )
+        return panels
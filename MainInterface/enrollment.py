@@ -0,0 +1,143 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Course, Enrollment, EnrollmentRequest, WaitlistPromotion
+
+
+def enroll_student(student, course_id):
+    """Enroll a student in a course, or waitlist them once it is full
+
+    The capacity check and the insert run in one transaction holding the course
+    row lock (on SQLite, the database write lock taken when the transaction
+    starts), so concurrent requests cannot overfill a course. Returns
+    (enrollment, created); an existing enrollment is returned unchanged.
+    """
+    with transaction.atomic():
+        course = Course.objects.select_for_update().get(pk=course_id)
+        existing = Enrollment.objects.filter(student=student, course=course).first()
+        if existing:
+            return existing, False
+
+        # The counters were read under the lock, so they are current. Students
+        # already waiting keep their place: a newcomer joins the back of the
+        # waitlist and the open seat goes to its head once this commits.
+        has_seat = course.enrolled_count < course.max_students and not course.waitlist_count
+        status = 'enrolled' if has_seat else 'waitlisted'
+        try:
+            with transaction.atomic():
+                enrollment = Enrollment.objects.create(student=student, course=course, status=status)
+        except IntegrityError:
+            # Another request for the same student won the unique constraint
+            return Enrollment.objects.get(student=student, course=course), False
+    return enrollment, True
+
+
+def queue_enrollment(student, course_id):
+    """Queue an enroll request for the worker and return it
+
+    This is a single short insert that never waits on the course lock, so the
+    request is acknowledged straight away. A request already queued for the
+    same course is returned instead of adding another.
+    """
+    queued = EnrollmentRequest.objects.filter(student=student, course_id=course_id, status='queued').first()
+    if queued:
+        return queued
+    return EnrollmentRequest.objects.create(student=student, course_id=course_id)
+
+
+def process_enrollment_requests(course_id, batch_size=100):
+    """Apply the oldest queued enroll requests of one course and return how many were applied
+
+    The batch is applied in one transaction holding the course lock, with the
+    same capacity and waitlist rules as enroll_student. Enrollments are written
+    with one bulk insert and the derived counts updated once per batch, which
+    keeps the write lock short while the queue is long.
+    """
+    with transaction.atomic():
+        course = Course.objects.select_for_update().filter(pk=course_id).first()
+        requests = list(EnrollmentRequest.objects.filter(course_id=course_id, status='queued')[:batch_size])
+        if course is None or not requests:
+            return 0
+
+        enrollments = {
+            enrollment.student_id: enrollment
+            for enrollment in Enrollment.objects.filter(
+                course=course, student_id__in=[enrollment_request.student_id for enrollment_request in requests]
+            )
+        }
+        # As in enroll_student, nobody is seated ahead of students already waiting
+        seats = 0 if course.waitlist_count else course.max_students - course.enrolled_count
+        added = []
+        for enrollment_request in requests:
+            if enrollment_request.student_id in enrollments:
+                enrollment_request.status = 'existing'
+                continue
+            status = 'enrolled' if seats > 0 else 'waitlisted'
+            seats -= status == 'enrolled'
+            # The student's place in line is when they asked, not when the worker got to it
+            enrollment = Enrollment(
+                student_id=enrollment_request.student_id,
+                course=course,
+                status=status,
+                enrollment_date=enrollment_request.requested_at,
+            )
+            enrollments[enrollment_request.student_id] = enrollment
+            enrollment_request.status = status
+            added.append(enrollment)
+
+        Enrollment.objects.bulk_create(added)
+        Enrollment.sync_bulk_changes(course_id, [enrollment.student_id for enrollment in added])
+        if course.waitlist_count and course.enrolled_count < course.max_students:
+            WaitlistPromotion.schedule(course_id, 'seat_open')
+
+        now = timezone.now()
+        for enrollment_request in requests:
+            enrollment_request.enrollment = enrollments[enrollment_request.student_id]
+            enrollment_request.processed_at = now
+        EnrollmentRequest.objects.bulk_update(requests, ['enrollment', 'status', 'processed_at'])
+    return len(requests)
+
+
+# Bulk action -> (statuses it applies to, status it sets; None removes the enrollment)
+ENROLLMENT_ACTIONS = {
+    'approve': (['pending', 'waitlisted'], 'enrolled'),
+    'reactivate': (['rejected', 'dropped'], 'enrolled'),
+    'reject': (['pending', 'waitlisted'], 'rejected'),
+    'unenroll': (None, None),
+}
+
+
+def apply_enrollment_action(course_id, enrollment_ids, action):
+    """Approve, reactivate, reject or remove many enrollments of one course at once
+
+    Runs in one transaction holding the course lock. Capacity is checked once:
+    approvals fill the free seats in enrollment order and the rest are left as
+    they were. Returns (applied, skipped) lists of enrollments; skipped ones
+    did not fit in the course.
+    """
+    statuses, new_status = ENROLLMENT_ACTIONS[action]
+    with transaction.atomic():
+        course = Course.objects.select_for_update().get(pk=course_id)
+        enrollments = Enrollment.objects.filter(course=course, id__in=enrollment_ids).select_related('student')
+        if statuses:
+            enrollments = enrollments.filter(status__in=statuses)
+        enrollments = list(enrollments.order_by('enrollment_date', 'id'))
+
+        if new_status is None:
+            # Deleted one by one through the signals, which also hand the freed seats to the waitlist
+            Enrollment.objects.filter(pk__in=[enrollment.pk for enrollment in enrollments]).delete()
+            return enrollments, []
+
+        skipped = []
+        if new_status == 'enrolled':
+            seats = max(0, course.max_students - course.enrolled_count)
+            enrollments, skipped = enrollments[:seats], enrollments[seats:]
+
+        now = timezone.now()
+        for enrollment in enrollments:
+            enrollment.status = new_status
+            enrollment.last_updated = now
+        Enrollment.objects.bulk_update(enrollments, ['status', 'last_updated'])
+        # bulk_update() sends no signals, so the counters are brought up to date here
+        Enrollment.sync_bulk_changes(course.id, [enrollment.student_id for enrollment in enrollments])
+    return enrollments, skipped
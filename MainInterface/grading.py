@@ -0,0 +1,87 @@
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Case, CharField, Value, When
+from django.db.models.lookups import GreaterThanOrEqual, IsNull
+from django.dispatch import receiver
+
+# Lowest percentage that earns each letter; anything below the last one fails
+DEFAULT_BOUNDARIES = [
+    ('A+', 90),
+    ('A', 85),
+    ('A-', 80),
+    ('B+', 77),
+    ('B', 73),
+    ('B-', 70),
+    ('C+', 67),
+    ('C', 63),
+    ('C-', 60),
+    ('D+', 57),
+    ('D', 53),
+    ('D-', 50),
+]
+FAILING_LETTER = 'F'
+
+
+class GradingScale:
+    """Percentage to letter grade conversion shared by Python code and SQL queries"""
+
+    def __init__(self, boundaries=DEFAULT_BOUNDARIES, failing_letter=FAILING_LETTER):
+        ordered = sorted(boundaries, key=lambda boundary: boundary[1])
+        self.boundaries = [minimum for letter, minimum in ordered]
+        self.letters = [failing_letter] + [letter for letter, minimum in ordered]
+        self.failing_letter = failing_letter
+
+    def letter_for(self, percentage):
+        """Get the letter grade for a percentage"""
+        return self.letters[bisect_right(self.boundaries, percentage)]
+
+    def case_expression(self, percentage):
+        """Build a Case expression that maps a percentage expression to a letter in SQL"""
+        whens = [When(IsNull(percentage, True), then=Value(None))]
+        for minimum, letter in sorted(zip(self.boundaries, self.letters[1:]), reverse=True):
+            whens.append(When(GreaterThanOrEqual(percentage, minimum), then=Value(letter)))
+        return Case(*whens, default=Value(self.failing_letter), output_field=CharField())
+
+
+_scales = {}
+
+
+def get_grading_scale(course=None):
+    """Get the grading scale for a course
+
+    settings.GRADING_SCALES can map a course code or a course level to a list
+    of (letter, minimum percentage) boundaries. A course code takes precedence
+    over its level, and everything else uses the default scale.
+    """
+    if not _scales:
+        _scales['default'] = GradingScale()
+        for key, boundaries in getattr(settings, 'GRADING_SCALES', {}).items():
+            _scales[key] = GradingScale(boundaries)
+
+    if course is not None and len(_scales) > 1:
+        for key in (course.course_code, course.level):
+            if key in _scales:
+                return _scales[key]
+    return _scales['default']
+
+
+def course_case_expression(percentage, course_code='course__course_code', level='course__level'):
+    """Build a Case expression that maps a percentage to a letter on the scale of each row's course
+
+    Picks scales the way get_grading_scale() does, so SQL and Python letters agree.
+    """
+    default = get_grading_scale().case_expression(percentage)
+    configured = [(key, scale) for key, scale in _scales.items() if key != 'default']
+    if not configured:
+        return default
+    whens = [When(**{course_code: key}, then=scale.case_expression(percentage)) for key, scale in configured]
+    whens += [When(**{level: key}, then=scale.case_expression(percentage)) for key, scale in configured]
+    return Case(*whens, default=default, output_field=CharField())
+
+
+@receiver(setting_changed)
+def reset_grading_scales(setting, **kwargs):
+    if setting == 'GRADING_SCALES':
+        _scales.clear()
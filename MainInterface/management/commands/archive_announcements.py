@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from MainInterface.models import Announcement, AnnouncementArchive
+
+class Command(BaseCommand):
+    help = ('Deactivate expired announcements and move old inactive ones to the archive. '
+            'Safe to run periodically (e.g. from cron) while the site is in use.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report how many rows would be expired and archived, without writing')
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ANNOUNCEMENT_RETENTION_DAYS', 180),
+                            help='Archive inactive announcements unchanged for this many days')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Announcements moved per transaction, to keep write locks short')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['days'])
+
+        if options['check']:
+            expired = Announcement.objects.filter(is_active=True, expires_at__lt=now).count()
+            archivable = Announcement.objects.filter(is_active=False, updated_at__lt=cutoff).count()
+            style = self.style.WARNING if expired or archivable else self.style.SUCCESS
+            self.stdout.write(style(f'{expired} announcements to expire, {archivable} to archive.'))
+            return
+
+        expired = Announcement.deactivate_expired()
+        self.stdout.write(f'Expired {expired} announcements.')
+
+        archived = 0
+        while True:
+            moved = AnnouncementArchive.archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+        self.stdout.write(f'Archived {archived} announcements older than {options["days"]} days.')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Touched {expired + archived} rows in {elapsed:.2f}s; '
+            f'{Announcement.objects.count()} announcements left in the live table.'
+        ))
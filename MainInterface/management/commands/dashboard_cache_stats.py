@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from MainInterface.panels import get_panel_stats, panel_stats_shared, reset_panel_stats
+
+class Command(BaseCommand):
+    help = 'Show fragment cache hits and misses of each dashboard panel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        if not panel_stats_shared():
+            raise CommandError(
+                'The cache backend is local to each process, so the web workers\' counters cannot be read '
+                'from here. Configure a shared cache (Redis/Memcached) in CACHES.'
+            )
+
+        total_hits = total_misses = 0
+        for name, stats in get_panel_stats().items():
+            total_hits += stats['hits']
+            total_misses += stats['misses']
+            hit_rate = f"{stats['hit_rate']}%" if stats['hit_rate'] is not None else 'n/a'
+            self.stdout.write(f"{name}: {stats['hits']} hits, {stats['misses']} misses ({hit_rate})")
+
+        requests = total_hits + total_misses
+        hit_rate = f'{round(total_hits / requests * 100, 1)}%' if requests else 'n/a'
+        self.stdout.write(self.style.SUCCESS(f'Total: {total_hits} hits, {total_misses} misses ({hit_rate})'))
+
+        if options['reset']:
+            reset_panel_stats()
+            self.stdout.write('Counters reset.')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from MainInterface.models import Announcement, AnnouncementDelivery
+
+class Command(BaseCommand):
+    help = 'Backfill announcement inboxes from each audience, or check them for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report announcements whose inbox rows differ from the audience, without writing')
+
+    def handle(self, *args, **options):
+        announcements = Announcement.objects.select_related('course').order_by('id')
+
+        drifted = added_total = removed_total = 0
+        for announcement in announcements:
+            if options['check']:
+                recipients = announcement.recipients()
+                delivered = AnnouncementDelivery.objects.filter(announcement=announcement)
+                added = recipients.exclude(pk__in=delivered.values('user')).count()
+                removed = delivered.exclude(user__in=recipients).count()
+            else:
+                added, removed = AnnouncementDelivery.deliver(announcement)
+
+            if added or removed:
+                drifted += 1
+                added_total += added
+                removed_total += removed
+                self.stdout.write(f'{announcement.title}: {added} missing, {removed} no longer in the audience')
+
+        if options['check']:
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {len(announcements)} announcements, {drifted} out of date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Delivered {len(announcements)} announcements: {added_total} rows added, {removed_total} removed.'
+            ))
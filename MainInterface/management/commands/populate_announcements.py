@@ -2,7 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from MainInterface.models import Announcement, Course, UserProfile
+from MainInterface.models import Announcement, AnnouncementDelivery, Course, UserProfile
 
 class Command(BaseCommand):
     help = 'Populate the database with sample announcements'
@@ -122,6 +122,7 @@ class Command(BaseCommand):
                 created_at=created_at,
                 **announcement_data
             )
+            AnnouncementDelivery.deliver(announcement)
             created_count += 1
         
         self.stdout.write(
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from MainInterface.enrollment import process_enrollment_requests
+from MainInterface.models import EnrollmentRequest
+
+class Command(BaseCommand):
+    help = ('Apply enroll requests queued in registration rush mode. Runs until stopped, '
+            'or with --once until the queue is empty.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Courses drained in parallel')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Requests applied per transaction')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait between rounds, letting requests build up into batches')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def drain(self, course_id, batch_size):
+        try:
+            processed = 0
+            while True:
+                applied = process_enrollment_requests(course_id, batch_size)
+                processed += applied
+                if applied < batch_size:
+                    return processed
+        finally:
+            # Each worker thread has its own connection
+            connection.close()
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                course_ids = list(
+                    EnrollmentRequest.objects.filter(status='queued').order_by().values_list('course_id', flat=True).distinct()
+                )
+                if course_ids:
+                    start = time.perf_counter()
+                    processed = sum(pool.map(lambda course_id: self.drain(course_id, options['batch_size']), course_ids))
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'Processed {processed} requests for {len(course_ids)} courses in {elapsed:.2f}s.')
+                elif options['once']:
+                    break
+                # Let requests build up between rounds so they are applied in batches
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Enrollment queue is empty.'))
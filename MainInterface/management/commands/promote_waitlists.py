@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from MainInterface.models import WaitlistPromotion
+
+class Command(BaseCommand):
+    help = 'Move waitlisted students into the free seats of their courses, longest waiting first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report courses with free seats and a waitlist, without promoting')
+        parser.add_argument('--course', help='Limit to one course code')
+
+    def handle(self, *args, **options):
+        courses = WaitlistPromotion.pending_courses().order_by('course_code')
+        if options['course']:
+            courses = courses.filter(course_code=options['course'])
+
+        promoted = 0
+        for course in courses:
+            seats = course.max_students - course.enrolled_count
+            if options['check']:
+                self.stdout.write(f'{course.course_code}: {seats} free seats, {course.waitlist_count} waiting')
+                continue
+            promotions = WaitlistPromotion.promote(course.id, 'sweep')
+            promoted += len(promotions)
+            self.stdout.write(f'{course.course_code}: promoted {len(promotions)}')
+
+        if options['check']:
+            style = self.style.WARNING if courses else self.style.SUCCESS
+            self.stdout.write(style(f'{len(courses)} courses have students waiting for free seats.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Promoted {promoted} students in {len(courses)} courses.'))
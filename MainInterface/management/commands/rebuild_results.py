@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from MainInterface.models import Course, Grade, StudentCourseResult, StudentTermResult
+
+class Command(BaseCommand):
+    help = 'Backfill stored student course and term results from grades, or check them for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report results that differ from the grades, without writing')
+        parser.add_argument('--course', help='Limit to one course code')
+        parser.add_argument('--student', help='Limit to one student username')
+
+    def handle(self, *args, **options):
+        pairs = Grade.objects.values_list('student_id', 'course_id').distinct()
+        stored = StudentCourseResult.objects.all()
+
+        if options['course']:
+            pairs = pairs.filter(course__course_code=options['course'])
+            stored = stored.filter(course__course_code=options['course'])
+        if options['student']:
+            pairs = pairs.filter(student__username=options['student'])
+            stored = stored.filter(student__username=options['student'])
+
+        pairs = set(pairs)
+        students = User.objects.select_related('userprofile').in_bulk({student_id for student_id, _ in pairs})
+        courses = Course.objects.in_bulk({course_id for _, course_id in pairs})
+        stored = {(r.student_id, r.course_id): r for r in stored}
+
+        drifted = 0
+        for student_id, course_id in sorted(pairs):
+            student, course = students[student_id], courses[course_id]
+            values = StudentCourseResult.compute(student, course)
+            result = stored.get((student_id, course_id))
+
+            differences = []
+            if result is None:
+                differences.append('missing')
+            else:
+                for field in StudentCourseResult.RESULT_FIELDS:
+                    if getattr(result, field) != values[field]:
+                        differences.append(f'{field}: {getattr(result, field)} != {values[field]}')
+
+            if differences:
+                drifted += 1
+                self.stdout.write(f'{student.username} - {course.course_code}: {", ".join(differences)}')
+                if not options['check']:
+                    StudentCourseResult.objects.update_or_create(student=student, course=course, defaults=values)
+
+        # Results left behind after all of a student's grades were removed
+        orphaned = [key for key in stored if key not in pairs]
+        for key in orphaned:
+            result = stored[key]
+            self.stdout.write(f'{result.student.username} - {result.course.course_code}: no grades')
+        if orphaned and not options['check']:
+            StudentCourseResult.objects.filter(pk__in=[stored[key].pk for key in orphaned]).delete()
+
+        # Term history of every student touched above, built from the stored results
+        student_ids = {student_id for student_id, _ in pairs} | {student_id for student_id, _ in orphaned}
+        expected_terms = StudentTermResult.compute_students(student_ids)
+        stored_terms = {
+            (term.student_id, term.year, term.semester): term
+            for term in StudentTermResult.objects.filter(student__in=student_ids).select_related('student')
+        }
+        terms_drifted = 0
+        for key in sorted(set(expected_terms) | set(stored_terms)):
+            term, values = stored_terms.get(key), expected_terms.get(key)
+            if term is None or values is None or any(getattr(term, field) != values[field] for field in StudentTermResult.RESULT_FIELDS):
+                terms_drifted += 1
+                state = 'missing' if term is None else 'no graded courses' if values is None else 'out of date'
+                self.stdout.write(f'Term {key[2]} {key[1]} of student {key[0]}: {state}')
+        if terms_drifted and not options['check']:
+            StudentTermResult.refresh_students(student_ids)
+
+        total_drift = drifted + len(orphaned)
+        if options['check']:
+            style = self.style.WARNING if total_drift or terms_drifted else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {len(pairs)} results, {total_drift} out of date.'))
+            self.stdout.write(style(f'Checked {len(expected_terms)} terms, {terms_drifted} out of date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_drift} of {len(pairs)} results.'))
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {terms_drifted} terms.'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from MainInterface.models import Course
+from MainInterface.search import SEARCH_FIELDS, index_courses, indexed_courses, search_backend, unindex_courses
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite full-text index of the course catalogue and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report courses that differ from the index, without writing')
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend == 'postgres':
+            self.stdout.write(self.style.SUCCESS('The PostgreSQL search column is generated, nothing to rebuild.'))
+            return
+        if backend != 'fts5':
+            raise CommandError('No search index found, run migrate first.')
+
+        courses = {course.id: course for course in Course.objects.only('id', *SEARCH_FIELDS)}
+        indexed = indexed_courses()
+        stale = [
+            course for course_id, course in courses.items()
+            if indexed.get(course_id) != tuple(getattr(course, field) for field in SEARCH_FIELDS)
+        ]
+        orphans = [course_id for course_id in indexed if course_id not in courses]
+        for course in stale:
+            self.stdout.write(f'{course.course_code}: {"stale" if course.id in indexed else "missing"}')
+        for course_id in orphans:
+            self.stdout.write(f'course {course_id}: deleted but still indexed')
+
+        drift = len(stale) + len(orphans)
+        if options['check']:
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {len(courses)} courses, {drift} out of date.'))
+            return
+        index_courses(stale)
+        unindex_courses(orphans)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(courses)} courses, {drift} had drifted.'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from MainInterface.models import LecturerDashboardCounters, UserProfile
+
+class Command(BaseCommand):
+    help = 'Recount lecturer dashboard counters from the database and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report counters that differ from the database, without writing')
+        parser.add_argument('--lecturer', help='Limit to one lecturer username')
+
+    def handle(self, *args, **options):
+        lecturers = UserProfile.objects.filter(user_type='lecturer').select_related('user', 'dashboard_counters')
+        if options['lecturer']:
+            lecturers = lecturers.filter(user__username=options['lecturer'])
+
+        drifted = 0
+        for lecturer in lecturers:
+            try:
+                counters = lecturer.dashboard_counters
+            except LecturerDashboardCounters.DoesNotExist:
+                counters = LecturerDashboardCounters(lecturer=lecturer)
+
+            if options['check']:
+                values = LecturerDashboardCounters.compute(lecturer.id)
+                drift = {
+                    field: (getattr(counters, field), values[field])
+                    for field in LecturerDashboardCounters.COUNTER_FIELDS if getattr(counters, field) != values[field]
+                }
+            else:
+                drift = counters.reconcile()
+
+            if drift:
+                drifted += 1
+                details = ', '.join(f'{field}: {stored} != {actual}' for field, (stored, actual) in drift.items())
+                self.stdout.write(f'{lecturer.user.username}: {details}')
+
+        if options['check']:
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {len(lecturers)} lecturers, {drifted} out of date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(lecturers)} lecturers, {drifted} had drifted.'))
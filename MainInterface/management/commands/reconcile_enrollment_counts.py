@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from MainInterface.models import Course
+
+class Command(BaseCommand):
+    help = 'Recount the enrollment counters stored on each course and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report counters that differ from the enrollments, without writing')
+        parser.add_argument('--course', help='Limit to one course code')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course']:
+            courses = courses.filter(course_code=options['course'])
+        codes = dict(courses.values_list('id', 'course_code'))
+
+        drift = Course.reconcile_enrollment_counts(list(codes), check=options['check'])
+        for course_id, fields in sorted(drift.items()):
+            details = ', '.join(f'{field}: {stored} != {actual}' for field, (stored, actual) in fields.items())
+            self.stdout.write(f'{codes[course_id]}: {details}')
+
+        if options['check']:
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(f'Checked {len(codes)} courses, {len(drift)} out of date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(codes)} courses, {len(drift)} had drifted.'))
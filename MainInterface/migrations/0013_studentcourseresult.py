@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0012_course_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='grade',
+            name='grade_type',
+            field=models.CharField(choices=[('assignment', 'Assignment'), ('quiz', 'Quiz'), ('midterm', 'Midterm Exam'), ('final', 'Final Exam'), ('project', 'Project'), ('participation', 'Participation'), ('cass_mark', 'CASS MARK'), ('exam_mark', 'Exam Mark'), ('final_grade', 'Final Course Grade')], default='assignment', max_length=15),
+        ),
+        migrations.CreateModel(
+            name='StudentCourseResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course_gpa', models.FloatField(blank=True, null=True)),
+                ('credits', models.IntegerField(default=0)),
+                ('cass_mark', models.FloatField(blank=True, null=True)),
+                ('exam_mark', models.FloatField(blank=True, null=True)),
+                ('final_mark', models.FloatField(blank=True, null=True)),
+                ('letter_grade', models.CharField(blank=True, max_length=3)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_results', to='MainInterface.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Student Course Result',
+                'verbose_name_plural': 'Student Course Results',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def seed_weight_schemes(apps, schema_editor):
+    """Create scheme rows for assessment types whose grades already share one weight"""
+    Grade = apps.get_model('MainInterface', 'Grade')
+    AssessmentWeightScheme = apps.get_model('MainInterface', 'AssessmentWeightScheme')
+    
+    # Types with mixed per-grade weights keep using the weight stored on each grade
+    weights = Grade.objects.order_by().values('course', 'grade_type').annotate(
+        min_weight=Min('weight'),
+        max_weight=Max('weight')
+    )
+    AssessmentWeightScheme.objects.bulk_create([
+        AssessmentWeightScheme(
+            course_id=row['course'],
+            grade_type=row['grade_type'],
+            weight=row['min_weight']
+        )
+        for row in weights
+        if row['min_weight'] is not None and row['min_weight'] == row['max_weight']
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0013_studentcourseresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentWeightScheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade_type', models.CharField(choices=[('assignment', 'Assignment'), ('quiz', 'Quiz'), ('midterm', 'Midterm Exam'), ('final', 'Final Exam'), ('project', 'Project'), ('participation', 'Participation'), ('cass_mark', 'CASS MARK'), ('exam_mark', 'Exam Mark'), ('final_grade', 'Final Course Grade')], max_length=15)),
+                ('weight', models.DecimalField(decimal_places=2, help_text='Weight of this assessment type in final calculation', max_digits=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weight_scheme', to='MainInterface.course')),
+            ],
+            options={
+                'verbose_name': 'Assessment Weight',
+                'verbose_name_plural': 'Assessment Weights',
+                'ordering': ['grade_type'],
+                'unique_together': {('course', 'grade_type')},
+            },
+        ),
+        migrations.RunPython(seed_weight_schemes, migrations.RunPython.noop),
+    ]
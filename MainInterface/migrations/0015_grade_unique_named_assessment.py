@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rename_duplicate_assessments(apps, schema_editor):
+    """Number repeated assessment names so existing rows satisfy the new constraint"""
+    Grade = apps.get_model('MainInterface', 'Grade')
+    
+    seen = set()
+    duplicates = []
+    for grade in Grade.objects.exclude(description='').order_by('date_graded', 'id'):
+        key = (grade.student_id, grade.course_id, grade.grade_type, grade.description)
+        if key in seen:
+            duplicates.append(grade)
+        else:
+            seen.add(key)
+    
+    # Keep the oldest row's name and number the later ones, e.g. "Quiz 1 (2)"
+    for grade in duplicates:
+        number = 2
+        while True:
+            suffix = f' ({number})'
+            description = grade.description[:200 - len(suffix)] + suffix
+            key = (grade.student_id, grade.course_id, grade.grade_type, description)
+            if key not in seen:
+                break
+            number += 1
+        seen.add(key)
+        grade.description = description
+        grade.save(update_fields=['description'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0014_assessmentweightscheme'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_assessments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='grade',
+            constraint=models.UniqueConstraint(condition=models.Q(('description', ''), _negated=True), fields=('student', 'course', 'grade_type', 'description'), name='unique_named_assessment_per_student'),
+        ),
+    ]
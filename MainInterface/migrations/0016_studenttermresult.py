@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0015_grade_unique_named_assessment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentTermResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semester', models.CharField(choices=[('spring', 'Spring'), ('summer', 'Summer'), ('fall', 'Fall'), ('winter', 'Winter')], max_length=20)),
+                ('year', models.IntegerField()),
+                ('term_order', models.IntegerField(help_text='Sortable term key: year * 10 + semester position')),
+                ('credits_attempted', models.IntegerField(default=0)),
+                ('credits_earned', models.IntegerField(default=0)),
+                ('grade_points', models.FloatField(default=0)),
+                ('term_gpa', models.FloatField(blank=True, null=True)),
+                ('cumulative_gpa', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Student Term Result',
+                'verbose_name_plural': 'Student Term Results',
+                'ordering': ['term_order'],
+                'indexes': [models.Index(fields=['student', 'term_order'], name='MainInterfa_student_0f353c_idx')],
+                'unique_together': {('student', 'year', 'semester')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0016_studenttermresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LecturerDashboardCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_courses', models.IntegerField(default=0)),
+                ('total_students', models.IntegerField(default=0)),
+                ('pending_submissions', models.IntegerField(default=0)),
+                ('upcoming_classes', models.IntegerField(default=0)),
+                ('upcoming_refresh_at', models.DateTimeField(blank=True, help_text='When a class next enters or leaves the upcoming window', null=True)),
+                ('reconciled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lecturer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_counters', to='MainInterface.userprofile')),
+            ],
+            options={
+                'verbose_name': 'Lecturer Dashboard Counters',
+                'verbose_name_plural': 'Lecturer Dashboard Counters',
+            },
+        ),
+    ]
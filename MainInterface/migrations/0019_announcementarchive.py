@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0018_announcementdelivery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('announcement_id', models.BigIntegerField(help_text='Id the announcement had while live', unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('content', models.TextField()),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], max_length=10)),
+                ('audience', models.CharField(choices=[('all', 'All Users'), ('students', 'Students Only'), ('lecturers', 'Lecturers Only'), ('course_specific', 'Course Specific')], max_length=20)),
+                ('is_pinned', models.BooleanField(default=False)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_announcements', to=settings.AUTH_USER_MODEL)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_announcements', to='MainInterface.course')),
+            ],
+            options={
+                'verbose_name': 'Announcement Archive',
+                'verbose_name_plural': 'Announcement Archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:42
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_enrollments(apps, schema_editor):
+    """Fill the new counters from the existing enrollments"""
+    Course = apps.get_model('MainInterface', 'Course')
+    counts = Course.objects.annotate(
+        enrolled=Count('enrollments', filter=Q(enrollments__status='enrolled')),
+        pending=Count('enrollments', filter=Q(enrollments__status='pending')),
+        waitlisted=Count('enrollments', filter=Q(enrollments__status='waitlisted')),
+    ).values_list('id', 'enrolled', 'pending', 'waitlisted')
+    for course_id, enrolled, pending, waitlisted in counts:
+        Course.objects.filter(pk=course_id).update(
+            enrolled_count=enrolled, pending_count=pending, waitlist_count=waitlisted
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0019_announcementarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrolled_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='pending_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='waitlist_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_enrollments, migrations.RunPython.noop),
+    ]
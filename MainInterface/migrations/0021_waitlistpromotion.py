@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0020_course_enrollment_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistPromotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('seat_freed', 'Seat Freed'), ('capacity_raised', 'Capacity Raised'), ('seat_open', 'Seat Already Open'), ('sweep', 'Scheduled Sweep')], max_length=20)),
+                ('waitlisted_at', models.DateTimeField(help_text='When the student joined the waitlist')),
+                ('promoted_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_promotions', to='MainInterface.course')),
+                ('enrollment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promotions', to='MainInterface.enrollment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_promotions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Waitlist Promotion',
+                'verbose_name_plural': 'Waitlist Promotions',
+                'ordering': ['-promoted_at'],
+            },
+        ),
+    ]
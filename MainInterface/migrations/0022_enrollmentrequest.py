@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0021_waitlistpromotion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('enrolled', 'Enrolled'), ('waitlisted', 'Waitlisted'), ('existing', 'Already Has Enrollment')], default='queued', max_length=15)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_requests', to='MainInterface.course')),
+                ('enrollment', models.ForeignKey(blank=True, help_text='Enrollment the request resolved to', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requests', to='MainInterface.enrollment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Enrollment Request',
+                'verbose_name_plural': 'Enrollment Requests',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['course', 'status'], name='MainInterfa_course__8cc4c1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0022_enrollmentrequest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enrollment',
+            name='status',
+            field=models.CharField(choices=[('enrolled', 'Enrolled'), ('pending', 'Pending Approval'), ('waitlisted', 'Waitlisted'), ('dropped', 'Dropped'), ('completed', 'Completed'), ('rejected', 'Rejected')], default='pending', max_length=15),
+        ),
+    ]
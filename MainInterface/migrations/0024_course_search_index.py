@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index of the course catalogue and fill it from the existing courses"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE maininterface_course_search USING fts5("
+            "course_code, course_name, description, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        # Rank a code match above a name match above a description match
+        schema_editor.execute(
+            "INSERT INTO maininterface_course_search (maininterface_course_search, rank) "
+            "VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')"
+        )
+        schema_editor.execute(
+            'INSERT INTO maininterface_course_search (rowid, course_code, course_name, description) '
+            'SELECT id, course_code, course_name, description FROM "MainInterface_course"'
+        )
+    elif vendor == 'postgresql':
+        # A generated column keeps itself up to date, so PostgreSQL needs no signals
+        schema_editor.execute(
+            'ALTER TABLE "MainInterface_course" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ('
+            "setweight(to_tsvector('simple', coalesce(course_code, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(course_name, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED"
+        )
+        schema_editor.execute(
+            'CREATE INDEX maininterface_course_search_idx ON "MainInterface_course" USING GIN (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS maininterface_course_search')
+    elif vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE "MainInterface_course" DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0023_enrollment_rejected_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Course.get_default_weights() at the time of this migration
+DEFAULT_WEIGHTS = {
+    'assignment': 30.0,
+    'quiz': 20.0,
+    'midterm': 20.0,
+    'final': 25.0,
+    'project': 15.0,
+    'participation': 5.0,
+}
+
+
+def seed_default_weights(apps, schema_editor):
+    """Give courses with neither grades nor a weight scheme the default weights, as new courses get"""
+    Course = apps.get_model('MainInterface', 'Course')
+    AssessmentWeightScheme = apps.get_model('MainInterface', 'AssessmentWeightScheme')
+    
+    # Courses with grades keep their per-grade weights until a lecturer configures them
+    courses = Course.objects.filter(grades__isnull=True, weight_scheme__isnull=True).values_list('id', flat=True)
+    AssessmentWeightScheme.objects.bulk_create([
+        AssessmentWeightScheme(course_id=course_id, grade_type=grade_type, weight=weight)
+        for course_id in courses
+        for grade_type, weight in DEFAULT_WEIGHTS.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MainInterface', '0024_course_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_default_weights, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
+from django.db.models import Case, When, Value, F, Q, Sum, Avg, Count, Min, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.core.cache import cache
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from datetime import timedelta
+import hashlib
+from .grading import course_case_expression, get_grading_scale
+from .search import index_courses, unindex_courses
+from .caching import (
+    ANNOUNCEMENTS, COURSE_PERFORMANCE, LECTURER_COURSES, STUDENT_ASSIGNMENTS, STUDENT_COURSES, STUDENT_RESULTS,
+    WEIGHT_SCHEME, bump_version, versioned_key,
+)
 
 # Create your models here.
 
@@ -66,64 +78,44 @@ class UserProfile(models.Model):
         if self.user_type != 'student':
             return None
         
-        # Get all grades for this course (excluding incomplete, withdrawal)
-        grades = Grade.objects.filter(
+        # Weighted average of grade points, computed in the database
+        return Grade.objects.filter(course=course).gpa_by_course(self.user).get(course.id)
+    
+    def get_enrolled_results(self):
+        """Get stored course results for courses the student is currently enrolled in"""
+        return StudentCourseResult.objects.filter(
             student=self.user,
-            course=course,
-            grade_value__in=['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+', 'D', 'D-', 'F', 'NP']
+            course__enrollments__student=self.user,
+            course__enrollments__status='enrolled'
+        )
+
+    def _credit_weighted_gpa(self, results):
+        """Credit-weight the course GPAs of a result set"""
+        totals = results.filter(course_gpa__isnull=False).aggregate(
+            grade_points=Sum(F('course_gpa') * F('credits')),
+            credits=Sum('credits'),
         )
         
-        if not grades.exists():
-            return None
-        
-        # Calculate weighted average
-        total_weighted_points = 0
-        total_weight = 0
-        
-        for grade in grades:
-            grade_points = grade.get_grade_points()
-            if grade_points is not None:  # Exclude None values (I, W, P)
-                weight = float(grade.weight)
-                total_weighted_points += grade_points * weight
-                total_weight += weight
-        
-        if total_weight == 0:
+        if not totals['credits']:
             return None
         
-        return round(total_weighted_points / total_weight, 2)
-    
+        return round(totals['grade_points'] / totals['credits'], 2)
+
     def calculate_overall_gpa(self):
         """Calculate overall GPA across all enrolled courses"""
         if self.user_type != 'student':
             return None
-        
-        # Get all enrolled courses
-        enrolled_courses = Course.objects.filter(
-            enrollments__student=self.user,
-            enrollments__status='enrolled'
-        ).distinct()
-        
-        if not enrolled_courses.exists():
-            return None
-        
-        total_grade_points = 0
-        total_credits = 0
-        
-        for course in enrolled_courses:
-            course_gpa = self.calculate_course_gpa(course)
-            if course_gpa is not None:
-                course_credits = course.credits
-                total_grade_points += course_gpa * course_credits
-                total_credits += course_credits
-        
-        if total_credits == 0:
-            return None
-        
-        return round(total_grade_points / total_credits, 2)
+
+        # Read the stored per-course results instead of recomputing each course
+        return self._credit_weighted_gpa(self.get_enrolled_results())
     
     def get_gpa_status(self):
         """Get GPA status classification"""
-        gpa = self.calculate_overall_gpa()
+        return self.classify_gpa(self.calculate_overall_gpa())
+    
+    @staticmethod
+    def classify_gpa(gpa):
+        """Get the status classification of a GPA value"""
         if gpa is None:
             return "No GPA Available"
         elif gpa >= 3.8:
@@ -140,41 +132,16 @@ class UserProfile(models.Model):
             return "Academic Warning"
     
     def get_semester_gpa(self, semester, year=None):
-        """Calculate GPA for a specific semester"""
+        """Get the GPA of a semester, in the given year or the latest one taken"""
         if self.user_type != 'student':
             return None
         
-        # Filter courses by semester
-        course_filter = {
-            'enrollments__student': self.user,
-            'enrollments__status': 'enrolled',
-            'semester': semester
-        }
-        
+        terms = self.user.term_results.filter(semester=semester)
         if year:
-            # If you have a year field in Course model, add it here
-            # course_filter['year'] = year
-            pass
-        
-        semester_courses = Course.objects.filter(**course_filter).distinct()
-        
-        if not semester_courses.exists():
-            return None
-        
-        total_grade_points = 0
-        total_credits = 0
+            terms = terms.filter(year=year)
         
-        for course in semester_courses:
-            course_gpa = self.calculate_course_gpa(course)
-            if course_gpa is not None:
-                course_credits = course.credits
-                total_grade_points += course_gpa * course_credits
-                total_credits += course_credits
-        
-        if total_credits == 0:
-            return None
-        
-        return round(total_grade_points / total_credits, 2)
+        term = terms.order_by('-term_order').first()
+        return term.term_gpa if term else None
 
 class Course(models.Model):
     LEVEL_CHOICES = [
@@ -198,17 +165,49 @@ class Course(models.Model):
     semester = models.CharField(max_length=20, choices=SEMESTER_CHOICES, default='spring')
     year = models.IntegerField(default=2025, help_text="Academic year")
     max_students = models.IntegerField(default=30)
+    # Kept current by the enrollment signals; see reconcile_enrollment_counts()
+    enrolled_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    waitlist_count = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     lecturer = models.ForeignKey(UserProfile, on_delete=models.CASCADE, 
                                limit_choices_to={'user_type': 'lecturer'})
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    # Grade columns read when building final marks
+    FINAL_MARK_FIELDS = ['id', 'student_id', 'grade_type', 'numeric_score', 'max_points', 'weight']
+
+    # Final mark entry of a student with no grades in the course
+    EMPTY_FINAL_MARK = {
+        'final_mark': None,
+        'cass_mark': None,
+        'exam_mark': None,
+        'letter_grade': None,
+        'gpa_points': None,
+        'is_passing': False,
+        'calculated_cass_mark': None,
+        'exam_grade_id': None,
+        'exam_score': None,
+    }
+
+    # Enrollment status -> counter column kept on the course
+    ENROLLMENT_COUNTERS = {'enrolled': 'enrolled_count', 'pending': 'pending_count', 'waitlisted': 'waitlist_count'}
+
     def __str__(self):
         return f"{self.course_code} - {self.course_name}"
     
+    def save(self, *args, **kwargs):
+        """Override save so a stale instance never writes back the enrollment counters"""
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ENROLLMENT_COUNTERS.values()
+            ]
+        super().save(*args, **kwargs)
+    
     def get_enrolled_count(self):
-        return self.enrollments.filter(status='enrolled').count()
+        return self.enrolled_count
     
     def has_available_slots(self):
         return self.get_enrolled_count() < self.max_students
@@ -218,12 +217,68 @@ class Course(models.Model):
         enrolled_count = self.get_enrolled_count()
         return max(0, self.max_students - enrolled_count)
     
+    @classmethod
+    def compute_enrollment_counts(cls, course_ids):
+        """Count the enrollments of each course per counted status, as {course_id: {counter: count}}"""
+        counts = {course_id: dict.fromkeys(cls.ENROLLMENT_COUNTERS.values(), 0) for course_id in course_ids}
+        rows = Enrollment.objects.filter(
+            course__in=course_ids, status__in=cls.ENROLLMENT_COUNTERS
+        ).order_by().values_list('course_id', 'status').annotate(count=Count('id'))
+        for course_id, status, count in rows:
+            counts[course_id][cls.ENROLLMENT_COUNTERS[status]] = count
+        return counts
+    
+    @classmethod
+    def reconcile_enrollment_counts(cls, course_ids=None, check=False):
+        """Recount enrollment counters from the database
+        
+        Returns {course_id: {counter: (stored, actual)}} for the courses that had
+        drifted. With check=True nothing is written.
+        """
+        fields = list(cls.ENROLLMENT_COUNTERS.values())
+        courses = cls.objects.all() if course_ids is None else cls.objects.filter(pk__in=course_ids)
+        stored = {values['id']: values for values in courses.values('id', *fields)}
+        
+        drift = {}
+        for course_id, actual in cls.compute_enrollment_counts(list(stored)).items():
+            if any(stored[course_id][field] != actual[field] for field in fields):
+                if not check:
+                    # Recounted under the course lock so concurrent enrollments are not lost
+                    with transaction.atomic():
+                        cls.objects.select_for_update().filter(pk=course_id).first()
+                        actual = cls.compute_enrollment_counts([course_id])[course_id]
+                        cls.objects.filter(pk=course_id).update(**actual)
+                drift[course_id] = {
+                    field: (stored[course_id][field], actual[field])
+                    for field in fields if stored[course_id][field] != actual[field]
+                }
+        return drift
+    
+    @classmethod
+    def track_enrollment(cls, old_state, new_state):
+        """Adjust course enrollment counters after an enrollment moved between states"""
+        deltas = {}
+        for state, delta in [(old_state, -1), (new_state, 1)]:
+            if state and state['status'] in cls.ENROLLMENT_COUNTERS:
+                counters = deltas.setdefault(state['course_id'], {})
+                field = cls.ENROLLMENT_COUNTERS[state['status']]
+                counters[field] = counters.get(field, 0) + delta
+        
+        for course_id, counters in deltas.items():
+            changes = {field: F(field) + delta for field, delta in counters.items() if delta}
+            if changes:
+                cls.objects.filter(pk=course_id).update(**changes)
+    
     def get_lecturer_name(self):
         """Get the full name of the lecturer."""
         if self.lecturer.user.first_name or self.lecturer.user.last_name:
             return f"{self.lecturer.user.first_name} {self.lecturer.user.last_name}".strip()
         return self.lecturer.user.username
     
+    def get_grading_scale(self):
+        """Get the percentage to letter grade scale used by this course"""
+        return get_grading_scale(self)
+    
     def get_grade_distribution(self):
         """Get grade distribution for this course"""
         from django.db.models import Count
@@ -236,42 +291,38 @@ class Course(models.Model):
     
     def get_course_average_gpa(self):
         """Calculate average GPA for all students in this course"""
-        enrolled_students = User.objects.filter(
-            enrollments__course=self,
-            enrollments__status='enrolled'
-        ).distinct()
-        
-        if not enrolled_students.exists():
-            return None
-        
-        total_gpa = 0
-        student_count = 0
+        average_gpa = self.enrollments.filter(status='enrolled').with_gpa().aggregate(
+            average_gpa=Avg('course_gpa')
+        )['average_gpa']
         
-        for student in enrolled_students:
-            if hasattr(student, 'userprofile'):
-                student_gpa = student.userprofile.calculate_course_gpa(self)
-                if student_gpa is not None:
-                    total_gpa += student_gpa
-                    student_count += 1
-        
-        if student_count == 0:
+        if average_gpa is None:
             return None
         
-        return round(total_gpa / student_count, 2)
+        return round(average_gpa, 2)
     
     def get_assessment_weights(self):
         """Get configured assessment weights for this course"""
-        weights = {}
-        grade_types = self.grades.values_list('grade_type', flat=True).distinct()
+        return Course.get_assessment_weights_for([self])[self.id]
+    
+    @staticmethod
+    def get_assessment_weights_for(courses):
+        """Get {course_id: assessment weights} for many courses with at most one query"""
+        cache_keys = {versioned_key(WEIGHT_SCHEME, course.id): course.id for course in courses}
+        cached = cache.get_many(cache_keys)
+        weights = {cache_keys[cache_key]: value for cache_key, value in cached.items()}
         
-        for grade_type in grade_types:
-            # Get average weight for this grade type
-            avg_weight = self.grades.filter(grade_type=grade_type).aggregate(
-                avg_weight=models.Avg('weight')
-            )['avg_weight']
-            
-            if avg_weight:
-                weights[grade_type] = round(float(avg_weight), 2)
+        missing = [course_id for cache_key, course_id in cache_keys.items() if cache_key not in cached]
+        if missing:
+            loaded = {course_id: {} for course_id in missing}
+            for course_id, grade_type, weight in AssessmentWeightScheme.objects.filter(
+                course__in=missing
+            ).values_list('course_id', 'grade_type', 'weight'):
+                loaded[course_id][grade_type] = round(float(weight), 2)
+            cache.set_many({
+                cache_key: loaded[course_id]
+                for cache_key, course_id in cache_keys.items() if course_id in loaded
+            }, getattr(settings, 'WEIGHT_SCHEME_CACHE_TIMEOUT', 300))
+            weights.update(loaded)
         
         return weights
     
@@ -286,18 +337,25 @@ class Course(models.Model):
             'participation': 5.0,
         }
     
+    def seed_assessment_weights(self):
+        """Configure the default weights for a course that has no weight scheme yet"""
+        AssessmentWeightScheme.objects.bulk_create(
+            [
+                AssessmentWeightScheme(course=self, grade_type=grade_type, weight=weight)
+                for grade_type, weight in self.get_default_weights().items()
+            ],
+            ignore_conflicts=True
+        )
+        # bulk_create skips the save signal that bumps this
+        bump_version(WEIGHT_SCHEME, self.id)
+    
     def validate_total_weights(self):
-        """Check if total weights for all assessments add up appropriately"""
-        total_weight = 0
-        grade_types = self.grades.values_list('grade_type', flat=True).distinct()
-        
-        for grade_type in grade_types:
-            avg_weight = self.grades.filter(grade_type=grade_type).aggregate(
-                avg_weight=models.Avg('weight')
-            )['avg_weight']
-            
-            if avg_weight:
-                total_weight += float(avg_weight)
+        """Check if total weights for the assessments graded in this course add up appropriately"""
+        weights = self.get_assessment_weights()
+        graded_types = set(self.grades.values_list('grade_type', flat=True).distinct())
+        if graded_types & set(weights):
+            weights = {grade_type: weight for grade_type, weight in weights.items() if grade_type in graded_types}
+        total_weight = sum(weights.values())
         
         return {
             'total_weight': round(total_weight, 2),
@@ -306,149 +364,359 @@ class Course(models.Model):
     
     def get_student_performance_stats(self):
         """Get comprehensive performance statistics for the course"""
-        enrolled_students = self.get_enrolled_count()
-        
-        if enrolled_students == 0:
-            return None
+        from .performance import CoursePerformanceSnapshot
         
-        # Grade distribution
-        grade_dist = self.get_grade_distribution()
+        snapshot = CoursePerformanceSnapshot.for_course(self)
         
-        # Calculate pass rate (grades C- and above)
-        passing_grades = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-']
-        passing_count = sum(grade_dist.get(grade, 0) for grade in passing_grades)
-        total_graded = sum(grade_dist.values())
+        if snapshot.enrolled_students == 0:
+            return None
         
-        pass_rate = round((passing_count / total_graded * 100), 2) if total_graded > 0 else 0
+        return snapshot.as_dict()
+    
+    def compute_final_marks(self, students=None):
+        """Compute CASS, exam and final marks for the whole course in one pass
         
-        # Average GPA
-        avg_gpa = self.get_course_average_gpa()
+        Loads every grade of the course in a single query and returns a roster
+        keyed by student id. Pass students to limit the roster to those students.
+        """
+        grades = Grade.objects.filter(course=self).order_by('student_id', '-date_graded').values_list(
+            *self.FINAL_MARK_FIELDS
+        )
+        if students is not None:
+            grades = grades.filter(student__in=students)
         
-        return {
-            'enrolled_students': enrolled_students,
-            'total_graded': total_graded,
-            'pass_rate': pass_rate,
-            'average_gpa': avg_gpa,
-            'grade_distribution': grade_dist,
-        }
+        return self.build_final_marks(grades)
     
-    def calculate_cass_mark(self, student):
-        """Calculate CASS MARK (Continuous Assessment) for a student"""
-        # Get all grades except exam_mark and final_grade
-        cass_grades = Grade.objects.filter(
-            student=student,
-            course=self
-        ).exclude(grade_type__in=['exam_mark', 'final_grade', 'cass_mark'])
+    def build_final_marks(self, grades, weights=None):
+        """Build the final mark roster from grade rows already loaded
         
-        if not cass_grades.exists():
-            return None
-        
-        total_weighted = 0
-        total_weight = 0
+        Rows hold FINAL_MARK_FIELDS and must be ordered by student, newest first.
+        """
+        # Configured weights override the weight stored on each grade
+        if weights is None:
+            weights = self.get_assessment_weights()
         
-        for grade in cass_grades:
-            if grade.numeric_score is not None:
-                percentage = grade.get_percentage()
+        # Accumulate coursework totals and the latest CASS/exam record per student
+        totals = {}
+        for grade_id, student_id, grade_type, numeric_score, max_points, weight in grades:
+            entry = totals.setdefault(student_id, {
+                'has_coursework': False,
+                'weighted': 0,
+                'weight': 0,
+                'cass_grade': None,
+                'exam_grade': None,
+            })
+            percentage = None
+            if numeric_score is not None and max_points > 0:
+                percentage = round((float(numeric_score) / float(max_points)) * 100, 2)
+            
+            if grade_type == 'cass_mark':
+                if entry['cass_grade'] is None:
+                    entry['cass_grade'] = (numeric_score, percentage)
+            elif grade_type == 'exam_mark':
+                if entry['exam_grade'] is None:
+                    entry['exam_grade'] = (grade_id, numeric_score, percentage)
+            elif grade_type != 'final_grade':
+                entry['has_coursework'] = True
                 if percentage is not None:
-                    total_weighted += percentage * float(grade.weight)
-                    total_weight += float(grade.weight)
+                    weight = weights.get(grade_type, float(weight))
+                    entry['weighted'] += percentage * weight
+                    entry['weight'] += weight
         
-        if total_weight > 0:
-            cass_percentage = total_weighted / total_weight
-            return round(cass_percentage, 2)
+        scale = self.get_grading_scale()
+        roster = {}
+        for student_id, entry in totals.items():
+            calculated_cass_mark = None
+            if entry['has_coursework'] and entry['weight'] > 0:
+                calculated_cass_mark = round(entry['weighted'] / entry['weight'], 2)
+            
+            # A recorded CASS MARK takes precedence over the coursework average
+            cass_grade = entry['cass_grade']
+            cass_mark = cass_grade[1] if cass_grade and cass_grade[0] else calculated_cass_mark
+            
+            exam_grade_id, exam_score, exam_mark, final_mark = None, None, None, None
+            if entry['exam_grade'] is not None:
+                exam_grade_id, exam_score, exam_percentage = entry['exam_grade']
+                if exam_score is not None:
+                    exam_mark = exam_percentage
+                    if cass_mark is not None and exam_mark is not None:
+                        # 50% CASS + 50% Exam
+                        final_mark = round((cass_mark * 0.5) + (exam_mark * 0.5), 2)
+            
+            letter_grade = scale.letter_for(final_mark) if final_mark is not None else None
+            roster[student_id] = {
+                'final_mark': final_mark,
+                'cass_mark': cass_mark,
+                'exam_mark': exam_mark,
+                'letter_grade': letter_grade,
+                'gpa_points': Grade.GRADE_POINTS.get(letter_grade, 0.0) if letter_grade else None,
+                'is_passing': final_mark >= 50 if final_mark is not None else False,
+                'calculated_cass_mark': calculated_cass_mark,
+                'exam_grade_id': exam_grade_id,
+                'exam_score': exam_score,
+            }
         
-        return None
+        return roster
     
-    def calculate_final_mark(self, student):
-        """Calculate final mark combining CASS MARK (50%) and Exam Mark (50%)"""
-        # Get or calculate CASS MARK
-        cass_grade = Grade.objects.filter(
-            student=student,
-            course=self,
-            grade_type='cass_mark'
-        ).first()
+    def record_exam_marks(self, exam_scores, entered_by):
+        """Record exam marks for many students in one transaction
         
-        if cass_grade and cass_grade.numeric_score:
-            cass_mark = cass_grade.get_percentage()
-        else:
-            cass_mark = self.calculate_cass_mark(student)
+        exam_scores maps student ids to exam percentages. Exam, CASS and final
+        grade rows are written in bulk and stored results are refreshed once for
+        the whole batch. Returns {student_id: 'added' or 'updated'}.
+        """
+        student_ids = list(exam_scores)
+        scale = self.get_grading_scale()
         
-        # Get Exam Mark
-        exam_grade = Grade.objects.filter(
-            student=student,
-            course=self,
-            grade_type='exam_mark'
-        ).first()
+        with transaction.atomic():
+            # Latest exam, CASS and final grade row of each student
+            existing = {}
+            for grade in Grade.objects.filter(
+                course=self,
+                student_id__in=student_ids,
+                grade_type__in=['exam_mark', 'cass_mark', 'final_grade']
+            ).order_by('-date_graded'):
+                existing.setdefault((grade.student_id, grade.grade_type), grade)
+            
+            def write_rows(grade_type, description, rows):
+                """Create or update one row of a grade type per student, skipping unchanged rows"""
+                grades, added = [], set()
+                for student_id, fields in rows.items():
+                    # Bulk writes skip Grade.save(), so set the letter here
+                    fields['grade_value'] = scale.letter_for(float(fields['numeric_score']))
+                    grade = existing.get((student_id, grade_type))
+                    if grade is None:
+                        # Existing rows keep their name, which may be unique among the course's assessments
+                        grade = Grade(student_id=student_id, course=self, grade_type=grade_type, description=description)
+                        added.add(student_id)
+                    elif all(getattr(grade, field) == value for field, value in fields.items()):
+                        continue
+                    for field, value in fields.items():
+                        setattr(grade, field, value)
+                    grades.append(grade)
+                
+                # New rows are inserted and existing rows upserted on their primary key
+                Grade.objects.bulk_create(
+                    grades,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=['grade_value', 'numeric_score', 'max_points', 'weight', 'comments']
+                )
+                return added
+            
+            added = write_rows('exam_mark', 'Final Examination', {
+                student_id: {
+                    'numeric_score': exam_score,
+                    'max_points': 100,
+                    'weight': 0.5,  # 50% weight
+                    'comments': f'Exam mark entered by {entered_by}',
+                }
+                for student_id, exam_score in exam_scores.items()
+            })
+            
+            # Update CASS marks from coursework
+            roster = self.compute_final_marks(students=student_ids)
+            write_rows('cass_mark', 'Continuous Assessment (CASS) Mark', {
+                student_id: {
+                    'numeric_score': entry['calculated_cass_mark'],
+                    'max_points': 100,
+                    'weight': 0.5,  # 50% weight
+                    'comments': 'CASS mark calculated from coursework',
+                }
+                for student_id, entry in roster.items()
+                if entry['calculated_cass_mark'] is not None
+            })
+            
+            # Final grades from the updated CASS and exam marks
+            roster = self.compute_final_marks(students=student_ids)
+            write_rows('final_grade', 'Final Course Grade', {
+                student_id: {
+                    'numeric_score': entry['final_mark'],
+                    'max_points': 100,
+                    'weight': 1.0,
+                    'comments': f"Final grade: CASS ({entry['cass_mark']}%) + Exam ({entry['exam_mark']}%) = {entry['final_mark']}%",
+                }
+                for student_id, entry in roster.items()
+                if entry['final_mark'] is not None
+            })
+            
+            self._grades_written(student_ids)
         
-        if not exam_grade or exam_grade.numeric_score is None:
-            return None, cass_mark, None
+        return {student_id: 'added' if student_id in added else 'updated' for student_id in student_ids}
+    
+    def _grades_written(self, student_ids):
+        """Do what the Grade signals would have done for grades written in bulk"""
+        StudentCourseResult.refresh_course(self, students=student_ids)
+        bump_version(COURSE_PERFORMANCE, self.id)
+        for student_id in student_ids:
+            bump_version(STUDENT_RESULTS, student_id)
+    
+    def _create_placeholders(self, assessments, student_ids):
+        """Bulk create ungraded rows of each assessment for each student, skipping existing ones
         
-        exam_mark = exam_grade.get_percentage()
+        Must run in a transaction. Returns the number of rows inserted.
+        """
+        # Placeholder creation for the course is serialized, so the rows found
+        # missing here are the rows this call inserts
+        Course.objects.select_for_update().filter(pk=self.pk).first()
+        existing = set(Grade.objects.filter(
+            course=self,
+            student_id__in=student_ids,
+            grade_type__in={assessment['grade_type'] for assessment in assessments},
+            description__in={assessment['description'] for assessment in assessments},
+        ).values_list('student_id', 'grade_type', 'description'))
+        placeholders = [
+            Grade(
+                student_id=student_id,
+                course=self,
+                grade_type=assessment['grade_type'],
+                description=assessment['description'],
+                max_points=assessment['max_points'],
+                grade_value='I',  # Incomplete - to be filled in when grading
+                numeric_score=None,
+                comments=assessment.get('comments', '')
+            )
+            for assessment in assessments
+            for student_id in student_ids
+            if (student_id, assessment['grade_type'], assessment['description']) not in existing
+        ]
+        Grade.objects.bulk_create(placeholders, ignore_conflicts=True)
         
-        if cass_mark is not None and exam_mark is not None:
-            # 50% CASS + 50% Exam
-            final_percentage = (cass_mark * 0.5) + (exam_mark * 0.5)
-            return round(final_percentage, 2), cass_mark, exam_mark
+        # Ungraded rows leave every mark unchanged, so no results need refreshing;
+        # only the grade lists showing the new rows are invalidated
+        for student_id in {placeholder.student_id for placeholder in placeholders}:
+            bump_version(STUDENT_RESULTS, student_id)
         
-        return None, cass_mark, exam_mark
+        return len(placeholders)
     
-    def get_final_mark_details(self, student):
-        """Get comprehensive final mark details for a student"""
-        final_mark, cass_mark, exam_mark = self.calculate_final_mark(student)
+    def create_assessment(self, grade_type, description, max_points, comments=''):
+        """Create ungraded placeholders of an assessment for the enrolled roster
         
-        # Convert final percentage to letter grade
-        letter_grade = None
-        if final_mark is not None:
-            if final_mark >= 90:
-                letter_grade = 'A+'
-            elif final_mark >= 85:
-                letter_grade = 'A'
-            elif final_mark >= 80:
-                letter_grade = 'A-'
-            elif final_mark >= 77:
-                letter_grade = 'B+'
-            elif final_mark >= 73:
-                letter_grade = 'B'
-            elif final_mark >= 70:
-                letter_grade = 'B-'
-            elif final_mark >= 67:
-                letter_grade = 'C+'
-            elif final_mark >= 63:
-                letter_grade = 'C'
-            elif final_mark >= 60:
-                letter_grade = 'C-'
-            elif final_mark >= 57:
-                letter_grade = 'D+'
-            elif final_mark >= 53:
-                letter_grade = 'D'
-            elif final_mark >= 50:
-                letter_grade = 'D-'
-            else:
-                letter_grade = 'F'
+        Students who already have the assessment are skipped by the unique
+        constraint, so this is safe to repeat. Returns the number created.
+        """
+        student_ids = list(Enrollment.objects.filter(course=self, status='enrolled').values_list('student_id', flat=True))
+        with transaction.atomic():
+            return self._create_placeholders([{
+                'grade_type': grade_type,
+                'description': description,
+                'max_points': max_points,
+                'comments': comments,
+            }], student_ids)
+    
+    def sync_assessments(self):
+        """Add placeholders of every existing assessment for newly enrolled students"""
+        student_ids = list(Enrollment.objects.filter(course=self, status='enrolled').values_list('student_id', flat=True))
+        assessments = Grade.objects.filter(course=self).exclude(description='').exclude(
+            grade_type__in=Grade.CALCULATED_GRADE_TYPES
+        ).order_by().values('grade_type', 'description').annotate(max_points=models.Max('max_points'))
         
-        # Get GPA points
-        grade_points_map = {
-            'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-            'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-            'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-            'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-            'F': 0.0
-        }
+        with transaction.atomic():
+            return self._create_placeholders(list(assessments), student_ids)
+    
+    def record_test_scores(self, entries):
+        """Grade many assessments of this course in one transaction
         
-        gpa_points = grade_points_map.get(letter_grade, 0.0) if letter_grade else None
+        entries is a list of dicts with grade_id, numeric_score, comments and
+        version, the date_graded the marker saw when the page was loaded. Rows
+        graded by someone else since then are reported as conflicts and left
+        untouched. Entries may also carry the original_score and
+        original_comments the marker saw; rows submitted as they were loaded
+        count as unchanged whatever happened to them since. Returns lists of
+        saved, unchanged, conflicting, invalid and missing entries.
+        """
+        report = {'saved': [], 'unchanged': [], 'conflicts': [], 'invalid': [], 'missing': []}
+        
+        with transaction.atomic():
+            # Ownership check and row locks for the whole batch in one query
+            grades = Grade.objects.select_for_update().filter(
+                course=self,
+                id__in=[entry['grade_id'] for entry in entries]
+            ).select_related('student').in_bulk()
+            
+            now = timezone.now()
+            changed = []
+            for entry in entries:
+                grade = grades.get(entry['grade_id'])
+                if grade is None:
+                    report['missing'].append(entry)
+                    continue
+                
+                score = entry['numeric_score']
+                if grade.numeric_score == score and grade.comments == entry['comments']:
+                    report['unchanged'].append(grade)
+                    continue
+                if 'original_score' in entry and (entry['original_score'], entry['original_comments']) == (score, entry['comments']):
+                    report['unchanged'].append(grade)
+                    continue
+                if entry['version'] != grade.date_graded.isoformat():
+                    report['conflicts'].append(grade)
+                    continue
+                if not (0 <= score <= grade.max_points):
+                    report['invalid'].append((grade, f'Score must be between 0 and {grade.max_points}.'))
+                    continue
+                
+                grade.numeric_score = score
+                grade.comments = entry['comments']
+                grade.date_graded = now
+                changed.append(grade)
+            
+            # Letters for the whole batch, since bulk writes skip Grade.save()
+            scale = self.get_grading_scale()
+            letters = [
+                scale.letter_for((float(grade.numeric_score) / float(grade.max_points)) * 100)
+                if grade.max_points > 0 else grade.grade_value
+                for grade in changed
+            ]
+            for grade, letter in zip(changed, letters):
+                grade.grade_value = letter
+            
+            Grade.objects.bulk_update(changed, ['numeric_score', 'grade_value', 'comments', 'date_graded'])
+            report['saved'] = changed
+            
+            # Bulk writes skip the Grade signals
+            if changed:
+                self._grades_written({grade.student_id for grade in changed})
         
+        return report
+    
+    def _get_final_mark_entry(self, student):
+        """Get a single student's entry from the final mark roster"""
+        return self.compute_final_marks(students=[student]).get(student.id, dict(self.EMPTY_FINAL_MARK))
+    
+    def calculate_cass_mark(self, student):
+        """Calculate CASS MARK (Continuous Assessment) for a student"""
+        return self._get_final_mark_entry(student)['calculated_cass_mark']
+    
+    def calculate_final_mark(self, student):
+        """Calculate final mark combining CASS MARK (50%) and Exam Mark (50%)"""
+        entry = self._get_final_mark_entry(student)
+        return entry['final_mark'], entry['cass_mark'], entry['exam_mark']
+    
+    def get_final_mark_details(self, student):
+        """Get comprehensive final mark details for a student"""
+        entry = self._get_final_mark_entry(student)
         return {
-            'final_mark': final_mark,
-            'cass_mark': cass_mark,
-            'exam_mark': exam_mark,
-            'letter_grade': letter_grade,
-            'gpa_points': gpa_points,
-            'is_passing': final_mark >= 50 if final_mark is not None else False
+            'final_mark': entry['final_mark'],
+            'cass_mark': entry['cass_mark'],
+            'exam_mark': entry['exam_mark'],
+            'letter_grade': entry['letter_grade'],
+            'gpa_points': entry['gpa_points'],
+            'is_passing': entry['is_passing'],
         }
     
     class Meta:
         ordering = ['course_code']
 
+class EnrollmentQuerySet(models.QuerySet):
+    def with_gpa(self):
+        """Annotate each enrollment with the student's weighted GPA in that course"""
+        course_gpa = Grade.objects.filter(
+            student=OuterRef('student'),
+            course=OuterRef('course')
+        ).course_gpa_rows().values('gpa')
+        return self.annotate(course_gpa=Subquery(course_gpa, output_field=models.FloatField()))
+
 class Enrollment(models.Model):
     STATUS_CHOICES = [
         ('enrolled', 'Enrolled'),
@@ -456,6 +724,7 @@ class Enrollment(models.Model):
         ('waitlisted', 'Waitlisted'),
         ('dropped', 'Dropped'),
         ('completed', 'Completed'),
+        ('rejected', 'Rejected'),
     ]
     
     student = models.ForeignKey(
@@ -476,6 +745,8 @@ class Enrollment(models.Model):
         verbose_name = "Enrollment"
         verbose_name_plural = "Enrollments"
     
+    objects = EnrollmentQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.student.username} - {self.course.course_code} ({self.get_status_display()})"
     
@@ -483,6 +754,193 @@ class Enrollment(models.Model):
         """Get student's full name or username"""
         return self.student.get_full_name() or self.student.username
 
+    @classmethod
+    def statuses_for(cls, user):
+        """Get {course_id: status} of a user's enrollments, loaded once per request
+
+        The map is kept on the user object, which lives as long as the request,
+        so templates can look up any number of courses without more queries.
+        """
+        if not getattr(user, 'is_authenticated', False):
+            return {}
+        statuses = getattr(user, '_enrollment_statuses', None)
+        if statuses is None:
+            statuses = dict(cls.objects.filter(student=user).values_list('course_id', 'status'))
+            user._enrollment_statuses = statuses
+        return statuses
+
+    @classmethod
+    def sync_bulk_changes(cls, course_id, student_ids):
+        """Update what the enrollment signals maintain after enrollments of one course were written in bulk
+
+        bulk_create() and update() send no signals, so callers writing many
+        enrollments at once call this with the students they touched.
+        """
+        student_ids = list(student_ids)
+        if not student_ids:
+            return
+        Course.reconcile_enrollment_counts([course_id])
+        lecturer_id = Course.objects.filter(pk=course_id).values_list('lecturer_id', flat=True).first()
+        LecturerDashboardCounters.reconcile_lecturers([lecturer_id])
+        StudentTermResult.refresh_students(student_ids)
+        bump_version(COURSE_PERFORMANCE, course_id)
+
+        for student_id in student_ids:
+            bump_version(STUDENT_COURSES, student_id)
+        enrolled = set(cls.objects.filter(
+            course_id=course_id, student_id__in=student_ids, status='enrolled'
+        ).values_list('student_id', flat=True))
+        AnnouncementDelivery.deliver_course(course_id, list(enrolled), True)
+        AnnouncementDelivery.deliver_course(course_id, [pk for pk in student_ids if pk not in enrolled], False)
+
+class WaitlistPromotion(models.Model):
+    """A waitlisted student moved into a free seat, kept as an audit trail"""
+    REASON_CHOICES = [
+        ('seat_freed', 'Seat Freed'),
+        ('capacity_raised', 'Capacity Raised'),
+        ('seat_open', 'Seat Already Open'),
+        ('sweep', 'Scheduled Sweep'),
+    ]
+
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.SET_NULL, null=True, blank=True, related_name='promotions')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='waitlist_promotions')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_promotions')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    waitlisted_at = models.DateTimeField(help_text="When the student joined the waitlist")
+    promoted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-promoted_at']
+        verbose_name = "Waitlist Promotion"
+        verbose_name_plural = "Waitlist Promotions"
+
+    def __str__(self):
+        return f"{self.student.username} - {self.course.course_code} ({self.get_reason_display()})"
+
+    @classmethod
+    def promote(cls, course_id, reason):
+        """Move the longest waiting students of a course into its free seats
+
+        Runs in one transaction holding the course row lock, the same lock
+        enroll_student takes, so seats are never given out twice. Returns the
+        promotions made.
+        """
+        # Checked without the lock first, as most calls find nothing to do
+        if not cls.pending_courses().filter(pk=course_id).exists():
+            return []
+        with transaction.atomic():
+            course = Course.objects.select_for_update().filter(pk=course_id).first()
+            if course is None or not course.waitlist_count:
+                return []
+            seats = course.max_students - course.enrolled_count
+            if seats <= 0:
+                return []
+
+            waitlist = Enrollment.objects.filter(
+                course=course, status='waitlisted'
+            ).order_by('enrollment_date', 'id')[:seats]
+            promotions = []
+            for enrollment in waitlist:
+                # Saved one by one so the enrollment signals keep every count current
+                enrollment.status = 'enrolled'
+                enrollment.save()
+                promotions.append(cls(
+                    enrollment=enrollment,
+                    course=course,
+                    student_id=enrollment.student_id,
+                    reason=reason,
+                    waitlisted_at=enrollment.enrollment_date,
+                ))
+            return cls.objects.bulk_create(promotions)
+
+    @classmethod
+    def schedule(cls, course_id, reason):
+        """Promote from a course waitlist once the current transaction commits
+
+        With WAITLIST_PROMOTION set to 'batched' nothing is done here and the
+        promote_waitlists command fills open seats instead.
+        """
+        if getattr(settings, 'WAITLIST_PROMOTION', 'immediate') == 'immediate':
+            transaction.on_commit(lambda: cls.promote(course_id, reason))
+
+    @classmethod
+    def pending_courses(cls):
+        """Courses with both free seats and students waiting for them"""
+        return Course.objects.filter(waitlist_count__gt=0, enrolled_count__lt=F('max_students'))
+
+class EnrollmentRequest(models.Model):
+    """An enroll request queued in rush mode and applied by the process_enrollment_queue worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('enrolled', 'Enrolled'),
+        ('waitlisted', 'Waitlisted'),
+        ('existing', 'Already Has Enrollment'),
+    ]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollment_requests')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollment_requests')
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='queued')
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='requests', help_text="Enrollment the request resolved to")
+    requested_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Requests are applied in arrival order, which is the id order
+        ordering = ['id']
+        indexes = [models.Index(fields=['course', 'status'])]
+        verbose_name = "Enrollment Request"
+        verbose_name_plural = "Enrollment Requests"
+
+    def __str__(self):
+        return f"{self.student.username} - {self.course.course_code} ({self.get_status_display()})"
+
+    def position(self):
+        """Place of a queued request in its course queue, starting at 1"""
+        return EnrollmentRequest.objects.filter(course_id=self.course_id, status='queued', id__lte=self.id).count()
+
+class GradeQuerySet(models.QuerySet):
+    def grade_points_expression(self):
+        """Map letter grades to grade points in SQL"""
+        return Case(
+            *[When(grade_value=letter, then=Value(points))
+              for letter, points in Grade.GRADE_POINTS.items() if points is not None],
+            output_field=models.FloatField()
+        )
+
+    def course_gpa_rows(self):
+        """Group GPA-bearing grades by student and course with their weighted GPA"""
+        # Configured weights override the weight stored on each grade
+        scheme_weight = AssessmentWeightScheme.objects.filter(
+            course=OuterRef('course'),
+            grade_type=OuterRef('grade_type')
+        ).values('weight')[:1]
+        weight = Cast(Coalesce(Subquery(scheme_weight), F('weight')), models.FloatField())
+        return self.filter(
+            grade_value__in=[letter for letter, points in Grade.GRADE_POINTS.items() if points is not None]
+        ).order_by().values('student', 'course').annotate(
+            weighted_points=Sum(self.grade_points_expression() * weight),
+            total_weight=Sum(weight),
+        ).annotate(
+            gpa=F('weighted_points') / NullIf(F('total_weight'), 0.0)
+        )
+
+    def with_letter(self):
+        """Annotate each grade with the letter its score earns on its course's scale, computed in SQL"""
+        # Same operation order as Grade.save() so both round identically
+        percentage = Cast('numeric_score', models.FloatField()) / NullIf(
+            Cast('max_points', models.FloatField()), 0.0
+        ) * 100
+        return self.annotate(letter=course_case_expression(percentage))
+
+    def gpa_by_course(self, student):
+        """Get {course_id: GPA} for a student in a single query"""
+        return {
+            row['course']: round(row['gpa'], 2)
+            for row in self.filter(student=student).course_gpa_rows()
+            if row['gpa'] is not None
+        }
+
 class Grade(models.Model):
     GRADE_CHOICES = [
         ('A+', 'A+ (90-100)'),
@@ -557,10 +1015,26 @@ class Grade(models.Model):
     date_graded = models.DateTimeField(default=timezone.now)
     comments = models.TextField(blank=True, help_text="Instructor feedback")
     
+    objects = GradeQuerySet.as_manager()
+    
+    # Passing letters (C- or better)
+    PASSING_GRADES = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-']
+    
+    # Grade types filled in from other marks rather than created as tests
+    CALCULATED_GRADE_TYPES = ['cass_mark', 'exam_mark', 'final_grade']
+    
     class Meta:
         ordering = ['-date_graded']
         verbose_name = "Grade"
         verbose_name_plural = "Grades"
+        constraints = [
+            # One row per named assessment per student
+            models.UniqueConstraint(
+                fields=['student', 'course', 'grade_type', 'description'],
+                condition=~Q(description=''),
+                name='unique_named_assessment_per_student'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.course.course_code} - {self.grade_value}"
@@ -570,34 +1044,8 @@ class Grade(models.Model):
         if self.numeric_score is not None and self.max_points > 0:
             # Auto-calculate letter grade from numeric score
             percentage = (float(self.numeric_score) / float(self.max_points)) * 100
-            
-            if percentage >= 90:
-                self.grade_value = 'A+'
-            elif percentage >= 85:
-                self.grade_value = 'A'
-            elif percentage >= 80:
-                self.grade_value = 'A-'
-            elif percentage >= 77:
-                self.grade_value = 'B+'
-            elif percentage >= 73:
-                self.grade_value = 'B'
-            elif percentage >= 70:
-                self.grade_value = 'B-'
-            elif percentage >= 67:
-                self.grade_value = 'C+'
-            elif percentage >= 63:
-                self.grade_value = 'C'
-            elif percentage >= 60:
-                self.grade_value = 'C-'
-            elif percentage >= 57:
-                self.grade_value = 'D+'
-            elif percentage >= 53:
-                self.grade_value = 'D'
-            elif percentage >= 50:
-                self.grade_value = 'D-'
-            else:
-                self.grade_value = 'F'
-        
+            self.grade_value = self.course.get_grading_scale().letter_for(percentage)
+
         super().save(*args, **kwargs)
     
     def get_weighted_points(self):
@@ -609,8 +1057,7 @@ class Grade(models.Model):
     
     def is_passing_grade(self):
         """Check if this is a passing grade (C- or better)"""
-        passing_grades = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-']
-        return self.grade_value in passing_grades
+        return self.grade_value in self.PASSING_GRADES
     
     def get_grade_category(self):
         """Get grade category for reporting"""
@@ -641,6 +1088,296 @@ class Grade(models.Model):
         """Get student's full name or username"""
         return self.student.get_full_name() or self.student.username
 
+class AssessmentWeightScheme(models.Model):
+    """Configured weight of one assessment type within a course"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='weight_scheme')
+    grade_type = models.CharField(max_length=15, choices=Grade.GRADE_TYPE_CHOICES)
+    weight = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        help_text="Weight of this assessment type in final calculation"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['course', 'grade_type']
+        ordering = ['grade_type']
+        verbose_name = "Assessment Weight"
+        verbose_name_plural = "Assessment Weights"
+    
+    def __str__(self):
+        return f"{self.course.course_code} - {self.get_grade_type_display()} ({self.weight})"
+
+class StudentCourseResult(models.Model):
+    """Denormalized result of a student in a course, kept current from Grade changes"""
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_results')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_results')
+    course_gpa = models.FloatField(null=True, blank=True)
+    credits = models.IntegerField(default=0)
+    cass_mark = models.FloatField(null=True, blank=True)
+    exam_mark = models.FloatField(null=True, blank=True)
+    final_mark = models.FloatField(null=True, blank=True)
+    letter_grade = models.CharField(max_length=3, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields compared when checking the stored results for drift
+    RESULT_FIELDS = ['course_gpa', 'credits', 'cass_mark', 'exam_mark', 'final_mark', 'letter_grade']
+
+    class Meta:
+        unique_together = ['student', 'course']
+        verbose_name = "Student Course Result"
+        verbose_name_plural = "Student Course Results"
+
+    def __str__(self):
+        return f"{self.student.username} - {self.course.course_code} ({self.letter_grade or 'N/A'})"
+
+    def get_transcript_grade(self):
+        """Letter grade shown on transcripts ('I' until something is graded)"""
+        return self.letter_grade or 'I'
+
+    @classmethod
+    def compute(cls, student, course):
+        """Compute result values for a student in a course, or None if there are no grades"""
+        return cls.compute_course(course, students=[student]).get(student.id)
+
+    @classmethod
+    def compute_course(cls, course, students=None):
+        """Compute {student_id: result values} for every graded student in a course
+
+        Runs a fixed number of queries however many students are graded.
+        Pass students to limit the computation to those students.
+        """
+        grades = Grade.objects.filter(course=course).order_by('student_id', '-date_graded')
+        if students is not None:
+            grades = grades.filter(student__in=students)
+
+        # Course GPAs for students with a profile, final marks for the whole roster
+        course_gpas = {
+            row['student']: round(row['gpa'], 2)
+            for row in grades.filter(student__userprofile__isnull=False).course_gpa_rows()
+            if row['gpa'] is not None
+        }
+        roster = course.compute_final_marks(students=students)
+        weights = course.get_assessment_weights()
+        scale = course.get_grading_scale()
+
+        # Latest recorded final grade and weighted average of everything graded so far
+        final_grades = {}
+        totals = {}
+        for student_id, grade_type, grade_value, numeric_score, max_points, weight in grades.values_list(
+            'student_id', 'grade_type', 'grade_value', 'numeric_score', 'max_points', 'weight'
+        ):
+            entry = totals.setdefault(student_id, [0, 0])
+            if grade_type == 'final_grade' and student_id not in final_grades:
+                final_grades[student_id] = grade_value
+            if grade_value not in ['I', 'W'] and numeric_score and max_points > 0:
+                percentage = round((float(numeric_score) / float(max_points)) * 100, 2)
+                weight = weights.get(grade_type, float(weight))
+                entry[0] += percentage * weight
+                entry[1] += weight
+
+        results = {}
+        for student_id, (total_weighted, total_weight) in totals.items():
+            marks = roster[student_id]
+
+            # Recorded final grade first, then the computed final mark, then the
+            # weighted average of everything graded so far
+            if student_id in final_grades:
+                letter_grade = final_grades[student_id]
+            elif marks['final_mark'] is not None:
+                letter_grade = scale.letter_for(marks['final_mark'])
+            else:
+                letter_grade = scale.letter_for(total_weighted / total_weight) if total_weight > 0 else ''
+
+            results[student_id] = {
+                'course_gpa': course_gpas.get(student_id),
+                'credits': course.credits,
+                'cass_mark': marks['cass_mark'],
+                'exam_mark': marks['exam_mark'],
+                'final_mark': marks['final_mark'],
+                'letter_grade': letter_grade,
+            }
+
+        return results
+
+    @classmethod
+    def refresh(cls, student, course):
+        """Recompute and store the result for a student in a course"""
+        values = cls.compute(student, course)
+        if values is None:
+            cls.objects.filter(student=student, course=course).delete()
+            return None
+
+        result, created = cls.objects.update_or_create(student=student, course=course, defaults=values)
+        return result
+
+    @classmethod
+    def refresh_course(cls, course, students=None):
+        """Recompute stored results for every student graded in a course
+
+        Changed results are upserted in bulk, so the cost does not grow with a
+        query per student. Pass students to limit the refresh to those students.
+        """
+        computed = cls.compute_course(course, students=students)
+        stored = cls.objects.filter(course=course)
+        if students is not None:
+            stored = stored.filter(student__in=students)
+        stored = {result.student_id: result for result in stored}
+
+        now = timezone.now()
+        results = [
+            cls(student_id=student_id, course=course, updated_at=now, **values)
+            for student_id, values in computed.items()
+            if student_id not in stored
+            or any(getattr(stored[student_id], field) != value for field, value in values.items())
+        ]
+        cls.objects.bulk_create(
+            results,
+            update_conflicts=True,
+            unique_fields=['student', 'course'],
+            update_fields=cls.RESULT_FIELDS + ['updated_at']
+        )
+
+        # Drop results for students whose grades were all removed
+        orphaned = {student_id: result.pk for student_id, result in stored.items() if student_id not in computed}
+        if orphaned:
+            cls.objects.filter(pk__in=orphaned.values()).delete()
+
+        # Bulk writes skip the result signals, so update the term history here
+        changed_students = {result.student_id for result in results} | set(orphaned)
+        if changed_students:
+            StudentTermResult.refresh_students(changed_students)
+
+class StudentTermResult(models.Model):
+    """GPA history of a student, one row per academic term, kept current from course results"""
+    # Position of each semester within an academic year
+    SEMESTER_ORDER = {'spring': 1, 'summer': 2, 'fall': 3, 'winter': 4}
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='term_results')
+    semester = models.CharField(max_length=20, choices=Course.SEMESTER_CHOICES)
+    year = models.IntegerField()
+    term_order = models.IntegerField(help_text="Sortable term key: year * 10 + semester position")
+    credits_attempted = models.IntegerField(default=0)
+    credits_earned = models.IntegerField(default=0)
+    grade_points = models.FloatField(default=0)
+    term_gpa = models.FloatField(null=True, blank=True)
+    cumulative_gpa = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields compared when checking the stored history for drift
+    RESULT_FIELDS = ['term_order', 'credits_attempted', 'credits_earned', 'grade_points', 'term_gpa', 'cumulative_gpa']
+
+    class Meta:
+        unique_together = ['student', 'year', 'semester']
+        ordering = ['term_order']
+        indexes = [models.Index(fields=['student', 'term_order'])]
+        verbose_name = "Student Term Result"
+        verbose_name_plural = "Student Term Results"
+
+    def __str__(self):
+        return f"{self.student.username} - {self.get_semester_display()} {self.year} ({self.term_gpa})"
+
+    @classmethod
+    def compute_students(cls, student_ids):
+        """Compute {(student_id, year, semester): values} for the full history of each student"""
+        results = StudentCourseResult.objects.filter(
+            student__in=student_ids,
+            course__enrollments__student=F('student'),
+            course__enrollments__status='enrolled',
+            course__semester__in=cls.SEMESTER_ORDER
+        ).values_list('student_id', 'course__year', 'course__semester', 'letter_grade', 'credits')
+
+        # Totals per term, counted the way transcripts count them
+        terms = {}
+        for student_id, year, semester, letter_grade, credits in results:
+            grade_value = letter_grade or 'I'
+            if grade_value in ['I', 'W']:
+                continue
+            term = terms.setdefault((student_id, year, semester), {
+                'term_order': year * 10 + cls.SEMESTER_ORDER[semester],
+                'credits_attempted': 0,
+                'credits_earned': 0,
+                'grade_points': 0.0,
+            })
+            term['credits_attempted'] += credits
+            term['grade_points'] += (Grade.GRADE_POINTS.get(grade_value) or 0.0) * credits
+            if grade_value in Grade.PASSING_GRADES or grade_value == 'P':
+                term['credits_earned'] += credits
+
+        # Running totals in term order give the cumulative GPA
+        cumulative = {}
+        for key in sorted(terms, key=lambda key: (key[0], terms[key]['term_order'])):
+            term = terms[key]
+            totals = cumulative.setdefault(key[0], [0.0, 0])
+            totals[0] += term['grade_points']
+            totals[1] += term['credits_attempted']
+            term['grade_points'] = round(term['grade_points'], 2)
+            # Zero credit courses carry no weight, so a term of only those has no GPA
+            term['term_gpa'] = round(term['grade_points'] / term['credits_attempted'], 2) if term['credits_attempted'] else None
+            term['cumulative_gpa'] = round(totals[0] / totals[1], 2) if totals[1] else None
+
+        return terms
+
+    @classmethod
+    def refresh_students(cls, student_ids):
+        """Recompute and store the term history of each student"""
+        student_ids = list(student_ids)
+        computed = cls.compute_students(student_ids)
+        stored = {
+            (term.student_id, term.year, term.semester): term
+            for term in cls.objects.filter(student__in=student_ids)
+        }
+
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(student_id=key[0], year=key[1], semester=key[2], updated_at=now, **values)
+                for key, values in computed.items()
+                if key not in stored
+                or any(getattr(stored[key], field) != value for field, value in values.items())
+            ],
+            update_conflicts=True,
+            unique_fields=['student', 'year', 'semester'],
+            update_fields=cls.RESULT_FIELDS + ['updated_at']
+        )
+
+        # Drop terms that no longer have any graded course
+        removed = [term.pk for key, term in stored.items() if key not in computed]
+        if removed:
+            cls.objects.filter(pk__in=removed).delete()
+
+class AnnouncementQuerySet(models.QuerySet):
+    def addressed_to(self, user):
+        """Announcements whose audience includes a user, whether or not they are currently shown"""
+        audience = Q(audience='all')
+        try:
+            profile = user.userprofile
+        except (UserProfile.DoesNotExist, AttributeError):
+            profile = None
+        
+        if profile is not None and profile.user_type == 'student':
+            enrolled_courses = Enrollment.objects.filter(student=user, status='enrolled').values('course')
+            audience |= Q(audience='students') | Q(audience='course_specific', course__in=enrolled_courses)
+        elif profile is not None and profile.user_type == 'lecturer':
+            audience |= Q(audience='lecturers') | Q(audience='course_specific', course__lecturer=profile)
+        
+        return self.filter(audience)
+    
+    def current(self):
+        """Active announcements that have not expired"""
+        return self.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gte=timezone.now()),
+            is_active=True,
+        )
+    
+    def visible_to(self, user):
+        """Announcements a user may see, with the same rules as is_visible_to_user() in a single query"""
+        return self.addressed_to(user).current()
+    
+    def by_priority(self):
+        """Order by priority, most urgent first, then newest first"""
+        return self.annotate(priority_order=Announcement.priority_rank()).order_by('priority_order', '-created_at')
+
 class Announcement(models.Model):
     PRIORITY_CHOICES = [
         ('low', 'Low'),
@@ -669,14 +1406,114 @@ class Announcement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Sort position of each priority, most urgent first
+    PRIORITY_ORDER = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+    # When the next shown announcement expires, False if none will
+    NEXT_EXPIRY_CACHE_KEY = 'announcements:next_expiry'
+    
     class Meta:
         ordering = ['-is_pinned', '-created_at']
         verbose_name = "Announcement"
         verbose_name_plural = "Announcements"
     
+    objects = AnnouncementQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} - {self.get_priority_display()}"
     
+    @classmethod
+    def priority_rank(cls, field='priority'):
+        """Expression ranking a priority field in PRIORITY_ORDER, for ordering in the database"""
+        return Case(
+            *[When(**{field: priority}, then=Value(order)) for priority, order in cls.PRIORITY_ORDER.items()],
+            default=Value(len(cls.PRIORITY_ORDER)),
+            output_field=models.IntegerField()
+        )
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """Move every cached announcement list to a new version"""
+        bump_version(ANNOUNCEMENTS, 'all')
+        cache.delete(cls.NEXT_EXPIRY_CACHE_KEY)
+    
+    @classmethod
+    def invalidate_expired(cls):
+        """Invalidate cached announcement lists once the next shown announcement has expired"""
+        next_expiry = cache.get(cls.NEXT_EXPIRY_CACHE_KEY)
+        if next_expiry is None:
+            next_expiry = cls.objects.current().aggregate(Min('expires_at'))['expires_at__min'] or False
+            cache.set(cls.NEXT_EXPIRY_CACHE_KEY, next_expiry, None)
+        if next_expiry and next_expiry < timezone.now():
+            cls.invalidate_cache()
+    
+    @classmethod
+    def deactivate_expired(cls):
+        """Deactivate every announcement past its expiry date in one statement. Returns the row count."""
+        now = timezone.now()
+        expired = cls.objects.filter(is_active=True, expires_at__lt=now).update(is_active=False, updated_at=now)
+        if expired:
+            # Bulk updates skip the save signals
+            cls.invalidate_cache()
+        return expired
+    
+    @staticmethod
+    def audience_signature(user, course_ids=None):
+        """Role plus a hash of the user's courses, which is all visible_to() depends on
+        
+        Pass course_ids (enrolled or taught) when they are already loaded.
+        """
+        try:
+            profile = user.userprofile
+        except (UserProfile.DoesNotExist, AttributeError):
+            profile = None
+        role = profile.user_type if profile is not None else 'none'
+        
+        if course_ids is None:
+            if role == 'student':
+                course_ids = Enrollment.objects.filter(student=user, status='enrolled').values_list('course_id', flat=True)
+            elif role == 'lecturer':
+                course_ids = Course.objects.filter(lecturer=profile).values_list('id', flat=True)
+            else:
+                course_ids = []
+        digest = hashlib.sha1(','.join(str(course_id) for course_id in sorted(course_ids)).encode()).hexdigest()
+        return f'{role}:{digest[:16]}'
+    
+    @classmethod
+    def get_visible_for(cls, user, limit, course_ids=None):
+        """Get the first `limit` of visible_to(user), most urgent first
+        
+        Cached once for all users with the same audience signature. Only the
+        top rows are stored, for small widgets; full lists are paginated in SQL.
+        """
+        cls.invalidate_expired()
+        cache_key = versioned_key(ANNOUNCEMENTS, 'all', 'visible', cls.audience_signature(user, course_ids), limit)
+        announcements = cache.get(cache_key)
+        if announcements is None:
+            announcements = list(cls.objects.visible_to(user).select_related('course', 'author').by_priority()[:limit])
+            cache.set(cache_key, announcements, getattr(settings, 'ANNOUNCEMENT_CACHE_TIMEOUT', 3600))
+        return announcements
+    
+    def recipients(self):
+        """Users in the audience of this announcement, whether or not it is currently shown"""
+        if self.audience == 'all':
+            return User.objects.all()
+        elif self.audience == 'students':
+            return User.objects.filter(userprofile__user_type='student')
+        elif self.audience == 'lecturers':
+            return User.objects.filter(userprofile__user_type='lecturer')
+        elif self.audience == 'course_specific' and self.course_id:
+            return User.objects.filter(
+                Q(
+                    userprofile__user_type='student',
+                    pk__in=Enrollment.objects.filter(course_id=self.course_id, status='enrolled').values('student')
+                )
+                | Q(
+                    userprofile__user_type='lecturer',
+                    userprofile__in=Course.objects.filter(pk=self.course_id).values('lecturer')
+                )
+            )
+        return User.objects.none()
+    
     def is_expired(self):
         if self.expires_at:
             return timezone.now() > self.expires_at
@@ -707,6 +1544,187 @@ class Announcement(models.Model):
         
         return False
 
+class AnnouncementDeliveryQuerySet(models.QuerySet):
+    def inbox(self, user):
+        """Deliveries to a user whose announcement is currently shown, newest first"""
+        return self.filter(
+            Q(announcement__expires_at__isnull=True) | Q(announcement__expires_at__gte=timezone.now()),
+            user=user,
+            announcement__is_active=True,
+        ).order_by('-created_at')
+    
+    def by_priority(self):
+        """Order by announcement priority, most urgent first, then newest first"""
+        return self.annotate(
+            priority_order=Announcement.priority_rank('announcement__priority')
+        ).order_by('priority_order', '-created_at')
+    
+    def mark_read(self):
+        """Mark the unread deliveries in this queryset as read"""
+        return self.filter(is_read=False).update(is_read=True, read_at=timezone.now())
+
+class AnnouncementDelivery(models.Model):
+    """An announcement in one recipient's inbox, with its read state"""
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='deliveries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='announcement_deliveries')
+    created_at = models.DateTimeField(help_text="Copied from the announcement so the inbox is read from one index")
+    is_read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    
+    # Rows written per INSERT when fanning an announcement out
+    BATCH_SIZE = 500
+    
+    class Meta:
+        unique_together = ['announcement', 'user']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+        ordering = ['-created_at']
+        verbose_name = "Announcement Delivery"
+        verbose_name_plural = "Announcement Deliveries"
+    
+    objects = AnnouncementDeliveryQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"{self.announcement.title} - {self.user.username}"
+    
+    @classmethod
+    def deliver(cls, announcement):
+        """Sync the inbox rows of an announcement with its audience
+        
+        Recipients who already have the announcement keep their read state and
+        users no longer in the audience lose it. Returns (added, removed).
+        """
+        recipients = announcement.recipients()
+        delivered = set(cls.objects.filter(announcement=announcement).values_list('user_id', flat=True))
+        added = cls.objects.bulk_create(
+            [
+                cls(announcement=announcement, user_id=user_id, created_at=announcement.created_at)
+                for user_id in recipients.values_list('id', flat=True).iterator(chunk_size=cls.BATCH_SIZE)
+                if user_id not in delivered
+            ],
+            batch_size=cls.BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        removed, _ = cls.objects.filter(announcement=announcement).exclude(user__in=recipients).delete()
+        return len(added), removed
+    
+    @classmethod
+    def schedule(cls, announcement):
+        """Fan an announcement out once the transaction saving it commits"""
+        transaction.on_commit(lambda: cls.deliver(announcement))
+    
+    @classmethod
+    def deliver_course(cls, course_id, user_ids, enrolled):
+        """Add or remove the course announcements of a course in the inboxes of some students"""
+        if not user_ids:
+            return
+        announcements = Announcement.objects.filter(audience='course_specific', course_id=course_id)
+        students = []
+        if enrolled:
+            students = list(UserProfile.objects.filter(
+                user_id__in=user_ids, user_type='student'
+            ).values_list('user_id', flat=True))
+            rows = list(announcements.values_list('id', 'created_at'))
+            cls.objects.bulk_create(
+                [
+                    cls(announcement_id=announcement_id, user_id=user_id, created_at=created_at)
+                    for user_id in students
+                    for announcement_id, created_at in rows
+                ],
+                batch_size=cls.BATCH_SIZE,
+                ignore_conflicts=True
+            )
+        
+        removed = [user_id for user_id in user_ids if user_id not in students]
+        if removed:
+            cls.objects.filter(user_id__in=removed, announcement__in=announcements).exclude(
+                announcement__course__lecturer__user_id=F('user_id')
+            ).delete()
+    
+    @classmethod
+    def deliver_to(cls, user, announcements=None):
+        """Sync the inbox of one user with the announcements addressed to them. Returns (added, removed)."""
+        if announcements is None:
+            announcements = Announcement.objects.all()
+        addressed = announcements.addressed_to(user)
+        delivered = set(
+            cls.objects.filter(user=user, announcement__in=announcements).values_list('announcement_id', flat=True)
+        )
+        added = cls.objects.bulk_create(
+            [
+                cls(announcement_id=announcement_id, user=user, created_at=created_at)
+                for announcement_id, created_at in addressed.values_list('id', 'created_at')
+                if announcement_id not in delivered
+            ],
+            batch_size=cls.BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        removed, _ = cls.objects.filter(
+            user=user, announcement__in=announcements
+        ).exclude(announcement__in=addressed).delete()
+        return len(added), removed
+
+class AnnouncementArchive(models.Model):
+    """An announcement moved out of the live table once its retention window has passed"""
+    announcement_id = models.BigIntegerField(unique=True, help_text="Id the announcement had while live")
+    title = models.CharField(max_length=200)
+    content = models.TextField()
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_announcements')
+    priority = models.CharField(max_length=10, choices=Announcement.PRIORITY_CHOICES)
+    audience = models.CharField(max_length=20, choices=Announcement.AUDIENCE_CHOICES)
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_announcements')
+    is_pinned = models.BooleanField(default=False)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    # Fields copied from the live announcement
+    COPIED_FIELDS = ['title', 'content', 'author_id', 'priority', 'audience', 'course_id', 'is_pinned',
+                     'expires_at', 'created_at', 'updated_at']
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Announcement Archive"
+        verbose_name_plural = "Announcement Archive"
+    
+    def __str__(self):
+        return f"{self.title} (archived)"
+    
+    @classmethod
+    def archive_batch(cls, cutoff, batch_size):
+        """Move up to batch_size inactive announcements last changed before cutoff. Returns the row count."""
+        announcements = list(
+            Announcement.objects.filter(is_active=False, updated_at__lt=cutoff).order_by('id')[:batch_size]
+        )
+        if not announcements:
+            return 0
+        
+        ids = [announcement.id for announcement in announcements]
+        with transaction.atomic():
+            # Writing first takes the database write lock before anything is re-read
+            cls.objects.bulk_create(
+                [
+                    cls(announcement_id=announcement.id,
+                        **{field: getattr(announcement, field) for field in cls.COPIED_FIELDS})
+                    for announcement in announcements
+                ],
+                ignore_conflicts=True
+            )
+            # Any save moves updated_at past the cutoff, so rows still matching are unchanged
+            unchanged = set(
+                Announcement.objects.filter(
+                    pk__in=ids, is_active=False, updated_at__lt=cutoff
+                ).values_list('id', flat=True)
+            )
+            # Put back posts edited or re-activated since they were read; rows
+            # already gone were archived by a concurrent run
+            changed = Announcement.objects.filter(pk__in=ids).exclude(pk__in=unchanged).values_list('id', flat=True)
+            cls.objects.filter(announcement_id__in=list(changed)).delete()
+            Announcement.objects.filter(pk__in=unchanged).delete()
+        return len(unchanged)
+
 class StudyMaterial(models.Model):
     MATERIAL_TYPE_CHOICES = [
         ('lecture_notes', 'Lecture Notes'),
@@ -1037,6 +2055,180 @@ class ClassSchedule(models.Model):
         else:
             return "Scheduled"
 
+class LecturerDashboardCounters(models.Model):
+    """Lecturer dashboard counts, adjusted by signals and reconciled against the database"""
+    lecturer = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='dashboard_counters')
+    total_courses = models.IntegerField(default=0)
+    total_students = models.IntegerField(default=0)
+    pending_submissions = models.IntegerField(default=0)
+    upcoming_classes = models.IntegerField(default=0)
+    upcoming_refresh_at = models.DateTimeField(null=True, blank=True,
+                                               help_text="When a class next enters or leaves the upcoming window")
+    reconciled_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Classes starting within this window count as upcoming
+    UPCOMING_WINDOW = timedelta(days=7)
+    # Counters older than this are recounted from the database on the next read
+    RECONCILE_INTERVAL = timedelta(hours=1)
+    COUNTER_FIELDS = ['total_courses', 'total_students', 'pending_submissions', 'upcoming_classes']
+
+    # Saved field values remembered on each instance to work out counter deltas
+    TRACKED_FIELDS = {
+        Course: ['lecturer_id', 'is_active'],
+        Enrollment: ['student_id', 'course_id', 'status'],
+        AssignmentSubmission: ['assignment_id', 'status'],
+        ClassSchedule: ['lecturer_id'],
+    }
+
+    class Meta:
+        verbose_name = "Lecturer Dashboard Counters"
+        verbose_name_plural = "Lecturer Dashboard Counters"
+
+    def __str__(self):
+        return f"{self.lecturer.user.username} dashboard counters"
+
+    @classmethod
+    def compute(cls, lecturer_id):
+        """Count every dashboard figure of a lecturer from the database"""
+        courses = Course.objects.filter(lecturer_id=lecturer_id, is_active=True)
+        return {
+            'total_courses': courses.count(),
+            'total_students': Enrollment.objects.filter(
+                course__in=courses,
+                status='enrolled'
+            ).values('student').distinct().count(),
+            'pending_submissions': AssignmentSubmission.objects.filter(
+                assignment__course__in=courses,
+                status='submitted'
+            ).count(),
+            **cls.compute_upcoming(lecturer_id),
+        }
+
+    @classmethod
+    def compute_upcoming(cls, lecturer_id):
+        """Count upcoming classes and work out when that count next changes with time"""
+        now = timezone.now()
+        window_end = now + cls.UPCOMING_WINDOW
+        in_window = Q(start_datetime__lte=window_end)
+        classes = ClassSchedule.objects.filter(lecturer_id=lecturer_id, start_datetime__gte=now).aggregate(
+            upcoming=Count('id', filter=in_window),
+            next_start=Min('start_datetime', filter=in_window),
+            next_entry=Min('start_datetime', filter=~in_window),
+        )
+
+        # The next class to start leaves the window, the first one beyond it enters
+        changes = [classes['next_start']]
+        if classes['next_entry'] is not None:
+            changes.append(classes['next_entry'] - cls.UPCOMING_WINDOW)
+        changes = [change for change in changes if change is not None]
+        return {
+            'upcoming_classes': classes['upcoming'],
+            'upcoming_refresh_at': min(changes) if changes else None,
+        }
+
+    @classmethod
+    def for_lecturer(cls, lecturer):
+        """Get the counters of a lecturer, building or refreshing them only when needed"""
+        now = timezone.now()
+        try:
+            counters = cls.objects.get(lecturer=lecturer)
+        except cls.DoesNotExist:
+            counters, created = cls.objects.get_or_create(lecturer=lecturer, defaults=cls.compute(lecturer.id))
+            return counters
+
+        if counters.reconciled_at <= now - cls.RECONCILE_INTERVAL:
+            counters.reconcile()
+        elif counters.upcoming_refresh_at is not None and counters.upcoming_refresh_at <= now:
+            for field, value in cls.compute_upcoming(lecturer.id).items():
+                setattr(counters, field, value)
+            counters.save(update_fields=['upcoming_classes', 'upcoming_refresh_at', 'updated_at'])
+        return counters
+
+    def reconcile(self):
+        """Recount every figure from the database, returning {field: (stored, actual)} for drifted ones"""
+        values = self.compute(self.lecturer_id)
+        drift = {
+            field: (getattr(self, field), values[field])
+            for field in self.COUNTER_FIELDS if getattr(self, field) != values[field]
+        }
+        for field, value in values.items():
+            setattr(self, field, value)
+        self.reconciled_at = timezone.now()
+        self.save()
+        return drift
+
+    @classmethod
+    def adjust(cls, lecturer_id, **deltas):
+        """Atomically add deltas to the counters of a lecturer, if they have been built"""
+        cls.objects.filter(lecturer_id=lecturer_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+    @classmethod
+    def reconcile_lecturers(cls, lecturer_ids):
+        """Recount the counters of lecturers that have them"""
+        for counters in cls.objects.filter(lecturer_id__in=[pk for pk in lecturer_ids if pk is not None]):
+            counters.reconcile()
+
+    @classmethod
+    def refresh_upcoming(cls, lecturer_ids):
+        """Recount upcoming classes of lecturers after their schedule changed"""
+        for lecturer_id in {pk for pk in lecturer_ids if pk is not None}:
+            cls.objects.filter(lecturer_id=lecturer_id).update(**cls.compute_upcoming(lecturer_id))
+
+    @classmethod
+    def track_enrollment(cls, enrollment_id, old_state, new_state):
+        """Adjust distinct student counts after an enrollment moved between states"""
+        if old_state == new_state:
+            return
+        old_key, new_key = cls._enrolled_student_key(old_state), cls._enrolled_student_key(new_state)
+        if old_key == new_key:
+            return
+
+        # A student counts once per lecturer, however many of their courses they take
+        for key, delta in [(old_key, -1), (new_key, 1)]:
+            if key is None:
+                continue
+            lecturer_id, student_id = key
+            enrolled_elsewhere = Enrollment.objects.filter(
+                student_id=student_id,
+                course__lecturer_id=lecturer_id,
+                course__is_active=True,
+                status='enrolled'
+            ).exclude(pk=enrollment_id).exists()
+            if not enrolled_elsewhere:
+                cls.adjust(lecturer_id, total_students=delta)
+
+    @classmethod
+    def _enrolled_student_key(cls, state):
+        if not state or state['status'] != 'enrolled':
+            return None
+        lecturer_id = Course.objects.filter(pk=state['course_id'], is_active=True).values_list(
+            'lecturer_id', flat=True
+        ).first()
+        return (lecturer_id, state['student_id']) if lecturer_id else None
+
+    @classmethod
+    def track_submission(cls, old_state, new_state):
+        """Adjust pending submission counts after a submission moved between states"""
+        if old_state == new_state:
+            return
+        old_lecturer, new_lecturer = cls._pending_submission_lecturer(old_state), cls._pending_submission_lecturer(new_state)
+        if old_lecturer != new_lecturer:
+            if old_lecturer:
+                cls.adjust(old_lecturer, pending_submissions=-1)
+            if new_lecturer:
+                cls.adjust(new_lecturer, pending_submissions=1)
+
+    @classmethod
+    def _pending_submission_lecturer(cls, state):
+        if not state or state['status'] != 'submitted':
+            return None
+        return Assignment.objects.filter(pk=state['assignment_id'], course__is_active=True).values_list(
+            'course__lecturer_id', flat=True
+        ).first()
+
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     # Only save if UserProfile exists
@@ -1045,3 +2237,201 @@ def save_user_profile(sender, instance, **kwargs):
     else:
         # Create UserProfile if it doesn't exist
         UserProfile.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def refresh_student_course_result(sender, instance, **kwargs):
+    # Keep the stored course result in step with the student's grades
+    StudentCourseResult.refresh(instance.student, instance.course)
+
+@receiver(post_save, sender=Course)
+def sync_result_credits(sender, instance, created, **kwargs):
+    if not created:
+        StudentCourseResult.objects.filter(course=instance).exclude(
+            credits=instance.credits
+        ).update(credits=instance.credits)
+        # Credits, semester or year may have changed the term history
+        StudentTermResult.refresh_students(
+            StudentCourseResult.objects.filter(course=instance).values_list('student_id', flat=True)
+        )
+
+@receiver(post_save, sender=StudentCourseResult)
+@receiver(post_delete, sender=StudentCourseResult)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def refresh_student_term_results(sender, instance, **kwargs):
+    # Keep the stored term history in step with the student's course results
+    StudentTermResult.refresh_students([instance.student_id])
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_course_performance(sender, instance, **kwargs):
+    # Cached performance snapshots are keyed by this version
+    bump_version(COURSE_PERFORMANCE, instance.course_id)
+
+@receiver(post_save, sender=Course)
+def seed_course_weight_scheme(sender, instance, created, **kwargs):
+    # New courses start with a full scheme, so their marks never fall back to per-grade weights
+    if created:
+        instance.seed_assessment_weights()
+
+@receiver(post_save, sender=AssessmentWeightScheme)
+@receiver(post_delete, sender=AssessmentWeightScheme)
+def invalidate_weight_scheme(sender, instance, **kwargs):
+    bump_version(WEIGHT_SCHEME, instance.course_id)
+    bump_version(COURSE_PERFORMANCE, instance.course_id)
+
+def bump_enrolled_students(namespace, course_id):
+    """Bump a per-student version for every student enrolled in a course"""
+    for student_id in Enrollment.objects.filter(course_id=course_id, status='enrolled').values_list('student_id', flat=True):
+        bump_version(namespace, student_id)
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def invalidate_student_results(sender, instance, **kwargs):
+    # Dashboard panels are keyed by these versions
+    bump_version(STUDENT_RESULTS, instance.student_id)
+
+@receiver(post_save, sender=AssessmentWeightScheme)
+@receiver(post_delete, sender=AssessmentWeightScheme)
+def invalidate_course_results(sender, instance, **kwargs):
+    bump_enrolled_students(STUDENT_RESULTS, instance.course_id)
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_student_courses(sender, instance, **kwargs):
+    bump_version(STUDENT_COURSES, instance.student_id)
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_listings(sender, instance, **kwargs):
+    bump_enrolled_students(STUDENT_COURSES, instance.id)
+    bump_version(LECTURER_COURSES, instance.lecturer_id)
+    # A reassigned course also leaves the previous lecturer's list. The remembered
+    # state is still the one loaded from the database; the counter receivers
+    # registered further down move it on after this.
+    previous = getattr(instance, '_dashboard_state', None) or {}
+    if previous.get('lecturer_id') not in (None, instance.lecturer_id):
+        bump_version(LECTURER_COURSES, previous['lecturer_id'])
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def invalidate_student_assignments(sender, instance, **kwargs):
+    bump_version(STUDENT_ASSIGNMENTS, instance.student_id)
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def invalidate_course_assignments(sender, instance, **kwargs):
+    bump_enrolled_students(STUDENT_ASSIGNMENTS, instance.course_id)
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def invalidate_announcements(sender, instance, **kwargs):
+    # Covers the create, edit and delete views as well as admin saves
+    Announcement.invalidate_cache()
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def deliver_enrollment_announcements(sender, instance, **kwargs):
+    # Joining or leaving a course adds or removes its announcements from the inbox
+    enrolled = kwargs['signal'] is post_save and instance.status == 'enrolled'
+    AnnouncementDelivery.deliver_course(instance.course_id, [instance.student_id], enrolled)
+
+@receiver(post_save, sender=Course)
+def deliver_reassigned_course_announcements(sender, instance, **kwargs):
+    # Same remembered state as invalidate_course_listings, before the counters move it on
+    previous = getattr(instance, '_dashboard_state', None) or {}
+    if previous.get('lecturer_id') != instance.lecturer_id:
+        for announcement in Announcement.objects.filter(audience='course_specific', course=instance):
+            AnnouncementDelivery.deliver(announcement)
+
+@receiver(post_init, sender=UserProfile)
+def remember_user_type(sender, instance, **kwargs):
+    instance._delivered_user_type = instance.__dict__.get('user_type')
+
+@receiver(post_save, sender=UserProfile)
+def deliver_role_announcements(sender, instance, created, **kwargs):
+    # The role decides which announcements reach a user
+    if created or instance.user_type != instance._delivered_user_type:
+        AnnouncementDelivery.deliver_to(instance.user)
+        instance._delivered_user_type = instance.user_type
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=Enrollment)
+@receiver(post_init, sender=AssignmentSubmission)
+@receiver(post_init, sender=ClassSchedule)
+def remember_dashboard_state(sender, instance, **kwargs):
+    # Deferred fields leave the state unknown, which falls back to a recount
+    fields = LecturerDashboardCounters.TRACKED_FIELDS[sender]
+    if all(field in instance.__dict__ for field in fields):
+        instance._dashboard_state = {field: instance.__dict__[field] for field in fields}
+    else:
+        instance._dashboard_state = None
+
+def _dashboard_state_change(sender, instance, created):
+    """Get the (previous, current) tracked state of an instance and remember the current one"""
+    previous = None if created else getattr(instance, '_dashboard_state', None)
+    current = {field: getattr(instance, field) for field in LecturerDashboardCounters.TRACKED_FIELDS[sender]}
+    instance._dashboard_state = current
+    return previous, current
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def count_enrolled_students(sender, instance, created=False, **kwargs):
+    previous, current = _dashboard_state_change(sender, instance, created)
+    if kwargs['signal'] is post_delete:
+        previous, current = previous or current, None
+    elif previous is None and not created:
+        course = Course.objects.filter(pk=instance.course_id).values_list('lecturer_id', flat=True).first()
+        LecturerDashboardCounters.reconcile_lecturers([course])
+        Course.reconcile_enrollment_counts([instance.course_id])
+        WaitlistPromotion.schedule(instance.course_id, 'seat_freed')
+        return
+    LecturerDashboardCounters.track_enrollment(instance.pk, previous, current)
+    Course.track_enrollment(previous, current)
+
+    # A seat left behind, or a student waitlisted while a seat was open, goes to the head of the waitlist
+    if previous and previous['status'] == 'enrolled' and (current or {}).get('status') != 'enrolled':
+        WaitlistPromotion.schedule(previous['course_id'], 'seat_freed')
+    elif current and current['status'] == 'waitlisted' and (previous or {}).get('status') != 'waitlisted':
+        WaitlistPromotion.schedule(current['course_id'], 'seat_open')
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_delete, sender=AssignmentSubmission)
+def count_pending_submissions(sender, instance, created=False, **kwargs):
+    previous, current = _dashboard_state_change(sender, instance, created)
+    if kwargs['signal'] is post_delete:
+        previous, current = previous or current, None
+    elif previous is None and not created:
+        lecturer = Assignment.objects.filter(pk=instance.assignment_id).values_list(
+            'course__lecturer_id', flat=True
+        ).first()
+        LecturerDashboardCounters.reconcile_lecturers([lecturer])
+        return
+    LecturerDashboardCounters.track_submission(previous, current)
+
+@receiver(post_save, sender=ClassSchedule)
+@receiver(post_delete, sender=ClassSchedule)
+def count_upcoming_classes(sender, instance, created=False, **kwargs):
+    # The upcoming window moves with time, so these are recounted rather than adjusted
+    previous, current = _dashboard_state_change(sender, instance, created)
+    LecturerDashboardCounters.refresh_upcoming([current['lecturer_id'], (previous or {}).get('lecturer_id')])
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def recount_lecturer_dashboard(sender, instance, created=False, **kwargs):
+    # Adding, removing, reassigning or (de)activating a course changes every count
+    previous, current = _dashboard_state_change(sender, instance, created)
+    if previous != current or kwargs['signal'] is post_delete:
+        LecturerDashboardCounters.reconcile_lecturers([current['lecturer_id'], (previous or {}).get('lecturer_id')])
+
+@receiver(post_save, sender=Course)
+def index_course_for_search(sender, instance, **kwargs):
+    # Kept in step here rather than by database triggers, which SQLite table remakes in migrations drop
+    index_courses([instance])
+
+@receiver(post_delete, sender=Course)
+def unindex_course_for_search(sender, instance, **kwargs):
+    unindex_courses([instance.pk])
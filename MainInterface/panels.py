@@ -0,0 +1,152 @@
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .caching import get_version
+
+# Panel name -> template rendering it
+PANEL_TEMPLATES = {
+    'student_stats': 'MainInterface/panels/student_stats.html',
+    'student_performance': 'MainInterface/panels/student_performance.html',
+    'student_assignments': 'MainInterface/panels/student_assignments.html',
+    'student_assignment_summary': 'MainInterface/panels/student_assignment_summary.html',
+    'student_grades': 'MainInterface/panels/student_grades.html',
+    'student_announcements': 'MainInterface/panels/student_announcements.html',
+    'lecturer_courses': 'MainInterface/panels/lecturer_courses.html',
+}
+
+# Formats a panel can be served in, each cached separately
+PANEL_FORMATS = ['html', 'json']
+
+
+def _stats_key(name, outcome):
+    return f'dashboard_panel_stats:{name}:{outcome}'
+
+
+def _count(name, outcome):
+    key = _stats_key(name, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, None)
+
+
+def _panel_key(request, name, versions, panel_format):
+    token = '.'.join(str(get_version(namespace, key)) for namespace, key in versions)
+    return f'dashboard_panel:{name}:{panel_format}:{request.user.id}:{token}'
+
+
+def get_panel(request, name, versions, build, panel_format='html'):
+    """Get a panel and whether it came from cache
+
+    versions lists the (namespace, key) pairs whose data the panel shows. On a
+    miss build() is called: it returns the template context for 'html' and the
+    JSON payload for 'json'.
+    """
+    cache_key = _panel_key(request, name, versions, panel_format)
+    panel = cache.get(cache_key)
+    if panel is not None:
+        _count(name, 'hits')
+        return panel, True
+
+    _count(name, 'misses')
+    if panel_format == 'html':
+        panel = render_to_string(PANEL_TEMPLATES[name], build(), request=request)
+    else:
+        panel = build()
+    cache.set(cache_key, panel, getattr(settings, 'DASHBOARD_PANEL_TIMEOUT', 300))
+    return panel, False
+
+
+def render_panel(request, name, versions, build_context):
+    """Render a dashboard panel, reusing the cached fragment while its data versions are unchanged"""
+    html, hit = get_panel(request, name, versions, build_context)
+    return mark_safe(html)
+
+
+def get_cached_panel(request, name, versions):
+    """Get the cached fragment of a panel without rendering it, or None"""
+    html = cache.get(_panel_key(request, name, versions, 'html'))
+    if html is None:
+        return None
+    _count(name, 'hits')
+    return mark_safe(html)
+
+
+def panel_placeholder(url):
+    """Markup the dashboard script replaces with the panel loaded from url"""
+    return format_html(
+        '<div class="dashboard-panel-loading" data-panel-url="{}" style="padding: 20px; text-align: center; color: #999;">Loading...</div>',
+        url
+    )
+
+
+class PanelTimer:
+    """Time a panel request and the queries it runs, for the Server-Timing header"""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.query_time = 0.0
+
+    def _time_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - start
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._wrapper = connection.execute_wrapper(self._time_query)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+        self.duration = time.perf_counter() - self.start
+
+    def server_timing(self, hit):
+        return ', '.join([
+            f'panel;desc="{self.name}";dur={self.duration * 1000:.1f}',
+            f'db;desc="{self.queries} queries";dur={self.query_time * 1000:.1f}',
+            f'cache;desc="{"hit" if hit else "miss"}"',
+        ])
+
+
+def panel_stats_shared():
+    """Whether the hit and miss counters are kept where every process can see them
+
+    With a per-process cache each worker counts its own requests only, and a
+    management command would always see zero.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def get_panel_stats():
+    """Get {panel name: hit and miss counts} since the counters were last reset"""
+    stats = {}
+    counts = cache.get_many([_stats_key(name, outcome) for name in PANEL_TEMPLATES for outcome in ('hits', 'misses')])
+    for name in PANEL_TEMPLATES:
+        hits = counts.get(_stats_key(name, 'hits'), 0)
+        misses = counts.get(_stats_key(name, 'misses'), 0)
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses) * 100, 1) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_panel_stats():
+    cache.delete_many([_stats_key(name, outcome) for name in PANEL_TEMPLATES for outcome in ('hits', 'misses')])
@@ -0,0 +1,73 @@
+import statistics
+
+from django.core.cache import cache
+
+from .caching import COURSE_PERFORMANCE, versioned_key
+
+# Snapshots are invalidated by version bumps; the timeout only bounds memory use
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+class CoursePerformanceSnapshot:
+    """Performance statistics for a course, cached until its grades or enrollments change"""
+
+    PASSING_GRADES = ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-']
+
+    # GPA histogram buckets as (label, lower bound, upper bound)
+    HISTOGRAM_BUCKETS = [
+        ('0.0-0.9', 0.0, 1.0),
+        ('1.0-1.9', 1.0, 2.0),
+        ('2.0-2.9', 2.0, 3.0),
+        ('3.0-4.0', 3.0, 4.01),
+    ]
+
+    def __init__(self, course_id, enrolled_students, grade_distribution, gpas):
+        self.course_id = course_id
+        self.enrolled_students = enrolled_students
+        self.grade_distribution = grade_distribution
+        self.total_graded = sum(grade_distribution.values())
+
+        passing_count = sum(grade_distribution.get(grade, 0) for grade in self.PASSING_GRADES)
+        self.pass_rate = round((passing_count / self.total_graded * 100), 2) if self.total_graded > 0 else 0
+
+        self.average_gpa = round(statistics.mean(gpas), 2) if gpas else None
+        self.median_gpa = round(statistics.median(gpas), 2) if gpas else None
+        self.stddev_gpa = round(statistics.pstdev(gpas), 2) if gpas else None
+        self.gpa_histogram = {
+            label: sum(1 for gpa in gpas if lower <= gpa < upper)
+            for label, lower, upper in self.HISTOGRAM_BUCKETS
+        }
+
+    @classmethod
+    def build(cls, course):
+        """Compute a fresh snapshot from the database"""
+        enrolled = course.enrollments.filter(status='enrolled')
+        gpas = [gpa for gpa in enrolled.with_gpa().values_list('course_gpa', flat=True) if gpa is not None]
+        return cls(
+            course_id=course.id,
+            enrolled_students=enrolled.count(),
+            grade_distribution=course.get_grade_distribution(),
+            gpas=gpas,
+        )
+
+    @classmethod
+    def for_course(cls, course):
+        """Get the cached snapshot for a course, building it on the first request after a change"""
+        cache_key = versioned_key(COURSE_PERFORMANCE, course.id, 'snapshot')
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            snapshot = cls.build(course)
+            cache.set(cache_key, snapshot, SNAPSHOT_TIMEOUT)
+        return snapshot
+
+    def as_dict(self):
+        return {
+            'enrolled_students': self.enrolled_students,
+            'total_graded': self.total_graded,
+            'pass_rate': self.pass_rate,
+            'average_gpa': self.average_gpa,
+            'median_gpa': self.median_gpa,
+            'stddev_gpa': self.stddev_gpa,
+            'gpa_histogram': self.gpa_histogram,
+            'grade_distribution': self.grade_distribution,
+        }
@@ -0,0 +1,109 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 table holding a copy of the searchable course columns, keyed by course id
+SQLITE_TABLE = 'maininterface_course_search'
+
+# PostgreSQL tsvector column generated from the same columns, with a GIN index
+POSTGRES_COLUMN = 'search_vector'
+
+# Columns searched, most telling first
+SEARCH_FIELDS = ['course_code', 'course_name', 'description']
+
+_backends = {}
+
+
+def search_backend():
+    """Get the search index of the database in use: 'fts5', 'postgres' or None when there is none"""
+    if connection.alias not in _backends:
+        backend = None
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                if SQLITE_TABLE in connection.introspection.table_names(cursor):
+                    backend = 'fts5'
+            elif connection.vendor == 'postgresql':
+                columns = connection.introspection.get_table_description(cursor, 'MainInterface_course')
+                if any(column.name == POSTGRES_COLUMN for column in columns):
+                    backend = 'postgres'
+        _backends[connection.alias] = backend
+    return _backends[connection.alias]
+
+
+def search_terms(query):
+    """Split a search box query into words"""
+    return re.findall(r'\w+', query.lower())
+
+
+def search_courses(courses, query):
+    """Filter a course queryset to a search query, best matches first
+
+    Every word must match, and a word also matches longer words starting with
+    it, so partly typed queries still find courses. Uses the full-text index
+    when the database has one and falls back to LIKE otherwise. Other filters
+    can be applied before or after. On SQLite the index is matched once, when
+    this is called.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return courses
+    backend = search_backend()
+
+    if backend == 'fts5':
+        # One MATCH against the index; the courses are then looked up by primary key.
+        # FTS5 ranks with bm25, where lower is better
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, rank FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [match])
+            ranks = dict(cursor.fetchall())
+        if not ranks:
+            return courses.none()
+        rank = Case(
+            *[When(pk=course_id, then=Value(course_rank)) for course_id, course_rank in ranks.items()],
+            output_field=FloatField()
+        )
+        return courses.filter(pk__in=list(ranks)).annotate(search_rank=rank).order_by('search_rank', 'course_code')
+
+    if backend == 'postgres':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        vector = f'"MainInterface_course"."{POSTGRES_COLUMN}"'
+        rank = RawSQL(f"ts_rank({vector}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+        matches = RawSQL(f"{vector} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        return courses.annotate(search_match=matches, search_rank=rank).filter(search_match=True).order_by(
+            F('search_rank').desc(), 'course_code'
+        )
+
+    # No index: every word must appear in one of the columns
+    for term in terms:
+        courses = courses.filter(Q(*[(f'{field}__icontains', term) for field in SEARCH_FIELDS], _connector=Q.OR))
+    return courses
+
+
+def index_courses(courses):
+    """Store the searchable columns of some courses in the SQLite index"""
+    if search_backend() != 'fts5':
+        return
+    rows = [(course.id, *[getattr(course, field) for field in SEARCH_FIELDS]) for course in courses]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def unindex_courses(course_ids):
+    """Remove courses from the SQLite index"""
+    if search_backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(pk,) for pk in course_ids])
+
+
+def indexed_courses():
+    """Get the searchable columns stored in the SQLite index, by course id"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid, {", ".join(SEARCH_FIELDS)} FROM {SQLITE_TABLE}')
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
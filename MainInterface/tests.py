@@ -1,3 +1,970 @@
-from django.test import TestCase
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .caching import STUDENT_RESULTS, get_version
+from .dashboard import StudentDashboardData
+from .enrollment import process_enrollment_requests
+from .grading import GradingScale
+from .models import (
+    Announcement, AnnouncementArchive, AnnouncementDelivery, AssessmentWeightScheme, Assignment, Course, Enrollment,
+    EnrollmentRequest, Grade, LecturerDashboardCounters, StudentCourseResult, StudentTermResult, WaitlistPromotion,
+)
+from .performance import CoursePerformanceSnapshot
+from .search import search_backend, search_courses
+
+
+def create_lecturer(username='lecturer'):
+    """Create a user with a lecturer profile"""
+    user = User.objects.create_user(username, password='password')
+    user.userprofile.user_type = 'lecturer'
+    user.userprofile.save()
+    return user
+
+
+def create_course(lecturer, course_code, **fields):
+    """Create a course taught by a lecturer user"""
+    fields.setdefault('course_name', f'Course {course_code}')
+    return Course.objects.create(course_code=course_code, lecturer=lecturer.userprofile, **fields)
+
+
+class StudentDashboardQueryBudgetTests(TestCase):
+    """The student dashboard must not issue more queries as the course count grows"""
+
+    # Queries StudentDashboardData.load() may run, whatever the course count
+    QUERY_BUDGET = 10
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.student = User.objects.create_user('student', password='password')
+        self.course_count = 0
+
+    def add_courses(self, count):
+        for _ in range(count):
+            self.course_count += 1
+            course = create_course(self.lecturer, f'CS{self.course_count:03d}', course_name=f'Course {self.course_count}')
+            Enrollment.objects.create(student=self.student, course=course, status='enrolled')
+            for grade_type, score in [('assignment', 72), ('quiz', 64), ('exam_mark', 58)]:
+                Grade.objects.create(
+                    student=self.student,
+                    course=course,
+                    grade_type=grade_type,
+                    grade_value='I',
+                    numeric_score=Decimal(score),
+                    max_points=Decimal(100),
+                    description=grade_type.title(),
+                )
+            Assignment.objects.create(
+                title=f'Assignment {self.course_count}',
+                description='Coursework',
+                course=course,
+                created_by=self.lecturer,
+                due_date=timezone.now() + timedelta(days=7),
+                status='published',
+            )
+            Announcement.objects.create(
+                title=f'Notice {self.course_count}',
+                content='Course notice',
+                author=self.lecturer,
+                audience='course_specific',
+                course=course,
+            )
+
+    def load_dashboard(self):
+        # Start from a cold cache so the weight and announcement expiry lookups are counted as well
+        cache.clear()
+        student = User.objects.select_related('userprofile').get(pk=self.student.pk)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            return StudentDashboardData.load(student)
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.add_courses(1)
+        data = self.load_dashboard()
+        self.assertEqual(len(data.enrolled_courses), 1)
+
+        self.add_courses(7)
+        data = self.load_dashboard()
+        self.assertEqual(len(data.enrolled_courses), 8)
+        self.assertEqual(len(data.recent_announcements), 3)
+        self.assertEqual(len(data.pending_assignments), 8)
+
+    def test_marks_match_per_course_calculation(self):
+        self.add_courses(3)
+        data = self.load_dashboard()
+
+        for course in data.enrolled_courses:
+            details = course.get_final_mark_details(self.student)
+            self.assertEqual(course.student_final_mark, course.calculate_final_mark(self.student))
+            self.assertEqual(course.student_cass_mark, course.calculate_cass_mark(self.student))
+            self.assertEqual(course.student_letter_grade, details['letter_grade'])
+            self.assertEqual(course.student_exam_mark, Decimal(58))
+
+    def test_view_renders(self):
+        self.add_courses(2)
+        self.client.login(username='student', password='password')
+        panel_url = reverse('student_dashboard_panel', args=['performance'])
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, panel_url)
+
+        response = self.client.get(panel_url)
+        self.assertContains(response, 'CS002')
+        self.assertIn('cache;desc="miss"', response['Server-Timing'])
+
+        # Rendered panels are inlined into the page instead of loaded again
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, 'CS002')
+        self.assertNotContains(response, panel_url)
+
+    def test_panel_json(self):
+        self.add_courses(2)
+        self.client.login(username='student', password='password')
+        response = self.client.get(reverse('student_dashboard_panel', args=['performance']), {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        courses = response.json()['data']['courses']
+        self.assertEqual([course['course_code'] for course in courses], ['CS001', 'CS002'])
+
+        response = self.client.get(reverse('student_dashboard_panel', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cache_stats_count_panel_requests(self):
+        self.add_courses(1)
+        self.client.login(username='student', password='password')
+        panel_url = reverse('student_dashboard_panel', args=['performance'])
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        }):
+            self.client.get(panel_url)
+            self.client.get(panel_url)
+            out = StringIO()
+            call_command('dashboard_cache_stats', stdout=out)
+        self.assertIn('student_performance: 1 hits, 1 misses (50.0%)', out.getvalue())
+
+    def test_cache_stats_refuse_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'local to each process'):
+            call_command('dashboard_cache_stats', stdout=StringIO())
+
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    """Parallel enroll requests must never put more students in a course than it has seats"""
+
+    SEATS = 25
+    REQUESTS = 200
+    THREADS = 20
+
+    def setUp(self):
+        cache.clear()
+        self.course = create_course(create_lecturer(), 'CS100', course_name='Popular Course', max_students=self.SEATS)
+        self.students = [User.objects.create(username=f'student{i}') for i in range(self.REQUESTS)]
+
+    def visit(self, url_name, student):
+        client = Client()
+        client.force_login(student)
+        try:
+            return client.get(reverse(url_name, args=[self.course.id])).status_code
+        finally:
+            connection.close()
+
+    def enroll(self, student):
+        return self.visit('enroll_course', student)
+
+    def drop(self, student):
+        return self.visit('drop_course', student)
+
+    def test_course_is_never_overfilled(self):
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            statuses = list(pool.map(self.enroll, self.students))
+
+        self.assertEqual(set(statuses), {302})
+        enrollments = Enrollment.objects.filter(course=self.course)
+        self.assertEqual(enrollments.count(), self.REQUESTS)
+        self.assertEqual(enrollments.filter(status='enrolled').count(), self.SEATS)
+        self.assertEqual(enrollments.filter(status='waitlisted').count(), self.REQUESTS - self.SEATS)
+
+    def test_repeated_requests_enroll_once(self):
+        student = self.students[0]
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            list(pool.map(self.enroll, [student] * self.THREADS))
+
+        self.assertEqual(Enrollment.objects.filter(course=self.course, student=student).count(), 1)
+
+    def test_parallel_drops_promote_the_waitlist_in_order(self):
+        for student in self.students[:50]:
+            self.enroll(student)
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            list(pool.map(self.drop, self.students[:10]))
+
+        # The ten seats go to the ten students who joined the waitlist first
+        enrolled = Enrollment.objects.filter(course=self.course, status='enrolled')
+        self.assertEqual(set(enrolled.values_list('student', flat=True)), {student.id for student in self.students[10:35]})
+        self.assertEqual(WaitlistPromotion.objects.filter(course=self.course, reason='seat_freed').count(), 10)
+
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, self.course.waitlist_count), (self.SEATS, 15))
+
+
+@override_settings(ENROLLMENT_RUSH_MODE=True)
+class EnrollmentRushModeTests(TestCase):
+    """In rush mode enroll requests are queued and applied in order by the worker"""
+
+    SEATS = 3
+
+    def setUp(self):
+        cache.clear()
+        self.course = create_course(create_lecturer(), 'CS200', course_name='Rush Course', max_students=self.SEATS)
+        self.students = [User.objects.create(username=f'student{i}') for i in range(5)]
+
+    def request_enrollment(self, student):
+        self.client.force_login(student)
+        return self.client.get(reverse('enroll_course', args=[self.course.id]))
+
+    def test_requests_are_queued_then_applied_in_order(self):
+        self.request_enrollment(self.students[0])
+        for student in self.students:
+            self.assertEqual(self.request_enrollment(student).status_code, 302)
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertEqual(EnrollmentRequest.objects.filter(status='queued').count(), 5)
+
+        last_request = EnrollmentRequest.objects.get(student=self.students[-1])
+        status_url = reverse('enrollment_request_status', args=[last_request.id])
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'queued', 'course_id': self.course.id, 'position': 5})
+
+        self.assertEqual(process_enrollment_requests(self.course.id), 5)
+        statuses = [Enrollment.objects.get(student=student).status for student in self.students]
+        self.assertEqual(statuses, ['enrolled'] * self.SEATS + ['waitlisted'] * 2)
+        self.assertEqual(self.client.get(status_url).json()['status'], 'waitlisted')
+
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, self.course.waitlist_count), (self.SEATS, 2))
+
+        # A student with an enrollment is not queued again
+        self.request_enrollment(self.students[0])
+        self.assertFalse(EnrollmentRequest.objects.filter(status='queued').exists())
+
+
+class BulkEnrollmentActionTests(TestCase):
+    """Lecturers can approve, reject or remove many enrollments in one request"""
+
+    SEATS = 4
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.course = create_course(self.lecturer, 'CS300', course_name='Approval Course', max_students=self.SEATS)
+        self.enrollments = [
+            Enrollment.objects.create(
+                student=User.objects.create(username=f'student{i}'),
+                course=self.course,
+                status='pending',
+                enrollment_date=timezone.now() - timedelta(hours=10 - i),
+            )
+            for i in range(10)
+        ]
+        self.client.login(username='lecturer', password='password')
+
+    def bulk_action(self, action, enrollments):
+        return self.client.post(reverse('bulk_enrollment_action', args=[self.course.id]), {
+            'action': action,
+            'enrollment_ids': [enrollment.id for enrollment in enrollments],
+        })
+
+    def test_approvals_fill_free_seats_in_order(self):
+        # Selected newest first; the oldest requests still get the seats
+        response = self.bulk_action('approve', reversed(self.enrollments))
+        self.assertRedirects(response, reverse('course_enrollments', args=[self.course.id]))
+
+        statuses = [Enrollment.objects.get(pk=enrollment.pk).status for enrollment in self.enrollments]
+        self.assertEqual(statuses, ['enrolled'] * self.SEATS + ['pending'] * 6)
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, self.course.pending_count), (self.SEATS, 6))
+
+        response = self.client.get(reverse('course_enrollments', args=[self.course.id]))
+        self.assertContains(response, 'student0')
+
+    def test_reject_and_remove(self):
+        self.bulk_action('approve', self.enrollments[:2])
+        self.bulk_action('reject', self.enrollments[2:])
+        self.bulk_action('unenroll', self.enrollments[:1])
+
+        self.assertEqual(Enrollment.objects.filter(course=self.course, status='rejected').count(), 8)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 9)
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, self.course.pending_count), (1, 0))
+
+    def test_waitlist_is_listed_in_order_and_can_be_approved(self):
+        waitlisted = self.enrollments[7:]
+        Enrollment.objects.filter(pk__in=[enrollment.pk for enrollment in waitlisted]).update(status='waitlisted')
+        Course.reconcile_enrollment_counts([self.course.id])
+
+        response = self.client.get(reverse('course_enrollments', args=[self.course.id]))
+        self.assertEqual(list(response.context['waitlisted_enrollments']), waitlisted)
+        self.assertContains(response, f'value="{waitlisted[0].id}" form="bulk-waitlisted"')
+
+        self.bulk_action('approve', waitlisted)
+        statuses = [Enrollment.objects.get(pk=enrollment.pk).status for enrollment in waitlisted]
+        self.assertEqual(statuses, ['enrolled'] * 3)
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.enrolled_count, self.course.waitlist_count), (3, 0))
+
+    def test_other_lecturers_courses_are_refused(self):
+        create_lecturer('other')
+        self.client.login(username='other', password='password')
+
+        self.bulk_action('approve', self.enrollments)
+        self.assertFalse(Enrollment.objects.filter(course=self.course, status='enrolled').exists())
+
+
+class BrowseCoursesQueryTests(TestCase):
+    """The course catalogue must not issue more queries as the course count grows"""
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.student = User.objects.create_user('student', password='password')
+        self.course_count = 0
+        self.client.login(username='student', password='password')
+        # The first request after login also sets up the session
+        self.client.get(reverse('browse_courses'))
+
+    def add_courses(self, count):
+        for _ in range(count):
+            self.course_count += 1
+            course = create_course(
+                self.lecturer, f'CS{self.course_count:03d}', course_name=f'Course {self.course_count}', max_students=1
+            )
+            if self.course_count % 2:
+                Enrollment.objects.create(student=self.student, course=course, status='enrolled')
+
+    def browse(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('browse_courses'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.add_courses(2)
+        response, few = self.browse()
+        self.assertContains(response, 'Drop Course', count=1)
+
+        self.add_courses(10)
+        response, many = self.browse()
+        self.assertEqual(many, few)
+        self.assertContains(response, 'Drop Course', count=6)
+        self.assertContains(response, '✅ Enroll', count=6)
+
+
+class CourseSearchTests(TestCase):
+    """Catalogue search goes through the full-text index and keeps it in step with the courses"""
+
+    def setUp(self):
+        lecturer = create_lecturer()
+        self.algorithms = create_course(
+            lecturer, 'CS201', course_name='Algorithms', description='Sorting and searching', level='undergraduate'
+        )
+        self.databases = create_course(
+            lecturer, 'CS301', course_name='Databases', description='Indexing and query algorithms', level='graduate'
+        )
+
+    def search(self, query, courses=None):
+        return [course.course_code for course in search_courses(courses or Course.objects.all(), query)]
+
+    def test_ranks_name_matches_first_and_matches_prefixes(self):
+        self.assertEqual(search_backend(), 'fts5')
+        self.assertEqual(self.search('algorithms'), ['CS201', 'CS301'])
+        self.assertEqual(self.search('algo'), ['CS201', 'CS301'])
+        self.assertEqual(self.search('index quer'), ['CS301'])
+        self.assertEqual(self.search('algo', Course.objects.filter(level='graduate')), ['CS301'])
+
+    def test_matches_once_and_looks_courses_up_by_key(self):
+        with CaptureQueriesContext(connection) as queries:
+            courses = search_courses(Course.objects.filter(level='graduate'), 'algo')
+            self.assertEqual([course.course_code for course in courses], ['CS301'])
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(sum('MATCH' in query['sql'] for query in queries), 1)
+
+        sql, params = courses.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('SCAN MainInterface_course', plan)
+        self.assertEqual(self.search('xyzzy'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.algorithms.course_name = 'Compilers'
+        self.algorithms.save()
+        self.assertEqual(self.search('compil'), ['CS201'])
+        self.assertEqual(self.search('algorithms'), ['CS301'])
+
+        self.databases.delete()
+        self.assertEqual(self.search('algorithms'), [])
+
+
+class StudentTermResultTests(TestCase):
+    """Term and cumulative GPAs follow grade and enrollment changes"""
+
+    def setUp(self):
+        self.lecturer = create_lecturer()
+        self.student = User.objects.create_user('student', password='password')
+
+    def grade(self, course, score):
+        Enrollment.objects.get_or_create(student=self.student, course=course, defaults={'status': 'enrolled'})
+        Grade.objects.create(
+            student=self.student, course=course, grade_type='exam_mark', grade_value='I',
+            numeric_score=Decimal(score), max_points=Decimal(100), description='Exam',
+        )
+
+    def test_zero_credit_term_has_no_gpa(self):
+        seminar = create_course(self.lecturer, 'SEM100', credits=0, semester='spring', year=2025)
+        self.grade(seminar, 80)
+
+        term = StudentTermResult.objects.get(student=self.student)
+        self.assertEqual(term.credits_attempted, 0)
+        self.assertIsNone(term.term_gpa)
+        self.assertIsNone(term.cumulative_gpa)
+
+        # A later term with credits starts the cumulative GPA
+        course = create_course(self.lecturer, 'CS100', credits=3, semester='fall', year=2025)
+        self.grade(course, 80)
+        term = StudentTermResult.objects.get(student=self.student, semester='fall')
+        self.assertEqual(term.credits_attempted, 3)
+        self.assertEqual(term.cumulative_gpa, term.term_gpa)
+        self.assertIsNotNone(term.term_gpa)
+
+    def test_terms_follow_years_and_enrollment(self):
+        spring_2024 = create_course(self.lecturer, 'CS100', credits=3, semester='spring', year=2024)
+        spring_2025 = create_course(self.lecturer, 'CS200', credits=3, semester='spring', year=2025)
+        self.grade(spring_2024, 95)
+        self.grade(spring_2025, 65)
+
+        profile = self.student.userprofile
+        self.assertEqual(profile.get_semester_gpa('spring', 2024), 4.0)
+        self.assertEqual(profile.get_semester_gpa('spring', 2025), 2.0)
+        # Without a year the latest spring is used
+        self.assertEqual(profile.get_semester_gpa('spring'), 2.0)
+        latest = StudentTermResult.objects.get(student=self.student, year=2025)
+        self.assertEqual((latest.cumulative_gpa, latest.credits_earned), (3.0, 3))
+
+        # A dropped course leaves the history
+        Enrollment.objects.filter(student=self.student, course=spring_2024).update(status='dropped')
+        StudentTermResult.refresh_students([self.student.id])
+        self.assertFalse(StudentTermResult.objects.filter(student=self.student, year=2024).exists())
+
+
+class AnnouncementInboxTests(TestCase):
+    """The announcements page is read a page at a time from the user's inbox"""
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.student = User.objects.create_user('student', password='password')
+        for i in range(25):
+            announcement = Announcement.objects.create(
+                title=f'Notice {i}', content='Campus notice', author=self.lecturer, audience='students',
+                is_pinned=i == 0,
+            )
+            AnnouncementDelivery.deliver(announcement)
+        self.client.login(username='student', password='password')
+
+    def test_pages_come_from_the_inbox(self):
+        response = self.client.get(reverse('announcements'))
+        self.assertEqual(len(response.context['pinned_announcements']), 1)
+        self.assertEqual(len(response.context['regular_announcements']), 20)
+        self.assertEqual(response.context['total_announcements'], 25)
+        self.assertEqual(response.context['unread_count'], 25)
+        self.assertTrue(all(a.is_unread for a in response.context['regular_announcements']))
+
+        # Only what was on screen is marked read
+        self.assertEqual(AnnouncementDelivery.objects.filter(user=self.student, is_read=False).count(), 4)
+        response = self.client.get(reverse('announcements'), {'page': 2})
+        self.assertEqual(len(response.context['regular_announcements']), 4)
+        self.assertEqual(response.context['unread_count'], 4)
+        self.assertFalse(response.context['pinned_announcements'][0].is_unread)
+
+        # Announcements not addressed to the user never reach the inbox
+        other = Announcement.objects.create(title='Staff', content='Staff only', author=self.lecturer, audience='lecturers')
+        AnnouncementDelivery.deliver(other)
+        response = self.client.get(reverse('announcements'))
+        self.assertEqual(response.context['total_announcements'], 25)
+
+    def test_widget_list_is_shared_and_holds_only_the_top_rows(self):
+        self.assertEqual(len(Announcement.get_visible_for(self.student, 3, course_ids=[])), 3)
+
+        # Another student with the same courses reads the same cache entry
+        User.objects.create_user('classmate')
+        classmate = User.objects.select_related('userprofile').get(username='classmate')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(Announcement.get_visible_for(classmate, 3, course_ids=[])), 3)
+
+        urgent = Announcement.objects.create(
+            title='Closure', content='Campus closed', author=self.lecturer, audience='students', priority='urgent',
+        )
+        self.assertEqual(Announcement.get_visible_for(classmate, 3, course_ids=[])[0], urgent)
+
+
+class GradingScaleTests(TestCase):
+    """Letters come from one scale per course, in Python and in SQL alike"""
+
+    STRICT = [('A', 95), ('B', 85), ('C', 75), ('D', 65)]
+
+    def test_boundaries(self):
+        scale = GradingScale()
+        self.assertEqual(scale.letter_for(100), 'A+')
+        self.assertEqual(scale.letter_for(90), 'A+')
+        self.assertEqual(scale.letter_for(89.99), 'A')
+        self.assertEqual(scale.letter_for(50), 'D-')
+        self.assertEqual(scale.letter_for(49.99), 'F')
+        self.assertEqual(scale.letter_for(0), 'F')
+
+    @override_settings(GRADING_SCALES={'CS200': STRICT, 'graduate': [('P', 50)]})
+    def test_sql_letters_follow_each_course_scale(self):
+        lecturer = create_lecturer()
+        student = User.objects.create_user('student')
+        courses = [
+            create_course(lecturer, 'CS100'),
+            create_course(lecturer, 'CS200', level='graduate'),
+            create_course(lecturer, 'CS300', level='graduate'),
+        ]
+        for course in courses:
+            for score in [96, 88, 72, 49.5]:
+                Grade.objects.create(
+                    student=student, course=course, grade_type='quiz', grade_value='I',
+                    numeric_score=Decimal(str(score)), max_points=Decimal(100),
+                )
+        Grade.objects.create(student=student, course=courses[0], grade_type='participation', grade_value='P')
+
+        grades = Grade.objects.with_letter().order_by('course__course_code', '-numeric_score')
+        letters = [(grade.course.course_code, grade.letter) for grade in grades.exclude(numeric_score=None)]
+        self.assertEqual(letters, [
+            ('CS100', 'A+'), ('CS100', 'A'), ('CS100', 'B-'), ('CS100', 'F'),
+            ('CS200', 'A'), ('CS200', 'B'), ('CS200', 'D'), ('CS200', 'F'),
+            ('CS300', 'P'), ('CS300', 'P'), ('CS300', 'P'), ('CS300', 'F'),
+        ])
+        # The same letters Grade.save() stored, and no letter without a score
+        self.assertTrue(all(grade.letter == grade.grade_value for grade in grades.exclude(numeric_score=None)))
+        self.assertIsNone(grades.get(numeric_score=None).letter)
+
+
+class AssessmentWeightTests(TestCase):
+    """Courses carry a weight scheme from the start and lecturers can only set sensible weights"""
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.course = create_course(self.lecturer, 'CS100')
+        self.client.login(username='lecturer', password='password')
+
+    def test_new_courses_start_with_the_default_weights(self):
+        self.assertEqual(self.course.get_assessment_weights(), self.course.get_default_weights())
+
+        student = User.objects.create_user('student')
+        for grade_type in ['assignment', 'quiz']:
+            Grade.objects.create(
+                student=student, course=self.course, grade_type=grade_type, grade_value='I',
+                numeric_score=Decimal(80), max_points=Decimal(100),
+            )
+        # Only the types the course grades count towards the total
+        self.assertEqual(self.course.validate_total_weights()['total_weight'], 50.0)
+
+        response = self.client.get(reverse('weight_management', args=[self.course.id]))
+        self.assertContains(response, 'name="weight_assignment"')
+        self.assertContains(response, 'value="30.0"')
+
+    def test_out_of_range_weights_are_refused(self):
+        url = reverse('weight_management', args=[self.course.id])
+        self.client.post(url, {'weight_assignment': '150', 'weight_quiz': '-5', 'weight_midterm': '40'})
+
+        weights = Course.objects.get(pk=self.course.pk).get_assessment_weights()
+        self.assertEqual((weights['assignment'], weights['quiz'], weights['midterm']), (30.0, 20.0, 40.0))
+
+    def test_results_version_moves_after_the_refresh(self):
+        student = User.objects.create_user('student')
+        Enrollment.objects.create(student=student, course=self.course, status='enrolled')
+        Grade.objects.create(
+            student=student, course=self.course, grade_type='assignment', grade_value='I',
+            numeric_score=Decimal(80), max_points=Decimal(100),
+        )
+        refresh_course = StudentCourseResult.refresh_course
+        versions = []
+
+        def refresh(course, students=None):
+            refresh_course(course, students=students)
+            versions.append(get_version(STUDENT_RESULTS, student.id))
+
+        url = reverse('weight_management', args=[self.course.id])
+        with mock.patch.object(StudentCourseResult, 'refresh_course', side_effect=refresh):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, {'weight_assignment': '50'})
+        # A panel cached during the refresh is keyed by a version that is already gone
+        self.assertEqual(len(versions), 1)
+        self.assertGreater(get_version(STUDENT_RESULTS, student.id), versions[0])
+
+
+class RecordTestScoresTests(TestCase):
+    """Saving a marking sheet writes the edited rows and reports real conflicts only"""
+
+    def setUp(self):
+        self.lecturer = create_lecturer()
+        self.course = create_course(self.lecturer, 'CS100')
+        self.grades = [
+            Grade.objects.create(
+                student=User.objects.create_user(f'student{i}'), course=self.course, grade_type='quiz',
+                grade_value='I', max_points=Decimal(50), description='Quiz 1',
+            )
+            for i in range(3)
+        ]
+        for grade in self.grades:
+            grade.refresh_from_db()
+
+    def entry(self, grade, score, comments='', loaded=None):
+        """A row as the marking sheet posts it, loaded at the given state of the grade"""
+        loaded = loaded or grade
+        return {
+            'grade_id': grade.id,
+            'numeric_score': Decimal(score),
+            'comments': comments,
+            'version': loaded.date_graded.isoformat(),
+            'original_score': loaded.numeric_score,
+            'original_comments': loaded.comments or '',
+        }
+
+    def test_saves_scores_with_letters(self):
+        report = self.course.record_test_scores([self.entry(self.grades[0], 45), self.entry(self.grades[1], 20)])
+        self.assertEqual(len(report['saved']), 2)
+        self.assertEqual(Grade.objects.get(pk=self.grades[0].pk).grade_value, 'A+')
+        self.assertEqual(Grade.objects.get(pk=self.grades[1].pk).grade_value, 'F')
+
+        report = self.course.record_test_scores([self.entry(self.grades[2], 60)])
+        self.assertEqual(len(report['invalid']), 1)
+        self.assertIsNone(Grade.objects.get(pk=self.grades[2].pk).numeric_score)
+
+    def test_only_edited_rows_can_conflict(self):
+        self.course.record_test_scores([self.entry(grade, 10) for grade in self.grades])
+        loaded = [Grade.objects.get(pk=grade.pk) for grade in self.grades]
+        # Another marker regrades the first two rows after this sheet was loaded
+        self.course.record_test_scores([self.entry(loaded[0], 40), self.entry(loaded[1], 30)])
+
+        # Save All posts every row: rows 0 and 2 were edited, row 1 left as loaded
+        report = self.course.record_test_scores([
+            self.entry(self.grades[0], 35, loaded=loaded[0]),
+            self.entry(self.grades[1], 10, loaded=loaded[1]),
+            self.entry(self.grades[2], 25, loaded=loaded[2]),
+        ])
+        self.assertEqual(report['conflicts'], [self.grades[0]])
+        self.assertEqual(report['unchanged'], [self.grades[1]])
+        self.assertEqual(report['saved'], [self.grades[2]])
+        self.assertEqual(Grade.objects.get(pk=self.grades[0].pk).numeric_score, Decimal(40))
+        self.assertEqual(Grade.objects.get(pk=self.grades[1].pk).numeric_score, Decimal(30))
+
+    def test_save_all_leaves_untouched_rows_alone(self):
+        self.course.record_test_scores([self.entry(self.grades[0], 40)])
+        self.client.login(username='lecturer', password='password')
+        url = reverse('grade_test', args=[self.course.id])
+        response = self.client.get(url)
+        self.assertContains(response, f'name="original_score_{self.grades[0].id}" value="40.00"')
+
+        # Another marker changes row 0 while this sheet is open; Save All only edits row 1
+        self.course.record_test_scores([self.entry(Grade.objects.get(pk=self.grades[0].pk), 42)])
+        data = {}
+        for grade in response.context['grades']:
+            score = '' if grade.numeric_score is None else str(grade.numeric_score)
+            data.update({
+                f'score_{grade.id}': score,
+                f'feedback_{grade.id}': grade.comments or '',
+                f'version_{grade.id}': grade.date_graded.isoformat(),
+                f'original_score_{grade.id}': score,
+                f'original_feedback_{grade.id}': grade.comments or '',
+            })
+        data[f'score_{self.grades[1].id}'] = '30'
+        response = self.client.post(url, data, follow=True)
+
+        self.assertNotContains(response, 'graded by someone else')
+        self.assertEqual(Grade.objects.get(pk=self.grades[0].pk).numeric_score, Decimal(42))
+        self.assertEqual(Grade.objects.get(pk=self.grades[1].pk).numeric_score, Decimal(30))
+
+
+class ExamMarkTests(TestCase):
+    """Exam marks are recorded for a whole roster at once, or not at all"""
+
+    def setUp(self):
+        self.lecturer = create_lecturer()
+        self.course = create_course(self.lecturer, 'CS100')
+        self.students = [User.objects.create_user(f'student{i}') for i in range(3)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course, status='enrolled')
+            Grade.objects.create(
+                student=student, course=self.course, grade_type='quiz', grade_value='I',
+                numeric_score=Decimal(40), max_points=Decimal(50), description='Quiz 1',
+            )
+        self.url = reverse('manage_exam_marks') + f'?course={self.course.id}'
+        self.client.login(username='lecturer', password='password')
+
+    def test_grid_records_exam_cass_and_final_marks(self):
+        response = self.client.post(self.url, {
+            'mode': 'bulk', **{f'exam_score_{student.id}': '70' for student in self.students},
+        })
+        self.assertEqual([entry['status'] for entry in response.context['bulk_report']], ['added'] * 3)
+
+        result = StudentCourseResult.objects.get(student=self.students[0], course=self.course)
+        self.assertEqual((result.cass_mark, result.exam_mark, result.final_mark), (80.0, 70.0, 75.0))
+        final = Grade.objects.get(student=self.students[0], course=self.course, grade_type='final_grade')
+        self.assertEqual((final.numeric_score, final.grade_value), (Decimal(75), 'B'))
+
+        # Entering the same marks again changes nothing
+        self.assertEqual(self.course.record_exam_marks({self.students[0].id: Decimal(70)}, 'lecturer'),
+                         {self.students[0].id: 'updated'})
+        self.assertEqual(Grade.objects.filter(course=self.course, grade_type='exam_mark').count(), 3)
+
+    def test_csv_with_an_invalid_row_saves_nothing(self):
+        marks_file = SimpleUploadedFile('marks.csv', b'student,exam_score\nstudent0,65\nstudent1,abc\nnobody,50\n')
+        response = self.client.post(self.url, {'mode': 'bulk', 'marks_file': marks_file})
+
+        messages = [entry['message'] for entry in response.context['bulk_report']]
+        self.assertEqual(messages, ['', 'Exam score is not a number', 'Student is not enrolled in this course'])
+        self.assertFalse(Grade.objects.filter(course=self.course, grade_type='exam_mark').exists())
+
+    def test_existing_exam_names_are_kept(self):
+        student = self.students[0]
+        for description, days_ago in [('Final Examination', 30), ('Supplementary Examination', 1)]:
+            Grade.objects.create(
+                student=student, course=self.course, grade_type='exam_mark', grade_value='I',
+                numeric_score=Decimal(40), max_points=Decimal(100), description=description,
+                date_graded=timezone.now() - timedelta(days=days_ago),
+            )
+
+        self.assertEqual(self.course.record_exam_marks({student.id: Decimal(60)}, 'lecturer'), {student.id: 'updated'})
+        latest = Grade.objects.filter(student=student, grade_type='exam_mark').order_by('-date_graded').first()
+        self.assertEqual((latest.description, latest.numeric_score), ('Supplementary Examination', Decimal(60)))
+
+
+class StudentCourseResultTests(TestCase):
+    """Course GPAs and CASS marks are computed in bulk and stored per student and course"""
+
+    def setUp(self):
+        self.lecturer = create_lecturer()
+        self.student = User.objects.create_user('student')
+        self.course = create_course(self.lecturer, 'CS100', credits=3)
+        # Midterms keep the weight stored on each grade
+        AssessmentWeightScheme.objects.filter(course=self.course, grade_type='midterm').delete()
+        Enrollment.objects.create(student=self.student, course=self.course, status='enrolled')
+
+    def grade(self, course, grade_type, score, weight=1):
+        return Grade.objects.create(
+            student=self.student, course=course, grade_type=grade_type, grade_value='I',
+            numeric_score=Decimal(score), max_points=Decimal(100), weight=Decimal(weight),
+        )
+
+    def add_grades(self):
+        self.grade(self.course, 'assignment', 90)  # A+, scheme weight 30
+        self.grade(self.course, 'quiz', 65)  # C, scheme weight 20
+        self.grade(self.course, 'midterm', 75, weight=10)  # B, own weight 10
+        Grade.objects.create(student=self.student, course=self.course, grade_type='project', grade_value='I')
+
+    def test_weighted_gpa_and_cass_mark(self):
+        self.add_grades()
+        expected_gpa = round((4.0 * 30 + 2.0 * 20 + 3.0 * 10) / 60, 2)
+        self.assertEqual(Grade.objects.gpa_by_course(self.student), {self.course.id: expected_gpa})
+        self.assertEqual(self.student.userprofile.calculate_course_gpa(self.course), expected_gpa)
+        self.assertEqual(self.course.calculate_cass_mark(self.student), round((90 * 30 + 65 * 20 + 75 * 10) / 60, 2))
+
+        # The whole-course roster agrees with the per-student lookup
+        roster = self.course.compute_final_marks()
+        self.assertEqual(roster[self.student.id]['calculated_cass_mark'], self.course.calculate_cass_mark(self.student))
+
+    def test_stored_results_follow_grades(self):
+        self.add_grades()
+        other = create_course(self.lecturer, 'CS200', credits=4)
+        Enrollment.objects.create(student=self.student, course=other, status='enrolled')
+        other_grade = self.grade(other, 'assignment', 50)  # D-
+
+        result = StudentCourseResult.objects.get(student=self.student, course=self.course)
+        self.assertEqual((result.course_gpa, result.credits, result.cass_mark), (3.17, 3, 79.17))
+        self.assertEqual(self.student.userprofile.calculate_overall_gpa(), round((3.17 * 3 + 0.7 * 4) / 7, 2))
+
+        other_grade.delete()
+        self.assertEqual(self.student.userprofile.calculate_overall_gpa(), 3.17)
+
+        out = StringIO()
+        call_command('rebuild_results', check=True, stdout=out)
+        self.assertIn('Checked 1 results, 0 out of date.', out.getvalue())
+
+
+class CourseAssessmentTests(TestCase):
+    """Assessments are created once per student, however often they are set up"""
+
+    def setUp(self):
+        self.course = create_course(create_lecturer(), 'CS100')
+        self.students = [User.objects.create_user(f'student{i}') for i in range(3)]
+        for student in self.students[:2]:
+            Enrollment.objects.create(student=student, course=self.course, status='enrolled')
+
+    def test_assessments_reach_late_enrollments_once(self):
+        self.assertEqual(self.course.create_assessment('quiz', 'Quiz 1', Decimal(20)), 2)
+        self.assertEqual(self.course.create_assessment('quiz', 'Quiz 1', Decimal(20)), 0)
+        self.assertEqual(self.course.sync_assessments(), 0)
+
+        Enrollment.objects.create(student=self.students[2], course=self.course, status='enrolled')
+        self.assertEqual(self.course.sync_assessments(), 1)
+        self.assertEqual(self.course.sync_assessments(), 0)
+
+        placeholder = Grade.objects.get(student=self.students[2], course=self.course)
+        self.assertEqual((placeholder.description, placeholder.grade_value, placeholder.max_points), ('Quiz 1', 'I', 20))
+
+    def test_placeholders_skip_the_result_refresh(self):
+        for i in range(3, 20):
+            student = User.objects.create_user(f'student{i}')
+            Enrollment.objects.create(student=student, course=self.course, status='enrolled')
+        # Roster, course lock, existing rows and one insert, however many students
+        with self.assertNumQueries(6):
+            self.assertEqual(self.course.create_assessment('quiz', 'Quiz 1', Decimal(20)), 19)
+        self.assertFalse(StudentCourseResult.objects.filter(course=self.course).exists())
+
+
+class CoursePerformanceSnapshotTests(TestCase):
+    """Course statistics are served from cache until a grade or enrollment changes them"""
+
+    # Enrolled GPAs, enrolled count and grade distribution
+    QUERY_BUDGET = 3
+
+    def setUp(self):
+        cache.clear()
+        self.course = create_course(create_lecturer(), 'CS100')
+        self.students = [User.objects.create_user(f'student{i}') for i in range(3)]
+        for student, score in zip(self.students[:2], [85, 45]):
+            Enrollment.objects.create(student=student, course=self.course, status='enrolled')
+            Grade.objects.create(
+                student=student, course=self.course, grade_type='exam_mark', grade_value='I',
+                numeric_score=Decimal(score), max_points=Decimal(100), description='Exam',
+            )
+
+    def snapshot(self, queries):
+        with self.assertNumQueries(queries):
+            return CoursePerformanceSnapshot.for_course(self.course)
+
+    def test_changes_rebuild_the_snapshot_within_budget(self):
+        warm = self.snapshot(self.QUERY_BUDGET)
+        self.assertEqual((warm.enrolled_students, warm.total_graded, warm.pass_rate), (2, 2, 50.0))
+        self.assertEqual(self.snapshot(0).as_dict(), warm.as_dict())
+
+        grade = Grade.objects.get(student=self.students[1], course=self.course)
+        grade.numeric_score = Decimal(75)
+        grade.save()
+        rebuilt = self.snapshot(self.QUERY_BUDGET)
+        self.assertEqual(rebuilt.pass_rate, 100.0)
+        self.assertEqual(self.snapshot(0).as_dict(), rebuilt.as_dict())
+
+        Enrollment.objects.create(student=self.students[2], course=self.course, status='enrolled')
+        self.assertEqual(self.snapshot(self.QUERY_BUDGET).enrolled_students, 3)
+
+
+class EnrollmentCounterTests(TestCase):
+    """Stored enrollment counters stay equal to a fresh count through every enrollment path"""
+
+    def setUp(self):
+        cache.clear()
+        self.lecturer = create_lecturer()
+        self.course = create_course(self.lecturer, 'CS100', max_students=2)
+        self.students = [User.objects.create_user(f'student{i}', password='password') for i in range(4)]
+        self.counters = LecturerDashboardCounters.for_lecturer(self.lecturer.userprofile)
+
+    def as_student(self, index):
+        client = Client()
+        client.login(username=f'student{index}', password='password')
+        return client
+
+    def assertCountersMatch(self, enrolled, pending, waitlisted):
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual((course.enrolled_count, course.pending_count, course.waitlist_count), (enrolled, pending, waitlisted))
+        for status, field in Course.ENROLLMENT_COUNTERS.items():
+            self.assertEqual(getattr(course, field), Enrollment.objects.filter(course=course, status=status).count())
+        self.assertEqual(Course.reconcile_enrollment_counts(check=True), {})
+
+        self.counters.refresh_from_db()
+        actual = LecturerDashboardCounters.compute(self.lecturer.userprofile.id)
+        self.assertEqual(
+            {field: getattr(self.counters, field) for field in LecturerDashboardCounters.COUNTER_FIELDS},
+            {field: actual[field] for field in LecturerDashboardCounters.COUNTER_FIELDS},
+        )
+        self.assertEqual(self.counters.total_students, enrolled)
+
+    def test_enroll_drop_and_approve(self):
+        enroll_url = reverse('enroll_course', args=[self.course.id])
+        for index in range(3):
+            self.as_student(index).post(enroll_url)
+        self.assertCountersMatch(enrolled=2, pending=0, waitlisted=1)
+
+        # Dropping frees a seat the waitlisted student is promoted into once the drop commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.as_student(0).post(reverse('drop_course', args=[self.course.id]))
+        self.assertEqual(Enrollment.objects.get(student=self.students[2], course=self.course).status, 'enrolled')
+        self.assertCountersMatch(enrolled=2, pending=0, waitlisted=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.as_student(1).post(reverse('drop_course', args=[self.course.id]))
+        pending = Enrollment.objects.create(student=self.students[3], course=self.course, status='pending')
+        self.assertCountersMatch(enrolled=1, pending=1, waitlisted=0)
+
+        self.client.login(username='lecturer', password='password')
+        response = self.client.post(reverse('approve_enrollment', args=[pending.id]))
+        self.assertTrue(response.json()['success'])
+        self.assertCountersMatch(enrolled=2, pending=0, waitlisted=0)
+
+
+class ArchiveAnnouncementsCommandTests(TestCase):
+    """The sweeper moves only announcements past retention, and running it again changes nothing"""
+
+    def setUp(self):
+        self.lecturer = create_lecturer()
+        now = timezone.now()
+        old = now - timedelta(days=200)
+        self.announcements = {}
+        for name, is_active, updated_at, expires_at in [
+            ('old_inactive', False, old, None),
+            ('old_active', True, old, None),
+            ('recent_inactive', False, now - timedelta(days=10), None),
+            ('expired', True, old, now - timedelta(days=1)),
+        ]:
+            announcement = Announcement.objects.create(
+                title=name, content='Notice', author=self.lecturer, audience='all', expires_at=expires_at,
+            )
+            # auto_now fields can only be backdated with an update
+            Announcement.objects.filter(pk=announcement.pk).update(is_active=is_active, updated_at=updated_at)
+            self.announcements[name] = announcement.pk
+
+    def run_command(self):
+        out = StringIO()
+        call_command('archive_announcements', '--days', '180', '--batch-size', '1', stdout=out)
+        return out.getvalue()
+
+    def test_only_eligible_rows_move_once(self):
+        out = self.run_command()
+        self.assertIn('Expired 1 announcements.', out)
+        self.assertIn('Archived 1 announcements older than 180 days.', out)
+        self.assertEqual(
+            list(AnnouncementArchive.objects.values_list('announcement_id', flat=True)),
+            [self.announcements['old_inactive']],
+        )
+        self.assertEqual(
+            set(Announcement.objects.values_list('title', flat=True)), {'old_active', 'recent_inactive', 'expired'}
+        )
+        # Expiring counts as a change, so the expired post waits out its own retention window
+        self.assertFalse(Announcement.objects.get(title='expired').is_active)
+
+        out = self.run_command()
+        self.assertIn('Expired 0 announcements.', out)
+        self.assertIn('Archived 0 announcements older than 180 days.', out)
+        self.assertEqual(AnnouncementArchive.objects.count(), 1)
+        self.assertEqual(Announcement.objects.count(), 3)
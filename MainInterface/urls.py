@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
     path('student-dashboard/', views.student_dashboard_view, name='student_dashboard'),
+    path('student-dashboard/panels/<str:panel>/', views.student_dashboard_panel_view, name='student_dashboard_panel'),
     path('lecturer-dashboard/', views.lecturer_dashboard_view, name='lecturer_dashboard'),
     path('profile-management/', views.profile_management_view, name='profile_management'),
     path('browse-courses/', views.browse_courses_view, name='browse_courses'),
@@ -27,10 +28,12 @@ urlpatterns = [
     path('delete-course/<int:course_id>/', views.delete_course_view, name='delete_course'),
     path('course-detail/<int:course_id>/', views.course_detail_view, name='course_detail'),
     path('enroll-course/<int:course_id>/', views.enroll_course_view, name='enroll_course'),
+    path('enrollment-requests/<int:request_id>/status/', views.enrollment_request_status_view, name='enrollment_request_status'),
     path('drop-course/<int:course_id>/', views.drop_course_view, name='drop_course'),
     path('cancel-enrollment/<int:course_id>/', views.cancel_enrollment_view, name='cancel_enrollment'),
     path('join-waitlist/<int:course_id>/', views.join_waitlist_view, name='join_waitlist'),
     path('course-enrollments/<int:course_id>/', views.course_enrollments_view, name='course_enrollments'),
+    path('course-enrollments/<int:course_id>/bulk/', views.bulk_enrollment_action_view, name='bulk_enrollment_action'),
     path('activate-course/<int:course_id>/', views.activate_course_view, name='activate_course'),
     path('deactivate-course/<int:course_id>/', views.deactivate_course_view, name='deactivate_course'),
     path('student-management/', views.student_management_view, name='student_management'),
@@ -57,6 +60,7 @@ urlpatterns = [
     path('lecturer/grades/', views.grade_management_view, name='grade_management'),
     path('lecturer/grades/create-test/', views.create_test_view, name='create_test'),
     path('lecturer/grades/course/<int:course_id>/', views.grade_test_view, name='grade_test'),
+    path('lecturer/grades/course/<int:course_id>/sync-roster/', views.sync_test_roster_view, name='sync_test_roster'),
     path('lecturer/grades/weights/<int:course_id>/', views.weight_management_view, name='weight_management'),
     path('lecturer/submissions/<int:submission_id>/grade/', views.grade_submission_view, name='grade_submission'),
     path('lecturer/grades/exam-marks/', views.manage_exam_marks, name='manage_exam_marks'),
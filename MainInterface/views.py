@@ -3,13 +3,20 @@ from django.contrib.auth import authenticate, login, logout, update_session_auth
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Avg, Count, Sum
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Avg, Count, Sum, OuterRef, Subquery
 from django.http import JsonResponse, HttpResponse, Http404
 from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
-from .models import UserProfile, Course, Enrollment, Grade, Assignment, AssignmentSubmission, StudyMaterial, AcademicCalendar, Announcement, ClassSchedule
+from .models import UserProfile, Course, Enrollment, Grade, AssessmentWeightScheme, StudentCourseResult, StudentTermResult, LecturerDashboardCounters, Assignment, AssignmentSubmission, StudyMaterial, AcademicCalendar, Announcement, AnnouncementDelivery, ClassSchedule, WaitlistPromotion, EnrollmentRequest, bump_enrolled_students
 from .decorators import secure_view, no_cache
+from .dashboard import STUDENT_PANELS, StudentDashboardData
+from .enrollment import ENROLLMENT_ACTIONS, apply_enrollment_action, enroll_student, queue_enrollment
+from .panels import PANEL_FORMATS, PanelTimer, render_panel
+from .search import search_courses
+from .caching import LECTURER_COURSES, STUDENT_RESULTS
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -18,6 +25,9 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import io
 import os
 
 # Create your views here.
@@ -156,170 +166,38 @@ def student_dashboard_view(request):
         messages.error(request, 'User profile not found.')
         return redirect('dashboard')
     
-    # Get student's enrolled courses with exam marks
-    enrolled_courses = Course.objects.filter(
-        enrollments__student=request.user,
-        enrollments__status='enrolled'
-    )
-    
-    # Attach final mark data to courses for template access
-    for course in enrolled_courses:
-        # Get exam mark
-        exam_grade = Grade.objects.filter(
-            student=request.user,
-            course=course,
-            grade_type='exam_mark'
-        ).first()
-        course.student_exam_mark = exam_grade.numeric_score if exam_grade else None
-        
-        # Calculate CASS mark
-        course.student_cass_mark = course.calculate_cass_mark(request.user)
-        
-        # Calculate final mark
-        course.student_final_mark = course.calculate_final_mark(request.user)
-        
-        # Get final mark details
-        final_details = course.get_final_mark_details(request.user)
-        course.student_letter_grade = final_details.get('letter_grade')
-        course.student_is_passing = final_details.get('is_passing')
-        course.student_gpa_points = final_details.get('gpa_points')
-    
-    enrolled_courses_count = enrolled_courses.count()
-    
-    # Get assignments for enrolled courses
-    assignments = Assignment.objects.filter(
-        course__in=enrolled_courses,
-        status='published'
-    ).select_related('course').order_by('due_date')
-    
-    # Get student's submissions
-    submissions = AssignmentSubmission.objects.filter(
-        student=request.user
-    ).select_related('assignment')
-    
-    # Create a map of assignment_id -> submission for easy lookup
-    submission_map = {sub.assignment.id: sub for sub in submissions}
-    
-    # Categorize assignments and get pending assignments
-    pending_assignments = []
-    submitted_assignments = []
-    overdue_assignments = []
-    
-    for assignment in assignments:
-        submission = submission_map.get(assignment.id)
-        assignment.user_submission = submission
-        
-        if submission and submission.status == 'submitted':
-            submitted_assignments.append(assignment)
-        elif assignment.is_overdue() and (not submission or submission.status == 'draft'):
-            overdue_assignments.append(assignment)
-        else:
-            pending_assignments.append(assignment)
-    
-    # Calculate GPA using new model methods
-    user_profile = request.user.userprofile
-    current_gpa = user_profile.calculate_overall_gpa()
-    gpa_status = user_profile.get_gpa_status()
-    
-    # Get semester-specific GPA (default to current semester)
-    current_semester = 'fall'  # You can get this dynamically
-    semester_gpa = user_profile.get_semester_gpa(current_semester)
-    
-    # Get course-specific GPAs and exam marks
-    course_gpas = {}
-    for course in enrolled_courses:
-        course_gpa = user_profile.calculate_course_gpa(course)
-        # Get exam mark for this course
-        exam_grade = Grade.objects.filter(
-            student=request.user,
-            course=course,
-            grade_type='exam_mark'
-        ).first()
-        
-        if course_gpa is not None:
-            course_gpas[course.id] = {
-                'gpa': course_gpa,
-                'course': course,
-                'weights': course.get_assessment_weights(),
-                'exam_mark': exam_grade.numeric_score if exam_grade else None
-            }
-    
-    # Get detailed grade statistics
-    all_grades = Grade.objects.filter(student=request.user).select_related('course')
-    grade_stats = {
-        'total_grades': all_grades.count(),
-        'graded_count': all_grades.exclude(grade_value='I').count(),
-        'ungraded_count': all_grades.filter(grade_value='I').count(),
-        'passing_grades': all_grades.filter(
-            grade_value__in=['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-']
-        ).count(),
-    }
-    
-    if grade_stats['graded_count'] > 0:
-        grade_stats['pass_rate'] = round(
-            (grade_stats['passing_grades'] / grade_stats['graded_count']) * 100, 1
-        )
-    else:
-        grade_stats['pass_rate'] = 0
-    
-    # Get recent grades (including tests and assignments)
-    recent_grades = Grade.objects.filter(
-        student=request.user,
-        numeric_score__isnull=False  # Only graded items
-    ).select_related('course').order_by('-date_graded')[:5]
-    
-    # Get total grade count
-    total_grades_count = Grade.objects.filter(
-        student=request.user,
-        numeric_score__isnull=False
-    ).count()
-    
-    # Get ungraded assessments count
-    ungraded_count = Grade.objects.filter(
-        student=request.user,
-        numeric_score__isnull=True
-    ).count()
-    
-    # Get recent announcements visible to the student
-    from datetime import timedelta
-    recent_announcements = []
-    all_announcements = Announcement.objects.filter(is_active=True).select_related('course', 'author')
-    
-    for announcement in all_announcements:
-        if announcement.is_visible_to_user(request.user):
-            recent_announcements.append(announcement)
-    
-    # Sort by priority and date, get the 3 most recent
-    def sort_key(announcement):
-        priority_order = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
-        return (priority_order.get(announcement.priority, 3), -announcement.created_at.timestamp())
-    
-    recent_announcements.sort(key=sort_key)
-    recent_announcements = recent_announcements[:3]
-    
-    # Context data for the student dashboard
+    # Only cached panels are inlined, so the page does not wait on the slow ones
     context = {
         'user': request.user,
-        'enrolled_courses': enrolled_courses,  # Add enrolled courses for Final Marks tab
-        'enrolled_courses_count': enrolled_courses_count,
-        'current_gpa': current_gpa or 'N/A',
-        'gpa_status': gpa_status,
-        'semester_gpa': semester_gpa,
-        'course_gpas': course_gpas,
-        'grade_stats': grade_stats,
-        'pending_assignments': pending_assignments[:5],  # Show first 5 pending assignments
-        'pending_assignments_count': len(pending_assignments),
-        'submitted_assignments_count': len(submitted_assignments),
-        'overdue_assignments_count': len(overdue_assignments),
-        'recent_announcements': recent_announcements,
-        'recent_grades': recent_grades,
-        'total_grades_count': total_grades_count,
-        'ungraded_count': ungraded_count,
-        'attendance_percentage': 85,  # Placeholder for attendance
+        'panels': StudentDashboardData(request.user).shell_panels(request),
+        'unread_announcements': AnnouncementDelivery.objects.inbox(request.user).filter(is_read=False).count(),
     }
     
     return render(request, 'MainInterface/student_dashboard.html', context)
 
+@secure_view
+def student_dashboard_panel_view(request, panel):
+    """Serve one student dashboard panel as an HTML fragment, or as JSON with ?format=json"""
+    try:
+        if request.user.userprofile.user_type != 'student':
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    except UserProfile.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'User profile not found'}, status=403)
+    
+    panel_format = request.GET.get('format', 'html')
+    if panel not in STUDENT_PANELS or panel_format not in PANEL_FORMATS:
+        raise Http404("Unknown dashboard panel")
+    
+    with PanelTimer(panel) as timer:
+        content, hit = StudentDashboardData(request.user).get_panel(request, panel, panel_format)
+    
+    if panel_format == 'json':
+        response = JsonResponse({'success': True, 'panel': panel, 'data': content})
+    else:
+        response = HttpResponse(content)
+    response['Server-Timing'] = timer.server_timing(hit)
+    return response
+
 @secure_view
 def lecturer_dashboard_view(request):
     # Ensure only lecturers can access this dashboard
@@ -334,41 +212,24 @@ def lecturer_dashboard_view(request):
     # Get lecturer's profile
     lecturer_profile = request.user.userprofile
     
-    # Calculate statistics
-    # 1. Total courses taught by this lecturer
-    lecturer_courses = Course.objects.filter(lecturer=lecturer_profile, is_active=True)
-    total_courses = lecturer_courses.count()
-    
-    # 2. Total students enrolled in lecturer's courses
-    total_students = Enrollment.objects.filter(
-        course__in=lecturer_courses,
-        status='enrolled'
-    ).values('student').distinct().count()
-    
-    # 3. Pending assignment submissions that need grading
-    pending_submissions = AssignmentSubmission.objects.filter(
-        assignment__course__in=lecturer_courses,
-        status='submitted'
-    ).count()
-    
-    # 4. Upcoming classes for the next 7 days
-    from datetime import timedelta
-    today = timezone.now()
-    next_week = today + timedelta(days=7)
-    upcoming_classes = ClassSchedule.objects.filter(
-        lecturer=lecturer_profile,
-        start_datetime__gte=today,
-        start_datetime__lte=next_week
-    ).count()
+    # Counters are kept current by signals, so this is a single row lookup
+    counters = LecturerDashboardCounters.for_lecturer(lecturer_profile)
+    courses_panel = render_panel(
+        request,
+        'lecturer_courses',
+        [(LECTURER_COURSES, lecturer_profile.id)],
+        lambda: {'courses': list(Course.objects.filter(lecturer=lecturer_profile, is_active=True))}
+    )
     
     # Context data for the lecturer dashboard
     context = {
         'user': request.user,
-        'total_courses': total_courses,
-        'total_students': total_students,
-        'pending_submissions': pending_submissions,
-        'upcoming_classes': upcoming_classes,
-        'courses': lecturer_courses,  # For weight management section
+        'total_courses': counters.total_courses,
+        'total_students': counters.total_students,
+        'pending_submissions': counters.pending_submissions,
+        'upcoming_classes': counters.upcoming_classes,
+        'unread_announcements': AnnouncementDelivery.objects.inbox(request.user).filter(is_read=False).count(),
+        'panels': {'courses': courses_panel},  # For weight management section
     }
     
     return render(request, 'MainInterface/lecturer_dashboard.html', context)
@@ -498,15 +359,11 @@ def browse_courses_view(request):
     semester_filter = request.GET.get('semester', '')
     
     # Get all courses
-    courses = Course.objects.all().select_related('lecturer')
+    courses = Course.objects.all().select_related('lecturer__user')
     
-    # Apply search filter
+    # Apply search filter, best matches first when the full-text index is there
     if search_query:
-        courses = courses.filter(
-            Q(course_code__icontains=search_query) |
-            Q(course_name__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
+        courses = search_courses(courses, search_query)
     
     # Apply level filter
     if level_filter:
@@ -519,12 +376,15 @@ def browse_courses_view(request):
     # Get enrollment statistics for the current user
     user_enrollments = {}
     if hasattr(request.user, 'userprofile') and request.user.userprofile.user_type == 'student':
-        enrollments = Enrollment.objects.filter(student=request.user).select_related('course')
-        user_enrollments = {e.course.id: e.status for e in enrollments}
+        # Requests still waiting for the rush mode worker
+        queued_requests = EnrollmentRequest.objects.filter(student=request.user, course=OuterRef('pk'), status='queued')
+        courses = courses.annotate(queued_request_id=Subquery(queued_requests.values('id')[:1]))
+        # The same map the get_enrollment_status filter reads, so the course cards need no queries
+        user_enrollments = Enrollment.statuses_for(request.user)
     
     # Calculate statistics
     total_courses = courses.count()
-    available_courses = courses.filter(enrollments__status='enrolled').distinct().count()
+    available_courses = courses.filter(enrolled_count__gt=0).count()
     enrolled_count = len([s for s in user_enrollments.values() if s == 'enrolled'])
     pending_count = len([s for s in user_enrollments.values() if s == 'pending'])
     
@@ -740,18 +600,14 @@ def manage_courses_view(request):
         messages.error(request, 'User profile not found.')
         return redirect('dashboard')
     
-    # Get lecturer's courses with enrollment counts
-    courses = Course.objects.filter(lecturer=request.user.userprofile).prefetch_related('enrollments')
-    
-    # Add pending enrollment counts to each course
-    for course in courses:
-        course.pending_count = course.enrollments.filter(status='pending').count()
+    # Get lecturer's courses; enrollment counts are stored on each course
+    courses = Course.objects.filter(lecturer=request.user.userprofile)
     
     # Calculate statistics
     total_courses = courses.count()
     active_courses = courses.filter(is_active=True).count()
-    total_students = sum(course.get_enrolled_count() for course in courses)
-    pending_enrollments = sum(course.enrollments.filter(status='pending').count() for course in courses)
+    total_students = sum(course.enrolled_count for course in courses)
+    pending_enrollments = sum(course.pending_count for course in courses)
     
     context = {
         'courses': courses,
@@ -829,32 +685,44 @@ def enroll_course_view(request, course_id):
     
     course = get_object_or_404(Course, id=course_id)
     
+    if getattr(settings, 'ENROLLMENT_RUSH_MODE', False):
+        # Registration rush: queue the request for the worker instead of waiting on the course lock
+        enrollment = Enrollment.objects.filter(student=request.user, course=course).first()
+        created = False
+        if enrollment is None:
+            queue_enrollment(request.user, course.id)
+            messages.info(request, f'Your request to enroll in {course.course_code} has been received and will be processed shortly.')
+            return redirect('browse_courses')
+    else:
+        # Capacity is checked and the seat taken atomically, falling back to the waitlist
+        enrollment, created = enroll_student(request.user, course.id)
+    
     # Check if already enrolled or has pending enrollment
-    existing_enrollment = Enrollment.objects.filter(student=request.user, course=course).first()
-    if existing_enrollment:
-        if existing_enrollment.status == 'enrolled':
+    if not created:
+        if enrollment.status == 'enrolled':
             messages.warning(request, f'You are already enrolled in {course.course_code}.')
-        elif existing_enrollment.status == 'pending':
+        elif enrollment.status == 'pending':
             messages.info(request, f'Your enrollment in {course.course_code} is pending approval.')
         else:
-            messages.info(request, f'You have a {existing_enrollment.get_status_display().lower()} status for {course.course_code}.')
+            messages.info(request, f'You have a {enrollment.get_status_display().lower()} status for {course.course_code}.')
         return redirect('browse_courses')
     
-    # Create enrollment
-    status = 'enrolled' if course.has_space() else 'waitlisted'
-    Enrollment.objects.create(
-        student=request.user,
-        course=course,
-        status=status
-    )
-    
-    if status == 'enrolled':
+    if enrollment.status == 'enrolled':
         messages.success(request, f'Successfully enrolled in {course.course_code}!')
     else:
         messages.info(request, f'Added to waitlist for {course.course_code}. You will be notified if a spot becomes available.')
     
     return redirect('browse_courses')
 
+@login_required
+def enrollment_request_status_view(request, request_id):
+    """Report the progress of a queued enroll request; polled by the course list"""
+    enrollment_request = get_object_or_404(EnrollmentRequest, id=request_id, student=request.user)
+    data = {'status': enrollment_request.status, 'course_id': enrollment_request.course_id}
+    if enrollment_request.status == 'queued':
+        data['position'] = enrollment_request.position()
+    return JsonResponse(data)
+
 @login_required
 def drop_course_view(request, course_id):
     """Drop a course enrollment"""
@@ -965,18 +833,11 @@ def course_detail_view(request, course_id):
                 course=course
             ).order_by('-date_graded')
     
-    # Get course announcements
-    announcements = Announcement.objects.filter(
-        Q(course=course) | Q(audience='all', course__isnull=True),
-        is_active=True
+    # Get course announcements visible to the user
+    visible_announcements = Announcement.objects.visible_to(request.user).filter(
+        Q(course=course) | Q(audience='all', course__isnull=True)
     ).order_by('-is_pinned', '-created_at')[:5]
     
-    # Filter announcements based on user visibility
-    visible_announcements = []
-    for announcement in announcements:
-        if announcement.is_visible_to_user(request.user):
-            visible_announcements.append(announcement)
-    
     # Get study materials for enrolled students
     study_materials = []
     if user_enrollment and user_enrollment.status == 'enrolled':
@@ -1088,8 +949,11 @@ def edit_course_view(request, course_id):
             course.credits = credits
             course.level = level
             course.semester = semester
+            capacity_raised = max_students > course.max_students
             course.max_students = max_students
             course.save()
+            if capacity_raised:
+                WaitlistPromotion.schedule(course.id, 'capacity_raised')
             
             messages.success(request, f'Course "{course.course_name}" updated successfully.')
             return redirect('manage_courses')
@@ -1107,6 +971,57 @@ def delete_course_view(request, course_id):
     messages.info(request, 'Course deletion functionality will be implemented soon.')
     return redirect('manage_courses')
 
+def run_enrollment_action(request, course, action, enrollment_ids):
+    """Apply an enrollment action of course_enrollments_view to some enrollments and report the outcome"""
+    if action not in ENROLLMENT_ACTIONS:
+        messages.error(request, 'Invalid enrollment action.')
+        return
+    enrollment_ids = [pk for pk in enrollment_ids if pk and str(pk).isdigit()]
+    
+    applied, skipped = apply_enrollment_action(course.id, enrollment_ids, action)
+    if not applied and not skipped:
+        messages.error(request, 'Enrollment not found.')
+    elif len(applied) == 1 and len(enrollment_ids) == 1:
+        student_name = applied[0].get_student_name()
+        messages.success(request, {
+            'approve': f'Approved enrollment for {student_name}.',
+            'reactivate': f'Reactivated enrollment for {student_name}.',
+            'reject': f'Rejected enrollment for {student_name}.',
+            'unenroll': f'Removed {student_name} from the course.',
+        }[action])
+    elif applied:
+        verb = {'approve': 'Approved', 'reactivate': 'Reactivated', 'reject': 'Rejected', 'unenroll': 'Removed'}[action]
+        messages.success(request, f'{verb} {len(applied)} enrollments.')
+    
+    if skipped:
+        messages.error(request, f'Cannot approve {len(skipped)} enrollment(s) - course is at maximum capacity.')
+
+@login_required
+def bulk_enrollment_action_view(request, course_id):
+    """Approve, reject or remove the selected enrollments of a course at once (lecturer only)"""
+    try:
+        if request.user.userprofile.user_type != 'lecturer':
+            messages.error(request, 'Access denied. Lecturer access required.')
+            return redirect('dashboard')
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard')
+    
+    try:
+        course = Course.objects.get(id=course_id, lecturer=request.user.userprofile)
+    except Course.DoesNotExist:
+        messages.error(request, 'Course not found or you do not have permission to manage its enrollments.')
+        return redirect('manage_courses')
+    
+    if request.method == 'POST':
+        enrollment_ids = request.POST.getlist('enrollment_ids')
+        if enrollment_ids:
+            run_enrollment_action(request, course, request.POST.get('action'), enrollment_ids)
+        else:
+            messages.warning(request, 'No enrollments selected.')
+    
+    return redirect('course_enrollments', course_id=course.id)
+
 @login_required
 def course_enrollments_view(request, course_id):
     """Manage course enrollments (lecturer only)"""
@@ -1126,61 +1041,36 @@ def course_enrollments_view(request, course_id):
     
     # Handle POST requests for enrollment actions
     if request.method == 'POST':
-        action = request.POST.get('action')
-        enrollment_id = request.POST.get('enrollment_id')
-        
-        try:
-            enrollment = Enrollment.objects.get(id=enrollment_id, course=course)
-            
-            if action == 'approve':
-                if course.has_available_slots():
-                    enrollment.status = 'enrolled'
-                    enrollment.save()
-                    messages.success(request, f'Approved enrollment for {enrollment.student.user.get_full_name() or enrollment.student.user.username}.')
-                else:
-                    messages.error(request, 'Cannot approve enrollment - course is at maximum capacity.')
-                    
-            elif action == 'reject':
-                enrollment.status = 'rejected'
-                enrollment.save()
-                messages.success(request, f'Rejected enrollment for {enrollment.student.user.get_full_name() or enrollment.student.user.username}.')
-                
-            elif action == 'unenroll':
-                student_name = enrollment.student.user.get_full_name() or enrollment.student.user.username
-                enrollment.delete()
-                messages.success(request, f'Removed {student_name} from the course.')
-                
-            elif action == 'reactivate':
-                enrollment.status = 'enrolled'
-                enrollment.save()
-                messages.success(request, f'Reactivated enrollment for {enrollment.student.user.get_full_name() or enrollment.student.user.username}.')
-                
-        except Enrollment.DoesNotExist:
-            messages.error(request, 'Enrollment not found.')
+        run_enrollment_action(request, course, request.POST.get('action'), [request.POST.get('enrollment_id')])
     
     # Get all enrollments for this course
-    enrollments = Enrollment.objects.filter(course=course).select_related('student').order_by('-created_at')
+    course.refresh_from_db()
+    enrollments = Enrollment.objects.filter(course=course).select_related('student').order_by('-enrollment_date')
     
     # Separate by status
     pending_enrollments = enrollments.filter(status='pending')
+    # The waitlist is shown in the order seats are handed out
+    waitlisted_enrollments = enrollments.filter(status='waitlisted').order_by('enrollment_date', 'id')
     active_enrollments = enrollments.filter(status='enrolled')
     rejected_enrollments = enrollments.filter(status='rejected')
     
     # Calculate statistics
     total_enrollments = enrollments.count()
-    enrolled_count = active_enrollments.count()
-    pending_count = pending_enrollments.count()
+    enrolled_count = course.enrolled_count
+    pending_count = course.pending_count
     rejected_count = rejected_enrollments.count()
     available_slots = course.max_students - enrolled_count
     
     context = {
         'course': course,
         'pending_enrollments': pending_enrollments,
+        'waitlisted_enrollments': waitlisted_enrollments,
         'active_enrollments': active_enrollments,
         'rejected_enrollments': rejected_enrollments,
         'total_enrollments': total_enrollments,
         'enrolled_count': enrolled_count,
         'pending_count': pending_count,
+        'waitlist_count': course.waitlist_count,
         'rejected_count': rejected_count,
         'available_slots': available_slots,
         'is_full': available_slots <= 0,
@@ -1327,34 +1217,8 @@ def academic_calendar_view(request):
 
 @login_required
 def announcements_view(request):
-    """View all announcements visible to the current user"""
-    from .models import Announcement
-    
-    # Get all active announcements visible to the user
-    announcements = Announcement.objects.filter(is_active=True)
-    
-    # Filter announcements based on user type and visibility
-    visible_announcements = []
-    for announcement in announcements:
-        if announcement.is_visible_to_user(request.user):
-            visible_announcements.append(announcement)
-    
-    # Separate pinned and regular announcements
-    pinned_announcements = [a for a in visible_announcements if a.is_pinned]
-    regular_announcements = [a for a in visible_announcements if not a.is_pinned]
-    
-    # Sort by priority and date
-    def sort_key(announcement):
-        priority_order = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
-        return (priority_order.get(announcement.priority, 3), announcement.created_at)
-    
-    pinned_announcements.sort(key=sort_key, reverse=True)
-    regular_announcements.sort(key=sort_key, reverse=True)
-    
-    # Get recent announcements (last 7 days)
-    from datetime import timedelta
-    recent_cutoff = timezone.now() - timedelta(days=7)
-    recent_announcements = [a for a in visible_announcements if a.created_at >= recent_cutoff]
+    """View the announcement inbox of the current user"""
+    from django.core.paginator import Paginator
     
     # Get user's courses for context (if student)
     user_courses = []
@@ -1362,14 +1226,43 @@ def announcements_view(request):
         enrollments = Enrollment.objects.filter(student=request.user, status='enrolled').select_related('course')
         user_courses = [e.course for e in enrollments]
     elif hasattr(request.user, 'userprofile') and request.user.userprofile.user_type == 'lecturer':
-        user_courses = Course.objects.filter(lecturer=request.user.userprofile)
+        user_courses = list(Course.objects.filter(lecturer=request.user.userprofile))
+    
+    # The inbox holds a row per announcement addressed to the user, read through its (user, created_at) index
+    inbox = AnnouncementDelivery.objects.inbox(request.user).select_related(
+        'announcement__course', 'announcement__author'
+    )
+    
+    # Separate pinned and regular announcements, most urgent first; only one page is loaded
+    pinned_deliveries = list(inbox.filter(announcement__is_pinned=True).by_priority())
+    paginator = Paginator(inbox.filter(announcement__is_pinned=False).by_priority(), 20)
+    page_number = request.GET.get('page')
+    regular_announcements = paginator.get_page(page_number)
+    page_deliveries = list(regular_announcements.object_list)
+    
+    # Get recent announcements (last 7 days)
+    from datetime import timedelta
+    recent_cutoff = timezone.now() - timedelta(days=7)
+    recent_deliveries = inbox.filter(created_at__gte=recent_cutoff)
+    unread_count = inbox.filter(is_read=False).count()
+    
+    # Announcements on screen count as read, but are still marked new this time
+    for delivery in pinned_deliveries + page_deliveries:
+        delivery.announcement.is_unread = not delivery.is_read
+    pinned_announcements = [delivery.announcement for delivery in pinned_deliveries]
+    regular_announcements.object_list = [delivery.announcement for delivery in page_deliveries]
+    AnnouncementDelivery.objects.filter(
+        pk__in=[delivery.pk for delivery in pinned_deliveries + page_deliveries]
+    ).mark_read()
     
     context = {
         'pinned_announcements': pinned_announcements,
         'regular_announcements': regular_announcements,
-        'recent_announcements': recent_announcements,
+        'recent_announcements': [delivery.announcement for delivery in recent_deliveries[:5]],
+        'recent_announcements_count': recent_deliveries.count(),
+        'unread_count': unread_count,
         'user_courses': user_courses,
-        'total_announcements': len(visible_announcements),
+        'total_announcements': paginator.count + len(pinned_announcements),
     }
     
     return render(request, 'MainInterface/announcements.html', context)
@@ -2923,13 +2816,12 @@ def approve_enrollment_view(request, enrollment_id):
             if enrollment.course.lecturer != request.user.userprofile:
                 return JsonResponse({'success': False, 'error': 'Access denied'})
             
-            # Check if course has space
-            if enrollment.course.get_enrolled_count() >= enrollment.course.max_students:
+            # Approve under the course lock, so the capacity check cannot race
+            applied, skipped = apply_enrollment_action(enrollment.course_id, [enrollment.id], 'approve')
+            if skipped:
                 return JsonResponse({'success': False, 'error': 'Course is full'})
-            
-            # Approve the enrollment
-            enrollment.status = 'enrolled'
-            enrollment.save()
+            if not applied:
+                return JsonResponse({'success': False, 'error': 'Enrollment is not awaiting approval'})
             
             return JsonResponse({'success': True, 'message': 'Enrollment approved successfully'})
             
@@ -2969,65 +2861,6 @@ def reject_enrollment_view(request, enrollment_id):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
-@login_required
-def approve_enrollment_view(request, enrollment_id):
-    """Approve a pending enrollment"""
-    if request.method == 'POST':
-        try:
-            # Check if user is a lecturer
-            if request.user.userprofile.user_type != 'lecturer':
-                return JsonResponse({'success': False, 'error': 'Access denied'})
-            
-            enrollment = get_object_or_404(Enrollment, id=enrollment_id)
-            
-            # Check if the lecturer owns this course
-            if enrollment.course.lecturer != request.user.userprofile:
-                return JsonResponse({'success': False, 'error': 'Access denied'})
-            
-            # Check if course has space
-            if enrollment.course.get_enrolled_count() >= enrollment.course.max_students:
-                return JsonResponse({'success': False, 'error': 'Course is full'})
-            
-            # Approve the enrollment
-            enrollment.status = 'enrolled'
-            enrollment.save()
-            
-            return JsonResponse({'success': True, 'message': 'Enrollment approved successfully'})
-            
-        except UserProfile.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'User profile not found'})
-        except Exception as e:
-            return JsonResponse({'success': False, 'error': str(e)})
-    
-    return JsonResponse({'success': False, 'error': 'Invalid request method'})
-
-
-@login_required
-def reject_enrollment_view(request, enrollment_id):
-    """Reject a pending enrollment"""
-    if request.method == 'POST':
-        try:
-            # Check if user is a lecturer
-            if request.user.userprofile.user_type != 'lecturer':
-                return JsonResponse({'success': False, 'error': 'Access denied'})
-            
-            enrollment = get_object_or_404(Enrollment, id=enrollment_id)
-            
-            # Check if the lecturer owns this course
-            if enrollment.course.lecturer != request.user.userprofile:
-                return JsonResponse({'success': False, 'error': 'Access denied'})
-            
-            # Reject the enrollment by deleting it
-            enrollment.delete()
-            
-            return JsonResponse({'success': True, 'message': 'Enrollment rejected successfully'})
-            
-        except UserProfile.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'User profile not found'})
-        except Exception as e:
-            return JsonResponse({'success': False, 'error': str(e)})
-    
-    return JsonResponse({'success': False, 'error': 'Invalid request method'})
 # Class Schedule Views
 @login_required
 def view_schedule_view(request):
@@ -3616,6 +3449,7 @@ def create_announcement_view(request):
                 is_pinned=is_pinned,
                 expires_at=expires_at_obj
             )
+            AnnouncementDelivery.schedule(announcement)
             
             messages.success(request, f'Announcement "{title}" has been created successfully!')
             return redirect('manage_announcements')
@@ -3730,6 +3564,7 @@ def edit_announcement_view(request, announcement_id):
             announcement.is_pinned = is_pinned
             announcement.expires_at = expires_at_obj
             announcement.save()
+            AnnouncementDelivery.schedule(announcement)
             
             messages.success(request, f'Announcement "{title}" has been updated successfully!')
             return redirect('manage_announcements')
@@ -4364,6 +4199,7 @@ def generate_semester_results(request, student_id):
                 student=student,
                 course=course
             ).exclude(grade_type__in=['final_grade', 'exam_mark']).order_by('date_graded')
+            course_weights = course.get_assessment_weights()
             
             # Get CASS and Exam marks separately
             cass_mark = Grade.objects.filter(
@@ -4410,7 +4246,7 @@ def generate_semester_results(request, student_id):
                     for i, grade in enumerate(grades):
                         if grade.numeric_score is not None:
                             percentage = (float(grade.numeric_score) / float(grade.max_points)) * 100
-                            weight_decimal = float(grade.weight)
+                            weight_decimal = course_weights.get(grade.grade_type, float(grade.weight))
                             weighted_contribution = percentage * weight_decimal
                             total_weighted += weighted_contribution
                             total_weight += weight_decimal
@@ -4444,7 +4280,7 @@ def generate_semester_results(request, student_id):
                                 "Not Graded",
                                 f"{grade.max_points}",
                                 "N/A",
-                                f"{float(grade.weight)*100:.0f}%",
+                                f"{course_weights.get(grade.grade_type, float(grade.weight))*100:.0f}%",
                                 "0.0"
                             ])
                     
@@ -4569,42 +4405,10 @@ def generate_semester_results(request, student_id):
                 
                 # Convert to letter grade
                 if exam_mark and exam_mark.numeric_score is not None:
-                    if final_percentage >= 90:
-                        letter_grade = 'A+'
-                    elif final_percentage >= 85:
-                        letter_grade = 'A'
-                    elif final_percentage >= 80:
-                        letter_grade = 'A-'
-                    elif final_percentage >= 77:
-                        letter_grade = 'B+'
-                    elif final_percentage >= 73:
-                        letter_grade = 'B'
-                    elif final_percentage >= 70:
-                        letter_grade = 'B-'
-                    elif final_percentage >= 67:
-                        letter_grade = 'C+'
-                    elif final_percentage >= 63:
-                        letter_grade = 'C'
-                    elif final_percentage >= 60:
-                        letter_grade = 'C-'
-                    elif final_percentage >= 57:
-                        letter_grade = 'D+'
-                    elif final_percentage >= 53:
-                        letter_grade = 'D'
-                    elif final_percentage >= 50:
-                        letter_grade = 'D-'
-                    else:
-                        letter_grade = 'F'
+                    letter_grade = course.get_grading_scale().letter_for(final_percentage)
                     
                     # Get grade points
-                    grade_points_map = {
-                        'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-                        'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-                        'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-                        'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-                        'F': 0.0, 'I': 0.0, 'W': 0.0
-                    }
-                    grade_points = grade_points_map.get(letter_grade, 0.0)
+                    grade_points = Grade.GRADE_POINTS.get(letter_grade) or 0.0
                     
                     grade_summary_data.append([
                         "FINAL MODULE GRADE",
@@ -4725,13 +4529,15 @@ def generate_semester_results(request, student_id):
                 ).exclude(grade_type__in=['final_grade', 'exam_mark', 'cass_mark'])
                 
                 if coursework_grades.exists():
+                    course_weights = course.get_assessment_weights()
                     total_weighted = 0
                     total_weight = 0
                     for grade in coursework_grades:
                         if grade.numeric_score:
                             percentage = (float(grade.numeric_score) / float(grade.max_points)) * 100
-                            total_weighted += percentage * float(grade.weight)
-                            total_weight += float(grade.weight)
+                            weight = course_weights.get(grade.grade_type, float(grade.weight))
+                            total_weighted += percentage * weight
+                            total_weight += weight
                     
                     cass_percentage = total_weighted / total_weight if total_weight > 0 else 0
                 else:
@@ -4747,44 +4553,12 @@ def generate_semester_results(request, student_id):
                 final_percentage = (cass_percentage * 0.5) + (exam_percentage * 0.5)
                 
                 # Convert to letter grade
-                if final_percentage >= 90:
-                    grade_value = 'A+'
-                elif final_percentage >= 85:
-                    grade_value = 'A'
-                elif final_percentage >= 80:
-                    grade_value = 'A-'
-                elif final_percentage >= 77:
-                    grade_value = 'B+'
-                elif final_percentage >= 73:
-                    grade_value = 'B'
-                elif final_percentage >= 70:
-                    grade_value = 'B-'
-                elif final_percentage >= 67:
-                    grade_value = 'C+'
-                elif final_percentage >= 63:
-                    grade_value = 'C'
-                elif final_percentage >= 60:
-                    grade_value = 'C-'
-                elif final_percentage >= 57:
-                    grade_value = 'D+'
-                elif final_percentage >= 53:
-                    grade_value = 'D'
-                elif final_percentage >= 50:
-                    grade_value = 'D-'
-                else:
-                    grade_value = 'F'
+                grade_value = course.get_grading_scale().letter_for(final_percentage)
             else:
                 grade_value = final_grade.grade_value if final_grade else 'I'
             
             # Get grade points
-            grade_points_map = {
-                'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-                'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-                'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-                'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-                'F': 0.0, 'I': 0.0, 'W': 0.0
-            }
-            grade_points = grade_points_map.get(grade_value, 0.0)
+            grade_points = Grade.GRADE_POINTS.get(grade_value) or 0.0
             
             # Determine status
             if exam_mark and exam_mark.numeric_score:
@@ -5071,37 +4845,13 @@ def create_test_view(request):
                 messages.error(request, 'Maximum points must be greater than 0.')
                 return render(request, 'MainInterface/create_test.html', {'courses': courses})
             
-            # Get all enrolled students in the course
-            enrolled_students = User.objects.filter(
-                enrollments__course=course,
-                enrollments__status='enrolled'
-            )
+            # Create grade entries for all enrolled students, skipping any that already exist
+            grades_created = course.create_assessment(test_type, test_name, max_points_float, comments=description)
             
-            # Create grade entries for all enrolled students
-            grades_created = 0
-            for student in enrolled_students:
-                # Check if grade already exists for this test
-                existing_grade = Grade.objects.filter(
-                    student=student,
-                    course=course,
-                    grade_type=test_type,
-                    description=test_name
-                ).first()
-                
-                if not existing_grade:
-                    Grade.objects.create(
-                        student=student,
-                        course=course,
-                        grade_type=test_type,
-                        description=test_name,
-                        max_points=max_points_float,
-                        grade_value='I',  # Incomplete - to be filled in when grading
-                        numeric_score=None,
-                        comments=description
-                    )
-                    grades_created += 1
-            
-            messages.success(request, f'Test "{test_name}" created successfully for {grades_created} students!')
+            if grades_created:
+                messages.success(request, f'Test "{test_name}" created successfully for {grades_created} students!')
+            else:
+                messages.info(request, f'Test "{test_name}" already exists for every enrolled student.')
             return redirect('grade_management')
             
         except Course.DoesNotExist:
@@ -5117,6 +4867,28 @@ def create_test_view(request):
     
     return render(request, 'MainInterface/create_test.html', context)
 
+@login_required
+def sync_test_roster_view(request, course_id):
+    """Add existing tests of a course for newly enrolled students"""
+    try:
+        if request.user.userprofile.user_type != 'lecturer':
+            messages.error(request, 'Access denied. Lecturer access required.')
+            return redirect('dashboard')
+    except UserProfile.DoesNotExist:
+        messages.error(request, 'User profile not found.')
+        return redirect('dashboard')
+    
+    course = get_object_or_404(Course, id=course_id, lecturer=request.user.userprofile)
+    
+    if request.method == 'POST':
+        grades_created = course.sync_assessments()
+        if grades_created:
+            messages.success(request, f'Added {grades_created} test entries for newly enrolled students.')
+        else:
+            messages.info(request, 'All enrolled students already have every test.')
+    
+    return redirect('grade_test', course_id=course.id)
+
 @login_required
 def grade_test_view(request, course_id):
     """Grade tests for a specific course"""
@@ -5153,70 +4925,69 @@ def grade_test_view(request, course_id):
     
     # Handle grading form submission
     if request.method == 'POST':
-        grade_id = request.POST.get('grade_id')
-        numeric_score = request.POST.get('numeric_score', '').strip()
-        feedback = request.POST.get('feedback', '').strip()
+        # A row's own Save button submits only that row, Save All submits every row
+        single_grade_id = request.POST.get('grade_id')
+        entries = []
+        invalid_count = 0
         
-        try:
-            grade = Grade.objects.get(id=grade_id, course=course)
+        for key, value in request.POST.items():
+            if not key.startswith('score_'):
+                continue
+            grade_id = key.replace('score_', '')
+            if single_grade_id and grade_id != single_grade_id:
+                continue
+            numeric_score = value.strip()
+            if not numeric_score:
+                continue
             
-            if numeric_score:
-                score = float(numeric_score)
-                if score < 0 or score > float(grade.max_points):
-                    messages.error(request, f'Score must be between 0 and {grade.max_points}.')
-                else:
-                    # Calculate percentage and letter grade
-                    percentage = (score / float(grade.max_points)) * 100
-                    
-                    # Determine letter grade based on percentage
-                    if percentage >= 90:
-                        letter_grade = 'A+'
-                    elif percentage >= 85:
-                        letter_grade = 'A'
-                    elif percentage >= 80:
-                        letter_grade = 'A-'
-                    elif percentage >= 77:
-                        letter_grade = 'B+'
-                    elif percentage >= 73:
-                        letter_grade = 'B'
-                    elif percentage >= 70:
-                        letter_grade = 'B-'
-                    elif percentage >= 67:
-                        letter_grade = 'C+'
-                    elif percentage >= 63:
-                        letter_grade = 'C'
-                    elif percentage >= 60:
-                        letter_grade = 'C-'
-                    elif percentage >= 57:
-                        letter_grade = 'D+'
-                    elif percentage >= 53:
-                        letter_grade = 'D'
-                    elif percentage >= 50:
-                        letter_grade = 'D-'
-                    else:
-                        letter_grade = 'F'
-                    
-                    # Update grade
-                    grade.numeric_score = score
-                    grade.grade_value = letter_grade
-                    grade.comments = feedback
-                    grade.date_graded = timezone.now()
-                    grade.save()
-                    
-                    messages.success(request, f'Grade updated for {grade.student.get_full_name() or grade.student.username}.')
-            else:
-                messages.error(request, 'Please enter a numeric score.')
+            try:
+                score = Decimal(numeric_score).quantize(Decimal('0.01'))
+                if not score.is_finite():
+                    raise InvalidOperation
+                # What the page showed, so rows left alone are not checked for conflicts
+                original_score = request.POST.get(f'original_score_{grade_id}', '').strip()
+                entries.append({
+                    'grade_id': int(grade_id),
+                    'numeric_score': score,
+                    'comments': request.POST.get(f'feedback_{grade_id}', '').strip(),
+                    'version': request.POST.get(f'version_{grade_id}', ''),
+                    'original_score': Decimal(original_score).quantize(Decimal('0.01')) if original_score else None,
+                    'original_comments': request.POST.get(f'original_feedback_{grade_id}', '').strip(),
+                })
+            except (InvalidOperation, ValueError):
+                invalid_count += 1
+        
+        if invalid_count:
+            messages.error(request, f'{invalid_count} score(s) are not valid numbers and were not saved.')
+        
+        if entries:
+            try:
+                report = course.record_test_scores(entries)
                 
-        except Grade.DoesNotExist:
-            messages.error(request, 'Grade not found.')
-        except ValueError:
-            messages.error(request, 'Please enter a valid numeric score.')
-        except Exception as e:
-            messages.error(request, f'An error occurred: {str(e)}')
+                if report['saved']:
+                    messages.success(request, f'{len(report["saved"])} grade(s) updated.')
+                for grade in report['conflicts']:
+                    messages.warning(request, f'{grade.get_student_name()} - {grade.description}: '
+                                              f'graded by someone else since you loaded this page. Reload to see the latest grade.')
+                for grade, error in report['invalid']:
+                    messages.error(request, f'{grade.get_student_name()} - {grade.description}: {error}')
+                if report['missing']:
+                    messages.error(request, f'{len(report["missing"])} grade(s) not found.')
+                if not (report['saved'] or report['conflicts'] or report['invalid'] or report['missing']):
+                    messages.info(request, 'No grades were changed.')
+                    
+            except Exception as e:
+                messages.error(request, f'An error occurred: {str(e)}')
+        elif not invalid_count:
+            messages.error(request, 'Please enter a numeric score.')
+        
+        return redirect(request.get_full_path())
     
     # Paginate grades
     from django.core.paginator import Paginator
-    paginator = Paginator(grades.order_by('student__last_name', 'student__first_name', 'description'), 20)
+    # Show a whole test on one page so it can be graded in one submit
+    per_page = 200 if test_filter else 20
+    paginator = Paginator(grades.order_by('student__last_name', 'student__first_name', 'description'), per_page)
     page_number = request.GET.get('page')
     page_grades = paginator.get_page(page_number)
     
@@ -5252,26 +5023,41 @@ def weight_management_view(request, course_id):
         # Process weight updates
         weights_updated = False
         total_weight = 0
+        valid_grade_types = dict(Grade.GRADE_TYPE_CHOICES)
         
-        for key, value in request.POST.items():
-            if key.startswith('weight_'):
-                try:
+        with transaction.atomic():
+            for key, value in request.POST.items():
+                if key.startswith('weight_'):
                     grade_type = key.replace('weight_', '')
-                    weight = float(value)
+                    if grade_type not in valid_grade_types:
+                        continue
+                    try:
+                        weight = Decimal(value)
+                        if not weight.is_finite():
+                            raise InvalidOperation
+                    except (InvalidOperation, TypeError):
+                        messages.error(request, f'Invalid weight value for {grade_type}')
+                        continue
+                    if not 0 <= weight <= 100:
+                        messages.error(request, f'Weight for {grade_type} must be between 0 and 100')
+                        continue
                     total_weight += weight
                     
-                    # Update weights for all grades of this type in the course
-                    updated_count = Grade.objects.filter(
+                    # One scheme row per assessment type instead of rewriting every grade
+                    AssessmentWeightScheme.objects.update_or_create(
                         course=course,
-                        grade_type=grade_type
-                    ).update(weight=weight)
-                    
-                    if updated_count > 0:
-                        weights_updated = True
-                    
-                except (ValueError, TypeError):
-                    messages.error(request, f'Invalid weight value for {grade_type}')
-                    continue
+                        grade_type=grade_type,
+                        defaults={'weight': weight}
+                    )
+                    weights_updated = True
+            
+            # Recompute stored results once, after the new weights are committed
+            if weights_updated:
+                def refresh_results():
+                    StudentCourseResult.refresh_course(course)
+                    # Panels cached while the refresh ran still show the old results
+                    bump_enrolled_students(STUDENT_RESULTS, course.id)
+                transaction.on_commit(refresh_results)
         
         # Validate total weights
         if total_weight > 120:
@@ -5297,9 +5083,19 @@ def weight_management_view(request, course_id):
     # Get available grade type choices
     available_grade_types = dict(Grade.GRADE_TYPE_CHOICES)
     
-    # Grade distribution stats
-    grade_distribution = course.get_grade_distribution()
+    # Form fields start from the configured weight, then the recommended one
+    weight_fields = [
+        (
+            grade_type,
+            available_grade_types.get(grade_type, grade_type),
+            current_weights.get(grade_type, default_weights.get(grade_type, 0)),
+        )
+        for grade_type in grade_types
+    ]
+    
+    # Grade distribution stats from the cached performance snapshot
     course_stats = course.get_student_performance_stats()
+    grade_distribution = course_stats['grade_distribution'] if course_stats else course.get_grade_distribution()
     
     context = {
         'course': course,
@@ -5307,6 +5103,7 @@ def weight_management_view(request, course_id):
         'default_weights': default_weights,
         'weight_validation': weight_validation,
         'grade_types': grade_types,
+        'weight_fields': weight_fields,
         'available_grade_types': available_grade_types,
         'grade_distribution': grade_distribution,
         'course_stats': course_stats,
@@ -5418,94 +5215,37 @@ def generate_academic_record(request, student_id):
     story.append(info_table)
     story.append(Spacer(1, 20))
     
+    # Stored course results and term history for the year
+    course_results = {r.course_id: r for r in StudentCourseResult.objects.filter(student=student)}
+    terms = {term.semester: term for term in StudentTermResult.objects.filter(student=student, year=year)}
+    
+    # Enrolled courses of the year, grouped by semester
+    courses_by_semester = {}
+    for course in Course.objects.filter(year=year, enrollments__student=student, enrollments__status='enrolled').distinct():
+        courses_by_semester.setdefault(course.semester, []).append(course)
+    
     # Process each semester in the academic year
     semesters = ['spring', 'summer', 'fall', 'winter']
     yearly_credits = 0
     yearly_grade_points = 0
+    cumulative_gpa = None
     
     for semester in semesters:
-        semester_courses = Course.objects.filter(
-            semester=semester,
-            year=year,
-            enrollments__student=student,
-            enrollments__status='enrolled'
-        ).distinct()
+        semester_courses = courses_by_semester.get(semester)
+        term = terms.get(semester)
         
-        if semester_courses.exists():
+        if semester_courses:
             story.append(Paragraph(f"{semester.title()} {year} Semester", heading_style))
             
             course_data = [["Course Code", "Course Name", "Credits", "Grade", "Points"]]
             
-            semester_credits = 0
-            semester_grade_points = 0
-            
             for course in semester_courses:
-                # Get final grade or calculate average
-                final_grade = Grade.objects.filter(
-                    student=student,
-                    course=course,
-                    grade_type='final_grade'
-                ).first()
-                
-                if not final_grade:
-                    course_grades = Grade.objects.filter(
-                        student=student,
-                        course=course
-                    ).exclude(grade_value__in=['I', 'W'])
-                    
-                    if course_grades.exists():
-                        total_weighted = 0
-                        total_weight = 0
-                        for grade in course_grades:
-                            if grade.numeric_score:
-                                total_weighted += grade.get_percentage() * float(grade.weight)
-                                total_weight += float(grade.weight)
-                        
-                        if total_weight > 0:
-                            avg_percentage = total_weighted / total_weight
-                            if avg_percentage >= 90:
-                                grade_value = 'A+'
-                            elif avg_percentage >= 85:
-                                grade_value = 'A'
-                            elif avg_percentage >= 80:
-                                grade_value = 'A-'
-                            elif avg_percentage >= 77:
-                                grade_value = 'B+'
-                            elif avg_percentage >= 73:
-                                grade_value = 'B'
-                            elif avg_percentage >= 70:
-                                grade_value = 'B-'
-                            elif avg_percentage >= 67:
-                                grade_value = 'C+'
-                            elif avg_percentage >= 63:
-                                grade_value = 'C'
-                            elif avg_percentage >= 60:
-                                grade_value = 'C-'
-                            elif avg_percentage >= 57:
-                                grade_value = 'D+'
-                            elif avg_percentage >= 53:
-                                grade_value = 'D'
-                            elif avg_percentage >= 50:
-                                grade_value = 'D-'
-                            else:
-                                grade_value = 'F'
-                        else:
-                            grade_value = 'I'
-                    else:
-                        grade_value = 'I'
-                else:
-                    grade_value = final_grade.grade_value
+                # Read the stored course result
+                result = course_results.get(course.id)
+                grade_value = result.get_transcript_grade() if result else 'I'
                 
                 # Get grade points
-                grade_points_map = {
-                    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-                    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-                    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-                    'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-                    'F': 0.0, 'I': 0.0, 'W': 0.0
-                }
-                
-                grade_points = grade_points_map.get(grade_value, 0.0)
+                grade_points = Grade.GRADE_POINTS.get(grade_value) or 0.0
                 
                 course_data.append([
                     course.course_code,
@@ -5514,13 +5254,10 @@ def generate_academic_record(request, student_id):
                     grade_value,
                     f"{grade_points:.1f}"
                 ])
-                
-                if grade_value not in ['I', 'W']:
-                    semester_credits += course.credits
-                    semester_grade_points += grade_points * course.credits
             
-            # Calculate semester GPA
-            semester_gpa = semester_grade_points / semester_credits if semester_credits > 0 else 0.0
+            # Semester totals from the term history
+            semester_credits = term.credits_attempted if term else 0
+            semester_gpa = term.term_gpa if term else 0.0
             
             # Add semester summary
             course_data.append([
@@ -5544,8 +5281,10 @@ def generate_academic_record(request, student_id):
             story.append(course_table)
             story.append(Spacer(1, 15))
             
-            yearly_credits += semester_credits
-            yearly_grade_points += semester_grade_points
+            if term:
+                yearly_credits += term.credits_attempted
+                yearly_grade_points += term.grade_points
+                cumulative_gpa = term.cumulative_gpa
     
     # Academic Year Summary
     if yearly_credits > 0:
@@ -5555,7 +5294,7 @@ def generate_academic_record(request, student_id):
         year_summary = [
             ["Total Credits for Year:", str(yearly_credits)],
             ["Academic Year GPA:", f"{yearly_gpa:.2f}"],
-            ["Cumulative GPA:", f"{overall_gpa:.2f}" if overall_gpa else "N/A"],
+            ["Cumulative GPA:", f"{cumulative_gpa:.2f}" if cumulative_gpa is not None else "N/A"],
             ["Academic Standing:", "Good Standing" if yearly_gpa >= 2.0 else "Academic Warning"]
         ]
         
@@ -5681,9 +5420,22 @@ def generate_full_transcript(request, student_id):
     story.append(info_table)
     story.append(Spacer(1, 20))
     
+    # Stored course results and the whole term history in one range scan
+    course_results = {r.course_id: r for r in StudentCourseResult.objects.filter(student=student)}
+    terms = {(term.year, term.semester): term for term in StudentTermResult.objects.filter(student=student)}
+    
+    # Enrolled courses grouped by term
+    courses_by_term = {}
+    for enrollment in all_enrollments:
+        if enrollment.status == 'enrolled':
+            courses_by_term.setdefault((enrollment.course.year, enrollment.course.semester), []).append(enrollment.course)
+    for term_courses in courses_by_term.values():
+        term_courses.sort(key=lambda course: course.course_code)
+    
     # Process all academic years
     total_credits = 0
-    total_grade_points = 0
+    total_earned = 0
+    cumulative_gpa = None
     
     for year in years:
         story.append(Paragraph(f"Academic Year {year}", heading_style))
@@ -5694,88 +5446,21 @@ def generate_full_transcript(request, student_id):
         year_grade_points = 0
         
         for semester in semesters:
-            semester_courses = Course.objects.filter(
-                semester=semester,
-                year=year,
-                enrollments__student=student,
-                enrollments__status='enrolled'
-            ).distinct()
+            semester_courses = courses_by_term.get((year, semester))
+            term = terms.get((year, semester))
             
-            if semester_courses.exists():
+            if semester_courses:
                 story.append(Paragraph(f"{semester.title()} {year}", styles['Heading3']))
                 
                 course_data = [["Course Code", "Course Title", "Credits", "Grade", "Points"]]
                 
-                semester_credits = 0
-                semester_grade_points = 0
-                
                 for course in semester_courses:
-                    # Get final grade or calculate average
-                    final_grade = Grade.objects.filter(
-                        student=student,
-                        course=course,
-                        grade_type='final_grade'
-                    ).first()
-                    
-                    if not final_grade:
-                        course_grades = Grade.objects.filter(
-                            student=student,
-                            course=course
-                        ).exclude(grade_value__in=['I', 'W'])
-                        
-                        if course_grades.exists():
-                            total_weighted = 0
-                            total_weight = 0
-                            for grade in course_grades:
-                                if grade.numeric_score:
-                                    total_weighted += grade.get_percentage() * float(grade.weight)
-                                    total_weight += float(grade.weight)
-                            
-                            if total_weight > 0:
-                                avg_percentage = total_weighted / total_weight
-                                if avg_percentage >= 90:
-                                    grade_value = 'A+'
-                                elif avg_percentage >= 85:
-                                    grade_value = 'A'
-                                elif avg_percentage >= 80:
-                                    grade_value = 'A-'
-                                elif avg_percentage >= 77:
-                                    grade_value = 'B+'
-                                elif avg_percentage >= 73:
-                                    grade_value = 'B'
-                                elif avg_percentage >= 70:
-                                    grade_value = 'B-'
-                                elif avg_percentage >= 67:
-                                    grade_value = 'C+'
-                                elif avg_percentage >= 63:
-                                    grade_value = 'C'
-                                elif avg_percentage >= 60:
-                                    grade_value = 'C-'
-                                elif avg_percentage >= 57:
-                                    grade_value = 'D+'
-                                elif avg_percentage >= 53:
-                                    grade_value = 'D'
-                                elif avg_percentage >= 50:
-                                    grade_value = 'D-'
-                                else:
-                                    grade_value = 'F'
-                            else:
-                                grade_value = 'I'
-                        else:
-                            grade_value = 'I'
-                    else:
-                        grade_value = final_grade.grade_value
+                    # Read the stored course result
+                    result = course_results.get(course.id)
+                    grade_value = result.get_transcript_grade() if result else 'I'
                     
                     # Get grade points
-                    grade_points_map = {
-                        'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-                        'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-                        'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-                        'D+': 1.3, 'D': 1.0, 'D-': 0.7,
-                        'F': 0.0, 'I': 0.0, 'W': 0.0
-                    }
-                    
-                    grade_points = grade_points_map.get(grade_value, 0.0)
+                    grade_points = Grade.GRADE_POINTS.get(grade_value) or 0.0
                     
                     course_data.append([
                         course.course_code,
@@ -5784,13 +5469,10 @@ def generate_full_transcript(request, student_id):
                         grade_value,
                         f"{grade_points:.1f}"
                     ])
-                    
-                    if grade_value not in ['I', 'W']:
-                        semester_credits += course.credits
-                        semester_grade_points += grade_points * course.credits
                 
-                # Add semester GPA
-                semester_gpa = semester_grade_points / semester_credits if semester_credits > 0 else 0.0
+                # Add semester GPA from the term history
+                semester_credits = term.credits_attempted if term else 0
+                semester_gpa = term.term_gpa if term else 0.0
                 course_data.append([
                     "", f"Semester GPA: {semester_gpa:.2f}", str(semester_credits), "", ""
                 ])
@@ -5812,8 +5494,11 @@ def generate_full_transcript(request, student_id):
                 story.append(course_table)
                 story.append(Spacer(1, 10))
                 
-                year_credits += semester_credits
-                year_grade_points += semester_grade_points
+                if term:
+                    year_credits += term.credits_attempted
+                    year_grade_points += term.grade_points
+                    total_earned += term.credits_earned
+                    cumulative_gpa = term.cumulative_gpa
         
         # Add year summary
         if year_credits > 0:
@@ -5822,16 +5507,13 @@ def generate_full_transcript(request, student_id):
             story.append(Spacer(1, 15))
             
             total_credits += year_credits
-            total_grade_points += year_grade_points
     
     # Final Summary
     if total_credits > 0:
-        cumulative_gpa = total_grade_points / total_credits
-        
         story.append(Paragraph("TRANSCRIPT SUMMARY", heading_style))
         final_summary = [
             ["Total Credits Attempted:", str(total_credits)],
-            ["Total Credits Earned:", str(total_credits)],  # Assuming all passed
+            ["Total Credits Earned:", str(total_earned)],
             ["Cumulative GPA:", f"{cumulative_gpa:.2f}"],
             ["Final Academic Standing:", student.userprofile.get_gpa_status() if hasattr(student, 'userprofile') else "N/A"],
             ["Transcript Status:", "Official"]
@@ -5858,6 +5540,92 @@ def generate_full_transcript(request, student_id):
     
     return response
 
+def _record_bulk_exam_marks(request, course, entered_by):
+    """Validate a whole roster of exam marks and record them in one batch
+    
+    Marks come from the grid form (exam_score_<student id> fields) or from an
+    uploaded CSV with student and exam_score columns, where student is a
+    username. Nothing is written unless every row is valid. Returns the
+    per-row report shown on the page.
+    """
+    enrolled = {
+        student.username: student
+        for student in User.objects.filter(
+            enrollments__course=course,
+            enrollments__status='enrolled',
+            userprofile__user_type='student'
+        ).distinct()
+    }
+    enrolled_by_id = {student.id: student for student in enrolled.values()}
+    
+    # Collect (row label, student key, raw score) from the chosen source
+    rows = []
+    marks_file = request.FILES.get('marks_file')
+    if marks_file:
+        try:
+            reader = csv.DictReader(io.TextIOWrapper(marks_file, encoding='utf-8-sig'))
+            for line_number, row in enumerate(reader, start=2):
+                rows.append((f'Line {line_number}', (row.get('student') or '').strip(), (row.get('exam_score') or '').strip()))
+        except (UnicodeDecodeError, csv.Error) as e:
+            messages.error(request, f'Could not read CSV file: {str(e)}')
+            return None
+    else:
+        for key, value in request.POST.items():
+            if key.startswith('exam_score_') and value.strip():
+                try:
+                    student = enrolled_by_id.get(int(key.replace('exam_score_', '')))
+                except ValueError:
+                    student = None
+                rows.append((student.username if student else key, student.username if student else '', value.strip()))
+    
+    # Validate every row before writing anything
+    report = []
+    exam_scores = {}
+    for label, username, raw_score in rows:
+        entry = {'row': label, 'student': username, 'exam_score': raw_score, 'status': 'error', 'message': ''}
+        report.append(entry)
+        
+        student = enrolled.get(username)
+        if student is None:
+            entry['message'] = 'Student is not enrolled in this course'
+            continue
+        if student.id in exam_scores:
+            entry['message'] = 'Duplicate row for this student'
+            continue
+        try:
+            exam_score = Decimal(raw_score).quantize(Decimal('0.01'))
+            if not exam_score.is_finite():
+                raise InvalidOperation
+        except InvalidOperation:
+            entry['message'] = 'Exam score is not a number'
+            continue
+        if not (0 <= exam_score <= 100):
+            entry['message'] = 'Exam score must be between 0 and 100'
+            continue
+        
+        entry['student_id'] = student.id
+        entry['status'] = 'valid'
+        exam_scores[student.id] = exam_score
+    
+    errors = sum(1 for entry in report if entry['status'] == 'error')
+    if not report:
+        messages.info(request, 'No exam marks were entered.')
+        return None
+    if errors:
+        messages.error(request, f'{errors} of {len(report)} rows are invalid. No exam marks were saved.')
+        return report
+    
+    try:
+        results = course.record_exam_marks(exam_scores, entered_by)
+    except IntegrityError:
+        messages.error(request, 'Exam marks clash with an existing assessment of the same name. No exam marks were saved.')
+        return report
+    for entry in report:
+        entry['status'] = results[entry['student_id']]
+    
+    messages.success(request, f'Saved {len(report)} exam marks for {course.course_code}.')
+    return report
+
 @login_required
 def manage_exam_marks(request):
     """Manage exam marks for students (lecturer only)"""
@@ -5876,143 +5644,79 @@ def manage_exam_marks(request):
     course_id = request.GET.get('course')
     selected_course = None
     students_data = []
+    bulk_report = None
     
     if course_id:
         try:
             selected_course = Course.objects.get(id=course_id, lecturer=request.user.userprofile)
-            
-            # Get all enrolled students
-            enrolled_students = User.objects.filter(
-                enrollments__course=selected_course,
-                enrollments__status='enrolled',
-                userprofile__user_type='student'
-            ).distinct()
-            
-            for student in enrolled_students:
-                # Get final mark details
-                final_mark_details = selected_course.get_final_mark_details(student)
-                
-                # Get existing exam mark
-                exam_grade = Grade.objects.filter(
-                    student=student,
-                    course=selected_course,
-                    grade_type='exam_mark'
-                ).first()
-                
-                students_data.append({
-                    'student': student,
-                    'cass_mark': final_mark_details['cass_mark'],
-                    'exam_mark': final_mark_details['exam_mark'],
-                    'final_mark': final_mark_details['final_mark'],
-                    'letter_grade': final_mark_details['letter_grade'],
-                    'is_passing': final_mark_details['is_passing'],
-                    'exam_grade_id': exam_grade.id if exam_grade else None
-                })
-                
-        except Course.DoesNotExist:
+        except (Course.DoesNotExist, ValueError):
             messages.error(request, 'Course not found.')
             return redirect('manage_exam_marks')
     
     # Handle exam mark submission
     if request.method == 'POST':
-        student_id = request.POST.get('student_id')
-        exam_score = request.POST.get('exam_score')
+        if selected_course is None:
+            messages.error(request, 'Please select a course first.')
+            return redirect('manage_exam_marks')
         
-        try:
-            student = User.objects.get(id=student_id, userprofile__user_type='student')
-            exam_score = float(exam_score)
-            
-            if not (0 <= exam_score <= 100):
-                messages.error(request, 'Exam score must be between 0 and 100.')
-                return redirect(f'/lecturer/grades/exam-marks/?course={course_id}')
-            
-            # Create or update exam mark
-            exam_grade, created = Grade.objects.update_or_create(
-                student=student,
-                course=selected_course,
-                grade_type='exam_mark',
-                defaults={
-                    'numeric_score': exam_score,
-                    'max_points': 100,
-                    'weight': 0.5,  # 50% weight
-                    'description': 'Final Examination',
-                    'comments': f'Exam mark entered by {request.user.get_full_name() or request.user.username}'
-                }
-            )
-            
-            # Update CASS mark if not exists
-            cass_mark_percentage = selected_course.calculate_cass_mark(student)
-            if cass_mark_percentage is not None:
-                Grade.objects.update_or_create(
-                    student=student,
-                    course=selected_course,
-                    grade_type='cass_mark',
-                    defaults={
-                        'numeric_score': cass_mark_percentage,
-                        'max_points': 100,
-                        'weight': 0.5,  # 50% weight
-                        'description': 'Continuous Assessment (CASS) Mark',
-                        'comments': f'CASS mark calculated from coursework'
-                    }
-                )
+        entered_by = request.user.get_full_name() or request.user.username
+        
+        if request.POST.get('mode') == 'bulk':
+            # Whole roster from the grid form or an uploaded CSV
+            bulk_report = _record_bulk_exam_marks(request, selected_course, entered_by)
+        else:
+            student_id = request.POST.get('student_id')
+            exam_score = request.POST.get('exam_score')
             
-            # Calculate and create final grade
-            final_mark, cass_mark, exam_mark = selected_course.calculate_final_mark(student)
-            if final_mark is not None:
-                # Convert to letter grade
-                if final_mark >= 90:
-                    letter_grade = 'A+'
-                elif final_mark >= 85:
-                    letter_grade = 'A'
-                elif final_mark >= 80:
-                    letter_grade = 'A-'
-                elif final_mark >= 77:
-                    letter_grade = 'B+'
-                elif final_mark >= 73:
-                    letter_grade = 'B'
-                elif final_mark >= 70:
-                    letter_grade = 'B-'
-                elif final_mark >= 67:
-                    letter_grade = 'C+'
-                elif final_mark >= 63:
-                    letter_grade = 'C'
-                elif final_mark >= 60:
-                    letter_grade = 'C-'
-                elif final_mark >= 57:
-                    letter_grade = 'D+'
-                elif final_mark >= 53:
-                    letter_grade = 'D'
-                elif final_mark >= 50:
-                    letter_grade = 'D-'
-                else:
-                    letter_grade = 'F'
+            try:
+                student = User.objects.get(id=student_id, userprofile__user_type='student')
+                exam_score = float(exam_score)
                 
-                Grade.objects.update_or_create(
-                    student=student,
-                    course=selected_course,
-                    grade_type='final_grade',
-                    defaults={
-                        'grade_value': letter_grade,
-                        'numeric_score': final_mark,
-                        'max_points': 100,
-                        'weight': 1.0,
-                        'description': 'Final Course Grade',
-                        'comments': f'Final grade: CASS ({cass_mark}%) + Exam ({exam_mark}%) = {final_mark}%'
-                    }
-                )
-            
-            action = "updated" if not created else "added"
-            messages.success(request, f'Exam mark {action} successfully for {student.get_full_name() or student.username}.')
+                if not (0 <= exam_score <= 100):
+                    messages.error(request, 'Exam score must be between 0 and 100.')
+                    return redirect(f'/lecturer/grades/exam-marks/?course={course_id}')
+                
+                try:
+                    results = selected_course.record_exam_marks({student.id: exam_score}, entered_by)
+                except IntegrityError:
+                    messages.error(request, 'The exam mark clashes with an existing assessment of the same name.')
+                    return redirect(f'/lecturer/grades/exam-marks/?course={course_id}')
+                messages.success(request, f'Exam mark {results[student.id]} successfully for {student.get_full_name() or student.username}.')
+                
+            except (User.DoesNotExist, ValueError) as e:
+                messages.error(request, f'Error updating exam mark: {str(e)}')
             
-        except (User.DoesNotExist, ValueError) as e:
-            messages.error(request, f'Error updating exam mark: {str(e)}')
+            return redirect(f'/lecturer/grades/exam-marks/?course={course_id}')
+    
+    if selected_course:
+        # Get all enrolled students
+        enrolled_students = User.objects.filter(
+            enrollments__course=selected_course,
+            enrollments__status='enrolled',
+            userprofile__user_type='student'
+        ).distinct()
+        
+        # Compute final marks for the whole course at once
+        roster = selected_course.compute_final_marks()
         
-        return redirect(f'/lecturer/grades/exam-marks/?course={course_id}')
+        for student in enrolled_students:
+            final_mark_details = roster.get(student.id, {})
+            
+            students_data.append({
+                'student': student,
+                'cass_mark': final_mark_details.get('cass_mark'),
+                'exam_mark': final_mark_details.get('exam_mark'),
+                'final_mark': final_mark_details.get('final_mark'),
+                'letter_grade': final_mark_details.get('letter_grade'),
+                'is_passing': final_mark_details.get('is_passing', False),
+                'exam_grade_id': final_mark_details.get('exam_grade_id')
+            })
     
     context = {
         'courses': courses,
         'selected_course': selected_course,
         'students_data': students_data,
+        'bulk_report': bulk_report,
     }
     
     return render(request, 'MainInterface/manage_exam_marks.html', context)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Load test for course enrollment, with registration rush mode off and on.
+Run this script from the project directory with: python load_test_enrollment.py
+Use a development database: it creates a course and students, and removes them again at the end.
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+import django
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DatabaseSystemProject.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from MainInterface.models import Course, Enrollment, EnrollmentRequest
+
+PREFIX = 'loadtest'
+
+
+def create_data(requests, seats):
+    lecturer = User.objects.create_user(f'{PREFIX}_lecturer')
+    lecturer.userprofile.user_type = 'lecturer'
+    lecturer.userprofile.save()
+    course = Course.objects.create(
+        course_code=f'{PREFIX.upper()}1',
+        course_name='Load Test Course',
+        lecturer=lecturer.userprofile,
+        max_students=seats,
+    )
+    students = [User.objects.create(username=f'{PREFIX}_student{i}') for i in range(requests)]
+    return course, students
+
+
+def remove_data():
+    Course.objects.filter(course_code__startswith=PREFIX.upper()).delete()
+    User.objects.filter(username__startswith=f'{PREFIX}_').delete()
+
+
+def enroll(course_id, student_id):
+    """Send one enroll request and return (seconds taken, error or None)"""
+    client = Client()
+    client.force_login(User.objects.get(pk=student_id))
+    start = time.perf_counter()
+    try:
+        response = client.get(reverse('enroll_course', args=[course_id]))
+        error = None if response.status_code == 302 else f'HTTP {response.status_code}'
+    except Exception as e:
+        error = type(e).__name__
+    return time.perf_counter() - start, error
+
+
+def start_worker():
+    """Run process_enrollment_queue in its own process, as it would be deployed"""
+    manage = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manage.py')
+    return subprocess.Popen(
+        [sys.executable, manage, 'process_enrollment_queue', '--interval', '0.5'],
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_for_queue(course):
+    while EnrollmentRequest.objects.filter(course=course, status='queued').exists():
+        time.sleep(0.1)
+
+
+def run(rush_mode, requests, clients, seats):
+    remove_data()
+    course, students = create_data(requests, seats)
+    worker = start_worker() if rush_mode else None
+
+    try:
+        with override_settings(ENROLLMENT_RUSH_MODE=rush_mode):
+            # Clients are separate processes, like the workers of a web server
+            connection.close()
+            start = time.perf_counter()
+            with multiprocessing.get_context('fork').Pool(clients) as pool:
+                results = pool.starmap(enroll, [(course.id, student.id) for student in students])
+            elapsed = time.perf_counter() - start
+
+            if worker:
+                wait_for_queue(course)
+            drained = time.perf_counter() - start
+    finally:
+        if worker:
+            worker.terminate()
+            worker.wait()
+
+    latencies = sorted(seconds * 1000 for seconds, error in results)
+    errors = [error for seconds, error in results if error]
+    enrolled = Enrollment.objects.filter(course=course, status='enrolled').count()
+    waitlisted = Enrollment.objects.filter(course=course, status='waitlisted').count()
+
+    print(f"Rush mode {'on' if rush_mode else 'off'}:")
+    print(f'  {requests} requests in {elapsed:.2f}s ({requests / elapsed:.1f} requests/s)')
+    print(f'  latency p50 {statistics.median(latencies):.0f}ms, p95 {latencies[int(len(latencies) * 0.95) - 1]:.0f}ms, '
+          f'max {latencies[-1]:.0f}ms')
+    print(f'  {len(errors)} errors' + (f" ({', '.join(sorted(set(errors)))})" if errors else ''))
+    if rush_mode:
+        print(f'  queue drained by the worker after {drained:.2f}s')
+    print(f'  {enrolled} enrolled, {waitlisted} waitlisted, {seats} seats')
+    remove_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure enroll request throughput with rush mode off and on')
+    parser.add_argument('--requests', type=int, default=300, help='Enroll requests to send, one student each')
+    parser.add_argument('--clients', type=int, default=8, help='Processes sending requests in parallel')
+    parser.add_argument('--seats', type=int, default=100, help='Capacity of the test course')
+    args = parser.parse_args()
+
+    for rush_mode in (False, True):
+        run(rush_mode, args.requests, args.clients, args.seats)
+
+
+if __name__ == '__main__':
+    main()